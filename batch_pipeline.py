@@ -0,0 +1,146 @@
+import os
+
+import pandas as pd
+
+from converter_core import CrossRateMatrix, convert_dataframe
+
+# Streaming batch conversion for ledger files of any size: read a chunk, convert it in one vectorized pass,
+# write it, repeat. Only one chunk is in memory at a time, so peak memory depends on chunk_rows and not on
+# the file size. Supported formats are CSV, Parquet (pyarrow) and xlsx (openpyxl read-only / write-only
+# mode); input and output formats can differ.
+
+DEFAULT_CHUNK_ROWS = 100000
+
+SUPPORTED_EXTENSIONS = ('.csv', '.parquet', '.xlsx')
+
+
+def file_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise ValueError(f"Unsupported file type {extension!r}, use one of {', '.join(SUPPORTED_EXTENSIONS)}")
+    return extension
+
+
+# Chunk readers yield (DataFrame chunk, fraction of the input read so far or None if unknown)
+
+def read_csv_chunks(path, chunk_rows):
+    total_bytes = os.path.getsize(path) or 1
+    with open(path, 'rb') as file:
+        for chunk in pd.read_csv(file, chunksize=chunk_rows):
+            yield chunk, min(1.0, file.tell() / total_bytes)
+
+
+def read_parquet_chunks(path, chunk_rows):
+    import pyarrow.parquet as pq
+    parquet_file = pq.ParquetFile(path)
+    total_rows = parquet_file.metadata.num_rows or 1
+    rows = 0
+    for batch in parquet_file.iter_batches(batch_size=chunk_rows):
+        rows += batch.num_rows
+        yield batch.to_pandas(), rows / total_rows
+
+
+def read_xlsx_chunks(path, chunk_rows):
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True)
+    try:
+        worksheet = workbook.active
+        total_rows = max(1, (worksheet.max_row or 1) - 1)
+        values = worksheet.iter_rows(values_only=True)
+        header = list(next(values, ()))
+        rows = 0
+        chunk = []
+        for row in values:
+            chunk.append(row)
+            if len(chunk) == chunk_rows:
+                rows += len(chunk)
+                yield pd.DataFrame(chunk, columns=header), min(1.0, rows / total_rows)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=header), 1.0
+    finally:
+        workbook.close()
+
+
+# Chunk writers are opened on the output path, take DataFrame chunks with write() and are closed at the end
+
+class CsvChunkWriter:
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='')
+        self.header = True
+
+    def write(self, df):
+        df.to_csv(self.file, index=False, header=self.header)
+        self.header = False
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetChunkWriter:
+    def __init__(self, path):
+        self.path = path
+        self.writer = None
+
+    def write(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table.cast(self.writer.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class XlsxChunkWriter:
+    # openpyxl's write-only mode streams rows to disk instead of keeping the whole sheet in memory
+    def __init__(self, path):
+        from openpyxl import Workbook
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+        self.worksheet = self.workbook.create_sheet()
+        self.header = True
+
+    def write(self, df):
+        if self.header:
+            self.worksheet.append(list(df.columns))
+            self.header = False
+        for row in df.itertuples(index=False):
+            self.worksheet.append([None if pd.isna(value) else value for value in row])
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+READERS = {'.csv': read_csv_chunks, '.parquet': read_parquet_chunks, '.xlsx': read_xlsx_chunks}
+WRITERS = {'.csv': CsvChunkWriter, '.parquet': ParquetChunkWriter, '.xlsx': XlsxChunkWriter}
+
+
+def default_output_path(input_path):
+    root_name, extension = os.path.splitext(input_path)
+    return f"{root_name}_converted{extension}"
+
+
+# Convert input_path to output_path chunk by chunk. rates is a CrossRateMatrix or a {code: units per USD}
+# dict. progress(rows_done, fraction) is called after every chunk, fraction is the share of the input read
+# (0.0-1.0). Returns (output_path, number of rows).
+def convert_stream(input_path, rates, output_path=None, chunk_rows=DEFAULT_CHUNK_ROWS, progress=None):
+    output_path = output_path or default_output_path(input_path)
+    reader = READERS[file_format(input_path)]
+    writer_class = WRITERS[file_format(output_path)]
+    cross_rates = rates if isinstance(rates, CrossRateMatrix) else CrossRateMatrix(rates)
+
+    rows = 0
+    writer = writer_class(output_path)
+    try:
+        for chunk, fraction in reader(input_path, chunk_rows):
+            writer.write(convert_dataframe(chunk, cross_rates))
+            rows += len(chunk)
+            if progress is not None:
+                progress(rows, fraction)
+    finally:
+        writer.close()
+    return output_path, rows
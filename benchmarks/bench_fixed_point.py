@@ -0,0 +1,75 @@
+import argparse
+import os
+import sys
+import time
+from decimal import Decimal, ROUND_HALF_EVEN
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from converter_core import CrossRateMatrix, convert_batch, currency_ids
+from currency_registry import CURRENCY_CODES
+from fixed_point import MINOR_UNITS, FixedPointRates, convert_batch_minor, from_minor_units
+
+# Exact fixed-point conversion against binary floats and decimal.Decimal on the same random ledger:
+# rows per second of each path, how many float results differ from the exact ones after rounding to the
+# target currency's minor unit, and a check that the int64 path agrees with Decimal.
+#
+#   python benchmarks/bench_fixed_point.py --rows 1000000
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def decimal_loop(amounts, sources, targets, rates):
+    # The straightforward Decimal implementation: one Decimal multiplication and quantize per row
+    results = []
+    for amount, source, target in zip(amounts, sources, targets):
+        rate = Decimal(repr(rates[target])) / Decimal(repr(rates[source]))
+        exponent = from_minor_units(1, target)
+        results.append((Decimal(amount) * rate).quantize(exponent, rounding=ROUND_HALF_EVEN))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fixed-point conversion benchmark")
+    parser.add_argument("--rows", type=int, default=1000000, help="rows converted by the vectorized paths")
+    parser.add_argument("--decimal-rows", type=int, default=100000, help="rows converted by the Decimal loop")
+    args = parser.parse_args()
+
+    generator = np.random.default_rng(0)
+    rates = {code: round(float(generator.uniform(0.1, 2000)), 6) for code in CURRENCY_CODES}
+    rates["USD"] = 1.0
+    codes = np.array(CURRENCY_CODES, dtype=object)
+    sources = codes[generator.integers(0, len(codes), args.rows)]
+    targets = codes[generator.integers(0, len(codes), args.rows)]
+    minor_amounts = generator.integers(1, 10 ** 9, args.rows)
+    # Float amounts in major units, as a float implementation would hold them
+    amounts = minor_amounts / 10.0 ** MINOR_UNITS[currency_ids(sources)]
+
+    cross_rates = CrossRateMatrix(rates)
+    fixed_rates = FixedPointRates(rates)
+    floats, float_seconds = timed(convert_batch, amounts, sources, targets, cross_rates)
+    (exact, valid), exact_seconds = timed(convert_batch_minor, minor_amounts, sources, targets, fixed_rates)
+
+    count = min(args.decimal_rows, args.rows)
+    decimals, decimal_seconds = timed(decimal_loop, [str(value) for value in amounts[:count].tolist()],
+                                      sources[:count], targets[:count], rates)
+
+    target_digits = MINOR_UNITS[currency_ids(targets)]
+    float_minor = np.rint(floats * 10.0 ** target_digits).astype(np.int64)
+    decimal_minor = np.array([int(value.scaleb(int(places))) for value, places in zip(decimals, target_digits)])
+    print(f"{args.rows:,} rows")
+    print(f"{'float (convert_batch)':>28} {args.rows / float_seconds:14,.0f} rows/s")
+    print(f"{'int64 (convert_batch_minor)':>28} {args.rows / exact_seconds:14,.0f} rows/s")
+    print(f"{'Decimal loop':>28} {count / decimal_seconds:14,.0f} rows/s")
+    print(f"float results off by a minor unit:   {np.count_nonzero(float_minor != exact):,} of {args.rows:,}")
+    print(f"Decimal results different from int64: {np.count_nonzero(decimal_minor != exact[:count]):,} of {count:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_pipeline import convert_stream
+from currency_registry import CURRENCY_CODES
+from parallel_batch import convert_file_parallel, default_workers
+
+# Scaling of parallel batch conversion: converts one synthetic ledger CSV with convert_stream and with
+# convert_file_parallel on 1, 2, 4, ... workers and prints the wall time and speedup of each run.
+#
+#   python benchmarks/bench_parallel.py --rows 2000000
+
+
+def make_ledger(path, rows):
+    generator = np.random.default_rng(0)
+    codes = np.array(CURRENCY_CODES)
+    pd.DataFrame({
+        'amount': generator.uniform(1, 10000, rows).round(2),
+        'source_currency': codes[generator.integers(0, len(codes), rows)],
+        'target_currency': codes[generator.integers(0, len(codes), rows)],
+    }).to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel batch conversion benchmark")
+    parser.add_argument("--rows", type=int, default=1000000, help="rows in the synthetic ledger")
+    parser.add_argument("--max-workers", type=int, default=default_workers(), help="largest pool size to run")
+    args = parser.parse_args()
+
+    rates = {code: 1.0 + i / 10 for i, code in enumerate(CURRENCY_CODES)}
+    with tempfile.TemporaryDirectory() as directory:
+        input_path = os.path.join(directory, 'ledger.csv')
+        output_path = os.path.join(directory, 'ledger_converted.csv')
+        make_ledger(input_path, args.rows)
+        print(f"{args.rows:,} rows, {os.path.getsize(input_path) / 1e6:.0f} MB, {default_workers()} CPUs")
+
+        started = time.perf_counter()
+        convert_stream(input_path, rates, output_path)
+        baseline = time.perf_counter() - started
+        print(f"{'convert_stream':>16} {baseline:8.2f}s")
+
+        workers = 1
+        while workers <= args.max_workers:
+            started = time.perf_counter()
+            convert_file_parallel(input_path, rates, output_path, workers=workers)
+            elapsed = time.perf_counter() - started
+            print(f"{workers:>8} workers {elapsed:8.2f}s  {baseline / elapsed:5.2f}x")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from stub_upstream import StubUpstream
+from suite import BENCHMARKS, HISTORY_SIZES
+
+# Benchmark runner for the hot paths in suite.py. Every benchmark is timed with timeit (auto-ranged loop count,
+# best and median of several repeats) against a local stub upstream, in a scratch directory, and the results
+# are saved as benchmarks/results/<commit>.json so two commits can be compared:
+#
+#   python benchmarks/run_benchmarks.py                 run everything, save results for HEAD
+#   python benchmarks/run_benchmarks.py --quick -k history
+#   python benchmarks/run_benchmarks.py --compare 1a2b3c4 HEAD
+
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, 'results')
+DEFAULT_REPEAT = 5
+REGRESSION_THRESHOLD = 1.2  # A benchmark is reported as regressed when it got 20% slower
+
+
+class BenchmarkContext:
+    def __init__(self, directory, upstream, max_history_size, tk_root):
+        self.directory = directory
+        self.upstream = upstream
+        self.max_history_size = max_history_size
+        self.tk_root = tk_root
+
+
+def git(*args):
+    return subprocess.run(["git", *args], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip()
+
+
+def current_commit():
+    commit = git("rev-parse", "--short", "HEAD") or "unknown"
+    dirty = bool(git("status", "--porcelain", "--untracked-files=no"))
+    return commit + ("-dirty" if dirty else "")
+
+
+def open_tk_root():
+    # The table benchmark needs a display, it is skipped when Tk cannot start
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        root.withdraw()
+        return root
+    except Exception:
+        return None
+
+
+def time_benchmark(run, repeat):
+    timer = timeit.Timer(run)
+    number, _ = timer.autorange()
+    times = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    return {"median": statistics.median(times), "min": min(times), "number": number, "repeat": repeat}
+
+
+def run_suite(name_filter=None, repeat=DEFAULT_REPEAT, max_history_size=HISTORY_SIZES[-1]):
+    results = {}
+    tk_root = open_tk_root()
+    with tempfile.TemporaryDirectory() as directory, StubUpstream() as upstream:
+        # Benchmarks may create files relative to the working directory, keep them out of the repository
+        previous_directory = os.getcwd()
+        os.chdir(directory)
+        try:
+            context = BenchmarkContext(directory, upstream, max_history_size, tk_root)
+            for name, params, setup in BENCHMARKS:
+                for param in params:
+                    key = name if param is None else f"{name}[{param}]"
+                    if name_filter and name_filter not in key:
+                        continue
+                    run = setup(context, param)
+                    if run is None:
+                        print(f"{key:<52} {'skipped':>10}")
+                        continue
+                    results[key] = time_benchmark(run, repeat)
+                    print(f"{key:<52} {format_seconds(results[key]['median']):>10}")
+        finally:
+            os.chdir(previous_directory)
+            if tk_root is not None:
+                tk_root.destroy()
+    return results
+
+
+def format_seconds(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+
+def save_results(results, commit):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{commit}.json")
+    with open(path, 'w') as file:
+        json.dump({"commit": commit, "date": datetime.now().isoformat(timespec='seconds'),
+                   "python": platform.python_version(), "machine": platform.platform(),
+                   "processor": platform.processor() or platform.machine(), "results": results}, file, indent=2)
+    return path
+
+
+def load_results(revision):
+    # A results file path, or a commit (anything git rev-parse accepts) that has a saved results file
+    if os.path.exists(revision):
+        path = revision
+    else:
+        commit = git("rev-parse", "--short", revision) or revision
+        path = os.path.join(RESULTS_DIR, f"{commit}.json")
+        if not os.path.exists(path) and os.path.exists(os.path.join(RESULTS_DIR, f"{commit}-dirty.json")):
+            path = os.path.join(RESULTS_DIR, f"{commit}-dirty.json")
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+def compare(base, head, threshold=REGRESSION_THRESHOLD):
+    # Print the median of every benchmark in both runs, returns the number of regressions
+    print(f"{'benchmark':<52} {base['commit']:>14} {head['commit']:>14}  ratio")
+    regressions = 0
+    for key in sorted(set(base["results"]) | set(head["results"])):
+        before = base["results"].get(key, {}).get("median")
+        after = head["results"].get(key, {}).get("median")
+        if before is None or after is None:
+            print(f"{key:<52} {format_seconds(before) if before else '-':>14} "
+                  f"{format_seconds(after) if after else '-':>14}")
+            continue
+        ratio = after / before
+        flag = "  REGRESSION" if ratio > threshold else ("  improved" if ratio < 1 / threshold else "")
+        regressions += ratio > threshold
+        print(f"{key:<52} {format_seconds(before):>14} {format_seconds(after):>14}  {ratio:5.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Currency converter benchmarks")
+    parser.add_argument("-k", dest="name_filter", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timing repeats per benchmark")
+    parser.add_argument("--quick", action="store_true", help="skip the history sizes above 10,000 entries")
+    parser.add_argument("--no-save", action="store_true", help="don't write the results file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"),
+                        help="compare two saved runs (commits or result files) instead of running")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(load_results(args.compare[0]), load_results(args.compare[1]), args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    results = run_suite(args.name_filter, args.repeat, 10000 if args.quick else HISTORY_SIZES[-1])
+    if not args.no_save:
+        print(f"Results saved to {save_results(results, current_commit())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from currency_registry import CURRENCY_CODES
+
+# Local stand-in for the exchange rates APIs, so benchmarks (and manual tests of --serve / --upstream) never
+# touch the real services. Every GET returns a snapshot; with changing=True the rates move slightly on every
+# request, otherwise the same body is served each time. Several stubs with different latency, error status,
+# skewed rates or response format stand in for the providers of rate_providers.py.
+#
+#   python benchmarks/stub_upstream.py --port 8000
+#   python benchmarks/stub_upstream.py --port 8001 --latency 2 --skew EUR=1.1 --format frankfurter
+#   python main.py --upstream http://127.0.0.1:8000/v4/latest/USD http://127.0.0.1:8001/latest --merge consensus
+
+
+def stub_rates(step=0):
+    # Deterministic rates for every registry currency, shifted a little for each step
+    rates = {code: round(1.0 + (i * 7.31) % 997 + step * 0.0001 * (i % 5), 6) for i, code in enumerate(CURRENCY_CODES)}
+    rates["USD"] = 1
+    return rates
+
+
+class StubUpstream:
+    def __init__(self, host="127.0.0.1", port=0, changing=False, latency=0.0, status=200, skew=None,
+                 response_format="v4"):
+        self.changing = changing
+        self.latency = latency
+        self.status = status  # e.g. 503 to stand in for a provider that is down
+        self.skew = skew or {}  # {code: factor} applied to the served rates, for outlier tests
+        self.response_format = response_format  # "v4" (exchangerate-api), "er-api" or "frankfurter" (EUR based)
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                body = stub.body() if stub.status == 200 else b'{"error": "unavailable"}'
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.server.server_address[1]}/v4/latest/USD"
+        self._thread = None
+
+    def body(self):
+        rates = stub_rates(self.requests if self.changing else 0)
+        for code, factor in self.skew.items():
+            rates[code] *= factor
+        if self.response_format == "er-api":
+            data = {"result": "success", "base_code": "USD", "time_last_update_unix": int(time.time()),
+                    "rates": rates}
+        elif self.response_format == "frankfurter":
+            euro = rates["EUR"]
+            data = {"amount": 1.0, "base": "EUR", "date": time.strftime("%Y-%m-%d"),
+                    "rates": {code: rate / euro for code, rate in rates.items() if code != "EUR"}}
+        else:
+            data = {"base": "USD", "time_last_updated": int(time.time()), "rates": rates}
+        return json.dumps(data).encode('utf-8')
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub exchange rates API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--changing", action="store_true", help="change the rates on every request")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument("--status", type=int, default=200, help="HTTP status to answer with")
+    parser.add_argument("--skew", action="append", default=[], metavar="CODE=FACTOR",
+                        help="multiply one currency's rate, e.g. EUR=1.1")
+    parser.add_argument("--format", dest="response_format", default="v4", choices=("v4", "er-api", "frankfurter"))
+    args = parser.parse_args()
+
+    skew = {code: float(factor) for code, factor in (item.split("=") for item in args.skew)}
+    stub = StubUpstream(args.host, args.port, args.changing, args.latency, args.status, skew, args.response_format)
+    print(f"Serving stub rates on {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+from converter_core import (HISTORY_TIMESTAMP_FORMAT, ConversionHistoryModel, CurrencyConverter, HistoryStore,
+                            RateCache, RateProvider, export_rates_to_excel)
+from currency_registry import get_currency_name_by_code, is_valid_currency, search_currencies
+from rate_history import RateHistoryStore
+from rate_providers import MERGE_STRATEGIES, MultiProviderRateSource
+from rate_snapshot import read_snapshot, write_snapshot
+from shared_rates import SharedRateProvider
+from stub_upstream import stub_rates
+
+# Benchmarks of the converter's hot paths, run by run_benchmarks.py. Each benchmark is a setup function
+# registered with @benchmark(name, params); it is called once per parameter with the run's context and returns
+# the callable to time, or None to skip the benchmark on this machine. Setup cost is never timed.
+
+BENCHMARKS = []
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+
+HISTORY_SIZES = (100, 10000, 100000, 1000000)
+
+
+def benchmark(name, params=(None,)):
+    def register(setup):
+        BENCHMARKS.append((name, params, setup))
+        return setup
+    return register
+
+
+def make_converter(context, name, history_store=None):
+    # Converter whose files live in the run's scratch directory and whose upstream is the local stub
+    directory = os.path.join(context.directory, name)
+    os.makedirs(directory, exist_ok=True)
+    provider = RateProvider(context.upstream.url, rates_file=os.path.join(directory, 'exchange_rates.bin'))
+    if history_store is None:
+        history_store = HistoryStore(os.path.join(directory, 'conversion_history.jsonl'))
+    rate_history = RateHistoryStore(os.path.join(directory, 'rate_history'))
+    return CurrencyConverter(provider, history_store, rate_history=rate_history)
+
+
+@benchmark("convert.single")
+def convert_single(context, param):
+    # What convert_currency does per click: cached snapshot lookup, validation and the cross-rate conversion
+    converter = make_converter(context, 'convert_single')
+    converter.refresh()
+
+    def run():
+        converter.rates()
+        converter.convert(100.0, "EUR", "INR")
+    return run
+
+
+@benchmark("convert.refresh_from_upstream")
+def refresh_from_upstream(context, param):
+    # fetch_exchange_rates without the GUI: HTTP round trip to the stub, JSON parsing, cache and history update
+    converter = make_converter(context, 'refresh')
+    return converter.refresh
+
+
+@benchmark("providers.fetch", params=MERGE_STRATEGIES)
+def providers_fetch(context, strategy):
+    # Concurrent fetch from three providers (all served by the stub) plus normalizing and merging the answers
+    directory = os.path.join(context.directory, f'providers_{strategy}')
+    os.makedirs(directory, exist_ok=True)
+    source = MultiProviderRateSource([context.upstream.url] * 3, strategy,
+                                     rates_file=os.path.join(directory, 'exchange_rates.bin'))
+    return source.fetch
+
+
+@benchmark("currency.is_valid_currency", params=("EUR", "XYZ"))
+def valid_currency(context, code):
+    return lambda: is_valid_currency(code)
+
+
+@benchmark("currency.get_currency_name_by_code", params=("EUR", "XYZ"))
+def currency_name(context, code):
+    return lambda: get_currency_name_by_code(code)
+
+
+@benchmark("currency.search_currencies", params=("e", "dollar", "EUR"))
+def search(context, prefix):
+    # Autocomplete lookup done on every keystroke in a currency field
+    return lambda: search_currencies(prefix)
+
+
+@benchmark("history.log_conversion", params=HISTORY_SIZES)
+def log_conversion(context, size):
+    # log_conversion_history without the Tk widget: store append plus history model update, on a history that
+    # already holds `size` entries
+    if size > context.max_history_size:
+        return None
+    directory = os.path.join(context.directory, f'history_{size}')
+    os.makedirs(directory, exist_ok=True)
+    filename = os.path.join(directory, 'conversion_history.jsonl')
+    start = datetime.now() - timedelta(days=1)
+    with open(filename, 'w') as file:
+        for i in range(size):
+            timestamp = (start + timedelta(seconds=i * 86400 / size)).strftime(HISTORY_TIMESTAMP_FORMAT)
+            file.write(json.dumps({"timestamp": timestamp, "from_currency": "USD", "to_currency": "EUR",
+                                   "amount": float(i), "converted_amount": i * 0.9}) + "\n")
+
+    converter = make_converter(context, f'history_{size}', HistoryStore(filename, max_entries=size * 100))
+    # Wait for the background indexing, otherwise append() returns early and the index update isn't timed
+    len(converter.history_store)
+    model = ConversionHistoryModel(converter.history_store)
+
+    def run():
+        model.append(converter.log_conversion("USD", "EUR", 100.0, 90.0))
+    return run
+
+
+@benchmark("table.display_exchange_rates_table", params=("update", "rebase"))
+def display_table(context, mode):
+    # Full Tk table refresh; "update" redraws the same base with changed rates, "rebase" switches base currency
+    if context.tk_root is None:
+        return None
+    from main import CurrencyConverterApp
+    converter = make_converter(context, f'table_{mode}')
+    converter.refresh()
+    app = CurrencyConverterApp(context.tk_root, converter)
+    app.exchange_rates = converter.rate_cache.rates
+    # Tabs are built when first selected, so build the table tab here rather than timing its construction
+    app.tab_builders.pop(str(app.display_exchange_rates_tab), None)
+    app.create_display_exchange_rates_tab()
+    snapshots = [stub_rates(0), stub_rates(1)]
+    bases = ["EUR", "USD"]
+    state = {"turn": 0}
+
+    def run():
+        state["turn"] ^= 1
+        if mode == "update":
+            converter.rate_cache.store(snapshots[state["turn"]], "api")
+            app.exchange_rates = converter.rate_cache.rates
+        else:
+            app.table_base_currency.set(bases[state["turn"]])
+        app.display_exchange_rates_table()
+        context.tk_root.update_idletasks()
+    return run
+
+
+@benchmark("export.export_to_excel")
+def export_to_excel(context, param):
+    rates = stub_rates()
+    filename = os.path.join(context.directory, 'exchange_rates_export.xlsx')
+    return lambda: export_rates_to_excel(rates, filename)
+
+
+@benchmark("rates.parse_json")
+def parse_json(context, param):
+    body = context.upstream.body()
+    return lambda: json.loads(body)
+
+
+@benchmark("rates.load_snapshot")
+def load_snapshot(context, param):
+    # Reading exchange_rates.bin back, what start-up and offline lookups do instead of parsing JSON
+    filename = os.path.join(context.directory, 'exchange_rates.bin')
+    write_snapshot(filename, stub_rates(), "USD", 0.0)
+    return lambda: read_snapshot(filename)
+
+
+@benchmark("rates.read_shared", params=("generation", "snapshot"))
+def read_shared(context, part):
+    # What other processes pay for a snapshot someone else fetched: the generation check done every poll, and
+    # copying the snapshot out of the shared segment when it changed
+    directory = os.path.join(context.directory, 'shared')
+    os.makedirs(directory, exist_ok=True)
+    provider = SharedRateProvider(RateProvider(context.upstream.url,
+                                               rates_file=os.path.join(directory, 'exchange_rates.bin')))
+    provider.segment.publish(stub_rates(), 0.0)
+    return (lambda: provider.generation) if part == "generation" else provider.read_shared
+
+
+@benchmark("rates.cache_store")
+def cache_store(context, param):
+    # Storing a new snapshot: the cross-rate matrix update for every changed currency
+    cache = RateCache()
+    snapshots = [stub_rates(0), stub_rates(1)]
+    state = {"turn": 0}
+
+    def run():
+        state["turn"] ^= 1
+        cache.store(snapshots[state["turn"]], "api")
+    return run
+
+
+@benchmark("startup.import_main")
+def import_main(context, param):
+    # Cold import of the GUI module in a fresh interpreter (interpreter start-up included)
+    command = [sys.executable, "-c", f"import sys; sys.path.insert(0, {os.path.dirname(MAIN_SCRIPT)!r}); import main"]
+    return lambda: subprocess.run(command, cwd=context.directory, check=True)
+
+
+@benchmark("startup.window")
+def startup_window(context, param):
+    # python main.py --startup-time: process start until the first frame of the window is drawn
+    if context.tk_root is None:
+        return None
+    command = [sys.executable, MAIN_SCRIPT, "--startup-time", "--upstream", context.upstream.url]
+    return lambda: subprocess.run(command, cwd=context.directory, check=True, capture_output=True)
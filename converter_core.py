@@ -0,0 +1,988 @@
+import json
+import math
+import random
+import numpy as np
+from decimal import Decimal, InvalidOperation
+from datetime import datetime, timedelta
+import os
+import time
+import threading
+import bisect
+import re
+from array import array
+
+import currency_registry
+from currency_registry import CURRENCY_CODES, CURRENCY_IDS, CURRENCY_COUNT, is_valid_currency
+from latency_metrics import METRICS, timed
+from rate_snapshot import SnapshotError, read_legacy_rates, read_snapshot, write_snapshot
+
+# GUI-independent core of the currency converter: rate provider, rate cache, cross rates, batch conversion,
+# history store and currency registry (currency_registry.py). It does not import tkinter, so servers, workers and benchmarks can use
+# the conversion hot paths directly. CurrencyConverterApp in main.py is a thin Tk shell over this module.
+
+API_URL = "https://api.exchangerate-api.com/v4/latest/USD"
+# Latest rates snapshot (rate_snapshot.py); the old JSON cache file is still read when there is no snapshot
+RATES_FILE = 'exchange_rates.bin'
+LEGACY_RATES_FILE = 'exchange_rates.json'
+EXPORT_FILE = 'exchange_rates_export.xlsx'
+
+# How long (in seconds) a fetched exchange rate snapshot is considered fresh
+RATES_TTL_SECONDS = 600
+
+# (connect, read) timeout in seconds for every request to the exchange rates API
+REQUEST_TIMEOUT = (3.05, 10)
+
+# Retries of a failed rate fetch (connection errors, timeouts, 429 and 5xx) with jittered exponential backoff
+FETCH_RETRIES = 3
+FETCH_BACKOFF_BASE_SECONDS = 0.5
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# Keep-alive connections kept per host by the shared rate fetch session
+CONNECTION_POOL_SIZE = 4
+
+# Conversion history is kept as JSON Lines (one entry per line) so logging a conversion is a single append
+HISTORY_FILE = 'conversion_history.jsonl'
+LEGACY_HISTORY_FILE = 'conversion_history.json'
+HISTORY_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Leading fields of a history line as log_conversion writes them, so indexing reads them without a JSON parse.
+# Lines in another shape (e.g. migrated from the old history file) fall back to json.loads.
+HISTORY_LINE_PREFIX = re.compile(rb'\{"timestamp": "(\d{4}-\d\d-\d\d \d\d):(\d\d):(\d\d)", '
+                                 rb'"from_currency": "([A-Z]{3})", "to_currency": "([A-Z]{3})", ')
+HISTORY_RETENTION_DAYS = 15
+MAX_HISTORY_ENTRIES = 1000000
+# Number of entries shown per page in the View Conversion History tab
+HISTORY_PAGE_SIZE = 100
+# Entries a chunked history search reads per step, so the Tk event loop keeps running between steps
+HISTORY_SEARCH_CHUNK = 10000
+# Entries HistoryStore.entries() reads per file access (with the store lock held, so compaction can't interleave)
+HISTORY_READ_CHUNK = 1000
+
+# Connectivity states reported by ConnectivityMonitor
+ONLINE = "online"
+DEGRADED = "degraded"
+OFFLINE = "offline"
+
+# Consecutive failed fetches before the rates endpoint is considered offline
+OFFLINE_AFTER_FAILURES = 3
+# A successful fetch slower than this (in seconds) marks the connection as degraded
+DEGRADED_LATENCY_SECONDS = 2.0
+# Backoff (in seconds) between attempts to reach the rates endpoint after failures
+RETRY_BACKOFF_BASE_SECONDS = 5
+RETRY_BACKOFF_MAX_SECONDS = 300
+
+# Background refresh schedule (RefreshSchedule): starting interval until the upstream's publication rate is
+# known, the bounds of the adapted interval, and the random spread (± share of the delay) added to every refresh
+REFRESH_INTERVAL_SECONDS = RATES_TTL_SECONDS
+MIN_REFRESH_INTERVAL_SECONDS = 60
+MAX_REFRESH_INTERVAL_SECONDS = 3600
+REFRESH_JITTER = 0.1
+# Weight of the newest observation in the smoothed time between upstream changes
+CHANGE_PERIOD_SMOOTHING = 0.5
+
+# Shared HTTP client for everything that talks to the rates API. It keeps a pooled keep-alive session (so a
+# refresh reuses a warm TCP+TLS connection), asks for gzip, remembers the ETag/Last-Modified of each URL to
+# send conditional GETs (an unchanged snapshot costs a 304 with no body) and retries transient failures with
+# jittered exponential backoff.
+class RateFetchClient:
+    def __init__(self, retries=FETCH_RETRIES, backoff_base=FETCH_BACKOFF_BASE_SECONDS,
+                 pool_size=CONNECTION_POOL_SIZE):
+        self.retries = retries
+        self.backoff_base = backoff_base
+        # requests is imported by the first client, which the GUI creates on its background worker
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+        self._lock = threading.Lock()
+        self._validators = {}  # url -> conditional request headers from the last 200 response
+        self._last_data = {}  # url -> parsed body of the last 200 response, returned again on a 304
+
+        # Counters for seeing what the conditional requests and retries save
+        self.requests = 0
+        self.not_modified = 0
+        self.retried = 0
+
+    def get(self, url, timeout=REQUEST_TIMEOUT):
+        # Plain GET over the pooled session, no conditional headers or retries
+        return self.session.get(url, timeout=timeout)
+
+    def get_json(self, url, timeout=REQUEST_TIMEOUT, cancel_event=None):
+        # Returns (data, changed). changed is False when the server answered 304 Not Modified and the data is
+        # the previous response. Returns (None, False) if cancel_event is set while backing off.
+        import requests
+        with self._lock:
+            headers = dict(self._validators.get(url, {}))
+
+        for attempt in range(self.retries + 1):
+            try:
+                self.requests += 1
+                response = self.session.get(url, headers=headers, timeout=timeout)
+                if response.status_code == 304 and url in self._last_data:
+                    self.not_modified += 1
+                    return self._last_data[url], False
+                if response.status_code == 200:
+                    data = response.json()
+                    validators = {}
+                    if response.headers.get("ETag"):
+                        validators["If-None-Match"] = response.headers["ETag"]
+                    if response.headers.get("Last-Modified"):
+                        validators["If-Modified-Since"] = response.headers["Last-Modified"]
+                    with self._lock:
+                        self._validators[url] = validators
+                        self._last_data[url] = data
+                    return data, True
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.retries:
+                    raise requests.HTTPError("Failed to fetch exchange rates. Please try again later.",
+                                             response=response)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+
+            # Full jitter backoff, so clients that failed together don't retry together
+            self.retried += 1
+            delay = random.uniform(0, self.backoff_base * 2 ** attempt)
+            if cancel_event is not None:
+                if cancel_event.wait(delay):
+                    return None, False
+            else:
+                time.sleep(delay)
+
+
+_rate_fetch_client = None
+_rate_fetch_client_lock = threading.Lock()
+
+
+def get_rate_fetch_client():
+    # Process-wide RateFetchClient, created on first use
+    global _rate_fetch_client
+    with _rate_fetch_client_lock:
+        if _rate_fetch_client is None:
+            _rate_fetch_client = RateFetchClient()
+        return _rate_fetch_client
+
+
+# Check if internet connection is available by attempting to make a request to Google.
+@timed("internet_probe")
+def is_internet_available():
+    import requests
+    try:
+        response = get_rate_fetch_client().get('http://www.google.com', timeout=1)
+        response.raise_for_status()
+        return True
+    except requests.RequestException:
+        return False
+
+
+# N×N matrix of cross rates built from a snapshot of USD-based rates, so the rate for any source→target pair
+# is a single lookup: matrix[i, j] is how many units of currency j one unit of currency i buys, where i and j
+# are currency registry ids. Currencies missing from the snapshot are NaN, and the matrix carries an extra NaN
+# row and column at the end, picked up by the -1 id of unknown codes.
+class CrossRateMatrix:
+    def __init__(self, rates=None):
+        self.codes = []  # Codes present in the snapshot, in registry order
+        self.usd_rates = np.full(CURRENCY_COUNT, np.nan)
+        self.matrix = np.full((CURRENCY_COUNT + 1, CURRENCY_COUNT + 1), np.nan)
+        if rates:
+            self.update(rates)
+
+    def update(self, rates):
+        # Update the matrix for a new snapshot and return how many currencies changed. Only the rows and
+        # columns of the changed rates are recomputed.
+        usd_rates = np.full(CURRENCY_COUNT, np.nan)
+        for code, rate in rates.items():
+            position = CURRENCY_IDS.get(code)
+            if position is not None:
+                usd_rates[position] = rate
+        return self.update_usd_rates(usd_rates)
+
+    def update_usd_rates(self, usd_rates):
+        # Same as update() for a vector of units per 1 USD indexed by registry id (NaN = not in the snapshot)
+        usd_rates = np.array(usd_rates, dtype=np.float64)
+        same = (usd_rates == self.usd_rates) | (np.isnan(usd_rates) & np.isnan(self.usd_rates))
+        changed = np.flatnonzero(~same)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.matrix[changed, :CURRENCY_COUNT] = usd_rates[None, :] / usd_rates[changed, None]
+            self.matrix[:CURRENCY_COUNT, changed] = usd_rates[None, changed] / usd_rates[:, None]
+
+        self.usd_rates = usd_rates
+        self.codes = [CURRENCY_CODES[i] for i in np.flatnonzero(~np.isnan(usd_rates))]
+        return len(changed)
+
+    def rate(self, source_currency, target_currency):
+        # Units of target_currency for 1 unit of source_currency, or None if either code is unknown
+        source = CURRENCY_IDS.get(source_currency)
+        target = CURRENCY_IDS.get(target_currency)
+        if source is None or target is None:
+            return None
+        rate = self.matrix[source, target]
+        return None if np.isnan(rate) else float(rate)
+
+    def row(self, source_currency):
+        # All rates for 1 unit of source_currency as a {currency code: rate} dict, e.g. a full EUR-based table
+        source = CURRENCY_IDS.get(source_currency)
+        if source is None or np.isnan(self.usd_rates[source]):
+            return {}
+        values = self.matrix[source, :-1].tolist()
+        return {code: values[CURRENCY_IDS[code]] for code in self.codes}
+
+    def indexes(self, column):
+        return currency_ids(column)
+
+
+# In-memory snapshot of the latest exchange rates with a freshness window, so repeated conversions
+# are served from memory and the API is only contacted once the snapshot has expired.
+class RateCache:
+    def __init__(self, ttl=RATES_TTL_SECONDS):
+        self.ttl = ttl
+        self.rates = {}
+        self.fetched_at = None  # time.time() of the fetch that produced the snapshot
+        self.source = None  # Where the snapshot came from ("api", "shared" by another process, or "file")
+        self.base = None  # Base currency of the snapshot, e.g. "USD"
+        self.cross_rates = CrossRateMatrix()  # Rebuilt once per stored snapshot
+
+        # Counters so we can see how much network traffic the cache saves
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def age(self):
+        # Seconds since the snapshot was fetched, or None if there is no snapshot
+        if self.fetched_at is None:
+            return None
+        return time.time() - self.fetched_at
+
+    def is_fresh(self):
+        age = self.age()
+        return bool(self.rates) and age is not None and age < self.ttl
+
+    def get(self):
+        # Return the cached rates if they are still fresh, otherwise None (the caller should refresh)
+        if self.is_fresh():
+            self.hits += 1
+            return self.rates
+        self.misses += 1
+        return None
+
+    def store(self, rates, source, base="USD", fetched_at=None):
+        self.rates = rates
+        self.source = source
+        self.base = base
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        self.cross_rates.update(rates)
+        if source == "api":
+            self.refreshes += 1
+
+    def invalidate(self):
+        # Drop the snapshot and its cross rates, e.g. when the user discards rates they don't trust. Lookups find
+        # no rates until the next store(); the cross-rate matrix object stays the same so references stay valid.
+        self.rates = {}
+        self.fetched_at = None
+        self.source = None
+        self.base = None
+        self.cross_rates.update({})
+
+    def stats(self):
+        # Counters shown in the Performance tab: hits and misses of get(), refreshes from the API, age in seconds
+        return {"hits": self.hits, "misses": self.misses, "refreshes": self.refreshes, "age": self.age(),
+                "source": self.source, "base": self.base}
+
+
+# Tracks whether the exchange rates endpoint is reachable from the outcome of the real fetches instead of
+# probing a third-party site. The state is cached, so callers can consult it instantly, and failed attempts
+# back off exponentially. A probe function (e.g. is_internet_available) can be plugged in for an active check.
+class ConnectivityMonitor:
+    def __init__(self, probe=None):
+        self.probe = probe
+        self.state = ONLINE
+        self.failures = 0
+        self.last_error = None
+        self.last_latency = None
+        self.next_attempt_at = 0.0
+        self._listeners = []
+
+    def add_listener(self, callback):
+        # callback(state) is called whenever the state changes
+        self._listeners.append(callback)
+
+    def is_online(self):
+        return self.state != OFFLINE
+
+    def should_attempt(self):
+        # False while backing off after failures, so callers don't hammer an unreachable endpoint
+        return time.monotonic() >= self.next_attempt_at
+
+    def retry_in(self):
+        return max(0.0, self.next_attempt_at - time.monotonic())
+
+    def check(self):
+        # Run the plugged-in probe (if any and not backing off) and return the resulting state
+        if self.probe is not None and self.should_attempt():
+            started = time.monotonic()
+            if self.probe():
+                self.record_success(time.monotonic() - started)
+            else:
+                self.record_failure("Probe failed.")
+        return self.state
+
+    def record_success(self, latency=None):
+        self.failures = 0
+        self.last_error = None
+        self.last_latency = latency
+        self.next_attempt_at = 0.0
+        slow = latency is not None and latency > DEGRADED_LATENCY_SECONDS
+        self._set_state(DEGRADED if slow else ONLINE)
+
+    def record_failure(self, error=None):
+        self.failures += 1
+        self.last_error = error
+        backoff = RETRY_BACKOFF_BASE_SECONDS * 2 ** (self.failures - 1)
+        self.next_attempt_at = time.monotonic() + min(backoff, RETRY_BACKOFF_MAX_SECONDS)
+        self._set_state(OFFLINE if self.failures >= OFFLINE_AFTER_FAILURES else DEGRADED)
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            for callback in self._listeners:
+                callback(state)
+
+
+# Decides when the background refresh runs next, so rates are refreshed on a timer instead of on user actions.
+# The interval follows how often the upstream actually publishes new values: half the smoothed time between
+# observed changes (longer while nothing changes), within MIN/MAX_REFRESH_INTERVAL_SECONDS. After failures the
+# regular interval is suspended and the refresh follows the connectivity monitor's exponential backoff, which
+# also keeps retries rare while offline. Every delay gets REFRESH_JITTER so clients don't poll in lockstep.
+class RefreshSchedule:
+    def __init__(self, connectivity, interval=REFRESH_INTERVAL_SECONDS, jitter=REFRESH_JITTER):
+        self.connectivity = connectivity
+        self.base_interval = interval
+        self.interval = interval
+        self.jitter = jitter
+        self.change_period = None  # Smoothed seconds between upstream changes, None until one was measured
+        self.last_change_at = None
+        self.last_success_at = None
+        self._last_rates = None
+
+    def record_success(self, rates, now=None):
+        # Adapt the interval to a fetched snapshot, returns True if the upstream values changed
+        now = time.monotonic() if now is None else now
+        self.last_success_at = now
+        changed = rates != self._last_rates
+        if changed:
+            if self._last_rates is not None:
+                period = now - self.last_change_at
+                self.change_period = period if self.change_period is None else (
+                    CHANGE_PERIOD_SMOOTHING * period + (1 - CHANGE_PERIOD_SMOOTHING) * self.change_period)
+            self.last_change_at = now
+            self._last_rates = rates
+        # Nothing changed for longer than usual: the upstream publishes less often than estimated
+        since_change = now - self.last_change_at
+        period = max(2 * self.base_interval if self.change_period is None else self.change_period, since_change)
+        self.interval = min(max(period / 2, MIN_REFRESH_INTERVAL_SECONDS), MAX_REFRESH_INTERVAL_SECONDS)
+        return changed
+
+    def next_delay(self):
+        # Seconds until the next refresh
+        if self.connectivity.failures:
+            delay = max(self.connectivity.retry_in(), RETRY_BACKOFF_BASE_SECONDS)
+        else:
+            delay = self.interval
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def is_recent(self, now=None):
+        # True if the last successful refresh is too recent for another one to be worth a request
+        now = time.monotonic() if now is None else now
+        return self.last_success_at is not None and now - self.last_success_at < MIN_REFRESH_INTERVAL_SECONDS
+
+
+# Download the latest exchange rates from the API and save them to the snapshot file.
+# This does blocking network I/O, so GUI code only calls it from a background thread (RateRefreshWorker).
+def download_exchange_rates(api_url, timeout=REQUEST_TIMEOUT, cancel_event=None, client=None, rates_file=RATES_FILE):
+    client = client or get_rate_fetch_client()
+    with METRICS.measure("rates_download"):
+        data, changed = client.get_json(api_url, timeout, cancel_event)
+    if data is None or (cancel_event is not None and cancel_event.is_set()):
+        return None
+    # Save the fetched exchange rates, unless the server said nothing changed
+    if changed:
+        with METRICS.measure("rates_file_write"):
+            write_snapshot(rates_file, data['rates'], data.get('base', "USD"), time.time())
+    return data
+
+
+# Map a column of currency codes to positions in `codes` (a pandas Index), -1 for unknown codes.
+# Codes are factorized first so the upper-casing and lookup only run once per distinct code.
+def currency_code_indexer(codes, column):
+    import pandas as pd
+    inverse, uniques = pd.factorize(np.asarray(column, dtype=object))
+    positions = codes.get_indexer(pd.Index([str(code).strip().upper() for code in uniques]))
+    result = positions[inverse]
+    result[inverse < 0] = -1
+    return result
+
+
+# Map a column of currency codes to currency registry ids, -1 for unknown codes
+def currency_ids(column):
+    return currency_code_indexer(currency_registry.CURRENCY_INDEX, column)
+
+
+# Convert many amounts in one vectorized pass. amounts, source_codes and target_codes are equal-length
+# sequences (lists, numpy arrays or pandas Series) and rates is either a CrossRateMatrix or a dict mapping
+# currency code -> units per 1 USD. Rows with a negative amount or an unknown currency code come back as NaN.
+def convert_batch(amounts, source_codes, target_codes, rates):
+    cross_rates = rates if isinstance(rates, CrossRateMatrix) else CrossRateMatrix(rates)
+
+    amounts = np.asarray(amounts, dtype=float)
+    pair_rates = cross_rates.matrix[cross_rates.indexes(source_codes), cross_rates.indexes(target_codes)]
+
+    converted = amounts * pair_rates
+    converted[amounts < 0] = np.nan
+    return converted
+
+
+# Convert a DataFrame with amount / source_currency / target_currency columns, adding a converted_amount column
+def convert_dataframe(df, rates, amount_column="amount", source_column="source_currency",
+                      target_column="target_currency"):
+    df = df.copy()
+    df["converted_amount"] = convert_batch(df[amount_column], df[source_column], df[target_column], rates)
+    return df
+
+
+# Write a {code: rate} table to an Excel sheet with Currency Code / Exchange Rate columns
+def export_rates_to_excel(rates, filename=EXPORT_FILE):
+    import pandas as pd
+    df = pd.DataFrame(list(rates.items()), columns=['Currency Code', 'Exchange Rate'])
+    df.to_excel(filename, index=False)
+    return filename
+
+
+# Convert a CSV, Parquet or xlsx file with amount / source_currency / target_currency columns and write the
+# result next to it (or to output_path). The file is streamed in chunks by batch_pipeline.convert_stream, so
+# memory stays bounded however large it is. Returns (output_path, number of rows).
+def convert_file(input_path, rates, output_path=None, progress=None):
+    from batch_pipeline import convert_stream
+    return convert_stream(input_path, rates, output_path, progress=progress)
+
+
+# Append-only conversion history in a JSON Lines file. Appending an entry is one write at the end of the
+# file, independent of how much history there is. An in-memory index of (timestamp, byte offset) per line
+# lets readers seek straight to any entry and lets retention find its cutoff with a binary search.
+# Entries older than the retention window or beyond max_entries are dropped by a background compaction
+# that copies the surviving tail of the file and atomically swaps it in.
+class HistoryStore:
+    def __init__(self, filename=HISTORY_FILE, retention_days=HISTORY_RETENTION_DAYS,
+                 max_entries=MAX_HISTORY_ENTRIES):
+        self.filename = filename
+        self.retention = timedelta(days=retention_days)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Unboxed arrays, so the index of MAX_HISTORY_ENTRIES entries takes about 20 MB
+        self._timestamps = array('d')  # Epoch seconds of each entry, in file (= chronological) order
+        self._offsets = array('q')  # Byte offset of each entry in the file (not contiguous: bad lines are skipped)
+        # Currency registry ids of each entry's source and target currency (-1 if unknown)
+        self._from_ids = array('h')
+        self._to_ids = array('h')
+        self._size = 0
+        self._compacting = False
+        self._indexed = threading.Event()
+        self.dropped = 0  # Entries removed by compaction since the store was opened (index i is entry dropped + i)
+
+        if not os.path.exists(self.filename) and os.path.exists(LEGACY_HISTORY_FILE):
+            self._import_legacy_history()
+        # Indexing a large file takes a while, so it runs on its own thread; readers wait for it, appends don't
+        threading.Thread(target=self._build_index, daemon=True, name="history-index").start()
+
+    def _import_legacy_history(self):
+        # One-time migration of the old conversion_history.json list
+        try:
+            with open(LEGACY_HISTORY_FILE, 'r') as file:
+                history = json.load(file)
+        except json.decoder.JSONDecodeError:
+            history = []
+        with open(self.filename, 'w') as file:
+            for entry in history:
+                file.write(json.dumps(entry) + "\n")
+
+    def _build_index(self):
+        # Scan the file without the lock, then, holding it, the lines appended meanwhile; from then on append()
+        # keeps the index up to date itself
+        try:
+            size = self._index_lines(0)
+            with self._lock:
+                self._index_lines(size)
+                self._indexed.set()
+        finally:
+            self._indexed.set()  # Also after an error, so readers don't wait forever
+
+    def _index_lines(self, offset):
+        # Add the lines from byte `offset` to the end of the file to the index, returns the new end offset
+        if not os.path.exists(self.filename):
+            return offset
+        hours = {}  # "YYYY-MM-DD HH" -> epoch seconds, one strptime per hour of history instead of per line
+        with open(self.filename, 'rb') as file:
+            file.seek(offset)
+            for line in file:
+                match = HISTORY_LINE_PREFIX.match(line)
+                if match is not None and line.endswith(b"}\n") and line.count(b"{") == 1:
+                    hour, minutes, seconds, from_code, to_code = match.groups()
+                    if hour not in hours:
+                        hours[hour] = datetime.strptime(hour.decode('ascii'), "%Y-%m-%d %H").timestamp()
+                    timestamp = hours[hour] + int(minutes) * 60 + int(seconds)
+                    from_id = CURRENCY_IDS.get(from_code.decode('ascii'), -1)
+                    to_id = CURRENCY_IDS.get(to_code.decode('ascii'), -1)
+                else:
+                    try:
+                        entry = json.loads(line)
+                        timestamp = datetime.strptime(entry["timestamp"], HISTORY_TIMESTAMP_FORMAT).timestamp()
+                    except (ValueError, KeyError):
+                        # Skip a torn or corrupt line, e.g. from a crash in the middle of an append
+                        offset += len(line)
+                        continue
+                    from_id = CURRENCY_IDS.get(entry.get("from_currency"), -1)
+                    to_id = CURRENCY_IDS.get(entry.get("to_currency"), -1)
+                self._timestamps.append(timestamp)
+                self._offsets.append(offset)
+                self._from_ids.append(from_id)
+                self._to_ids.append(to_id)
+                offset += len(line)
+        self._size = offset
+        return offset
+
+    @property
+    def indexed(self):
+        # False while the file is still being indexed; readers called before then block until it is done
+        return self._indexed.is_set()
+
+    def __len__(self):
+        self._indexed.wait()
+        return len(self._offsets)
+
+    def append(self, entry):
+        line = (json.dumps(entry) + "\n").encode('utf-8')
+        timestamp = datetime.strptime(entry["timestamp"], HISTORY_TIMESTAMP_FORMAT).timestamp()
+        with self._lock:
+            with open(self.filename, 'ab') as file:
+                file.write(line)
+            if not self._indexed.is_set():
+                return  # The indexing thread picks the line up
+            self._timestamps.append(timestamp)
+            self._offsets.append(self._size)
+            self._from_ids.append(CURRENCY_IDS.get(entry["from_currency"], -1))
+            self._to_ids.append(CURRENCY_IDS.get(entry["to_currency"], -1))
+            self._size += len(line)
+        if self._needs_compaction():
+            self.compact_in_background()
+
+    def entries(self, start=0, stop=None):
+        # Lazily read entries [start, stop) in chronological order. Each chunk is read with the lock held, so a
+        # compaction can only run between chunks; entries it removes meanwhile are skipped.
+        self._indexed.wait()
+        with self._lock:
+            numbers = range(len(self._offsets))[start:stop]
+            number, end = self.dropped + numbers.start, self.dropped + numbers.stop
+        while number < end:
+            with self._lock:
+                first = max(number - self.dropped, 0)
+                last = min(end - self.dropped, first + HISTORY_READ_CHUNK, len(self._offsets))
+                if first >= last:
+                    return
+                chunk = self._read_range(first, last)
+                number = self.dropped + last
+            yield from chunk
+
+    def _read_range(self, first, last):
+        # Entries [first, last) read in one block; called with the lock held. Each entry is cut at its own line
+        # end, since a skipped (torn or corrupt) line may sit between two indexed ones.
+        base = self._offsets[first]
+        end = self._offsets[last] if last < len(self._offsets) else self._size
+        with open(self.filename, 'rb') as file:
+            file.seek(base)
+            data = file.read(end - base)
+        entries = []
+        for offset in self._offsets[first:last]:
+            position = offset - base
+            line_end = data.find(b"\n", position)
+            entries.append(json.loads(data[position:line_end if line_end >= 0 else None]))
+        return entries
+
+    def entries_at(self, indexes):
+        # The entries at the given (ascending) indexes, e.g. one page of search matches. The lock is held while
+        # reading, so the offsets can't be invalidated by a compaction swapping the file.
+        self._indexed.wait()
+        entries = []
+        with self._lock, open(self.filename, 'rb') as file:
+            for i in indexes:
+                file.seek(self._offsets[i])
+                entries.append(json.loads(file.readline()))
+        return entries
+
+    def entry_indexes_for_currency(self, currency_code):
+        # Indexes of the entries converting from or to currency_code, found from the id arrays without
+        # reading the file
+        return self.entry_indexes_for_currencies([currency_code])
+
+    def entry_indexes_for_currencies(self, currency_codes):
+        # Same for any of several codes; codes outside the registry (None included) match the entries whose
+        # currencies are not in the registry
+        positions = [CURRENCY_IDS.get(code, -1) for code in currency_codes]
+        self._indexed.wait()
+        with self._lock:
+            from_ids = np.frombuffer(self._from_ids, dtype=np.int16).copy()
+            to_ids = np.frombuffer(self._to_ids, dtype=np.int16).copy()
+        return np.flatnonzero(np.isin(from_ids, positions) | np.isin(to_ids, positions))
+
+    def latest(self, count):
+        # The most recent `count` entries, newest first
+        return list(reversed(list(self.entries(max(0, len(self) - count)))))
+
+    def _cutoff_index(self):
+        # Index of the first entry to keep after applying the retention window and the entry cap
+        cutoff = (datetime.now() - self.retention).timestamp()
+        first = bisect.bisect_right(self._timestamps, cutoff)
+        return max(first, len(self._offsets) - self.max_entries)
+
+    def _needs_compaction(self):
+        # Allow some slack so compaction runs occasionally rather than on every append
+        if self._compacting or not self._timestamps:
+            return False
+        expired = self._timestamps[0] < (datetime.now() - self.retention - timedelta(hours=1)).timestamp()
+        return expired or len(self._offsets) > self.max_entries * 1.1
+
+    def compact_in_background(self):
+        self._compacting = True
+        threading.Thread(target=self.compact, daemon=True).start()
+
+    def compact(self):
+        self._indexed.wait()
+        try:
+            with self._lock:
+                first = self._cutoff_index()
+                if first == 0:
+                    return
+                # Every entry expired: the file is truncated (keeping only what is appended while copying)
+                start = self._offsets[first] if first < len(self._offsets) else self._size
+                end = self._size
+
+            # Copy the surviving entries without holding the lock, so appends can continue meanwhile
+            temp_filename = self.filename + '.tmp'
+            with open(self.filename, 'rb') as source, open(temp_filename, 'wb') as target:
+                source.seek(start)
+                target.write(source.read(end - start))
+
+            with self._lock:
+                # Pick up anything appended while copying, then swap the files (both closed first, which
+                # os.replace needs on Windows)
+                with open(self.filename, 'rb') as source, open(temp_filename, 'ab') as target:
+                    source.seek(end)
+                    target.write(source.read())
+                    target.flush()
+                    os.fsync(target.fileno())
+                os.replace(temp_filename, self.filename)
+                del self._timestamps[:first]
+                del self._from_ids[:first]
+                del self._to_ids[:first]
+                self._offsets = array('q', (np.frombuffer(self._offsets, dtype=np.int64)[first:] - start).tobytes())
+                self._size -= start
+                self.dropped += first
+        finally:
+            self._compacting = False
+
+
+# One line of the View Conversion History tab
+def format_history_entry(entry):
+    return (f"{entry['timestamp']}: {entry['amount']:.2f} {entry['from_currency']} => "
+            f"{entry['converted_amount']:.2f} {entry['to_currency']}")
+
+
+# Model behind the View Conversion History tab. Pages are read from the history store through its offset index
+# when they are shown, so only the current page (and, while searching, the indexes of the matching entries)
+# is kept in memory. It serves newest-first pages, optionally filtered by a search query, and notifies
+# listeners about each new entry, so the view only has to insert one line per conversion instead of redrawing.
+class ConversionHistoryModel:
+    def __init__(self, store):
+        self.store = store
+        self.query = ""
+        self._matches = None  # Store entry numbers (dropped + index) matching self.query, ascending
+        self._search = None  # [next entry number, end, matches appended meanwhile] of a running chunked search
+        self._page = (None, [])  # (key, lines) of the last page served
+        self._listeners = []
+
+    def add_listener(self, callback):
+        # callback(line) is called for every appended entry that matches the current filter
+        self._listeners.append(callback)
+
+    def append(self, entry):
+        # Called after the entry was appended to the store
+        line = format_history_entry(entry)
+        if self._matches is not None:
+            if self.query not in line.lower():
+                return
+            number = self.store.dropped + len(self.store) - 1
+            if self._search is not None:
+                self._search[2].append(number)  # Past the end of the running scan, added when it completes
+                return
+            self._matches.append(number)
+        for callback in self._listeners:
+            callback(line)
+
+    def set_filter(self, query, chunked=False):
+        # Only the numbers of the matching entries are kept. Queries made of letters only can just match the
+        # currency codes and are answered from the store's currency id arrays; any other query scans the
+        # store, all at once or, with chunked=True, one search_step() at a time.
+        self.query = query.strip().lower()
+        self._page = (None, [])
+        self._search = None
+        if not self.query:
+            self._matches = None
+            return
+        first = self.store.dropped
+        if self.query.isalpha():
+            codes = [code for code in CURRENCY_CODES if self.query in code.lower()]
+            matches = self.store.entry_indexes_for_currencies(codes)
+            # Entries with currencies outside the registry are checked by reading them
+            unknown = self.store.entry_indexes_for_currencies([None]).tolist()
+            unknown = [i for i, entry in zip(unknown, self.store.entries_at(unknown))
+                       if self.query in format_history_entry(entry).lower()]
+            self._matches = array('q', (np.union1d(matches, unknown).astype(np.int64) + first).tolist())
+            return
+        self._matches = array('q')
+        self._search = [first, first + len(self.store), array('q')]  # Next entry, end, matches appended since
+        while not chunked and not self.search_step(len(self.store)):
+            pass
+
+    @property
+    def searching(self):
+        # True while a chunked search is still scanning the store
+        return self._search is not None
+
+    def search_step(self, limit=HISTORY_SEARCH_CHUNK):
+        # Scan up to `limit` more entries for the current query, returns True once the search is complete
+        if self._search is None:
+            return True
+        position, stop, appended = self._search
+        first = self.store.dropped
+        position = max(position, first)  # Entries compacted away meanwhile are skipped
+        end = min(stop, position + limit)
+        for number, entry in enumerate(self.store.entries(position - first, end - first), position):
+            if self.query in format_history_entry(entry).lower():
+                self._matches.append(number)
+        if end < stop:
+            self._search[0] = end
+            return False
+        self._matches.extend(appended)
+        self._search = None
+        return True
+
+    def _live_matches(self):
+        # Forget the matches that compaction removed from the store
+        if self._matches and self._matches[0] < self.store.dropped:
+            del self._matches[:bisect.bisect_left(self._matches, self.store.dropped)]
+        return self._matches
+
+    def __len__(self):
+        # Number of entries matching the current filter
+        return len(self.store) if self._matches is None else len(self._live_matches())
+
+    def page_count(self, page_size=HISTORY_PAGE_SIZE):
+        return max(1, -(-len(self) // page_size))
+
+    def page(self, number, page_size=HISTORY_PAGE_SIZE):
+        # Lines of page `number` (0 is the most recent page), newest first
+        end = len(self) - number * page_size
+        start = max(0, end - page_size)
+        if end <= 0:
+            return []
+        key = (self.query, self.store.dropped, start, end)
+        if self._page[0] == key:
+            return self._page[1]
+        if self._matches is None:
+            entries = self.store.entries(start, end)
+        else:
+            first = self.store.dropped
+            entries = self.store.entries_at([i - first for i in self._matches[start:end]])
+        lines = [format_history_entry(entry) for entry in entries][::-1]
+        self._page = (key, lines)
+        return lines
+
+
+# Where exchange rate snapshots come from: the rates API, with the snapshot file as a fallback
+class RateProvider:
+    def __init__(self, api_url=API_URL, rates_file=RATES_FILE, timeout=REQUEST_TIMEOUT, client=None):
+        self.api_url = api_url
+        self.rates_file = rates_file
+        self.timeout = timeout
+        self._client = client
+
+    @property
+    def client(self):
+        # The shared client is created on first use, i.e. on the refresh worker thread in the GUI
+        return self._client or get_rate_fetch_client()
+
+    def fetch(self, cancel_event=None):
+        # Blocking download of the latest snapshot ({"base": ..., "rates": {...}}), also saved to the snapshot file
+        return download_exchange_rates(self.api_url, self.timeout, cancel_event, self.client, self.rates_file)
+
+    def load_cached(self):
+        # Rates from the snapshot file (or the old JSON file next to it) and when they were fetched. Raises
+        # FileNotFoundError if neither holds a valid snapshot, so a damaged file is treated like a missing one.
+        legacy_file = os.path.join(os.path.dirname(self.rates_file), LEGACY_RATES_FILE)
+        errors = []
+        for read, filename in ((read_snapshot, self.rates_file), (read_legacy_rates, legacy_file)):
+            try:
+                rates, _, fetched_at = read(filename)
+                return rates, fetched_at
+            except (FileNotFoundError, SnapshotError) as e:
+                errors.append(f"{filename}: {e}")
+        raise FileNotFoundError("No valid cached exchange rates. " + "; ".join(errors))
+
+
+# Headless currency converter combining the rate provider, the rate cache, connectivity tracking and the
+# history store. All methods are synchronous; the Tk app runs refreshes on its own background worker instead.
+class CurrencyConverter:
+    def __init__(self, provider=None, history_store=None, ttl=RATES_TTL_SECONDS, rate_history=None):
+        self.provider = provider or RateProvider()
+        self.rate_cache = RateCache(ttl)
+        self.connectivity = ConnectivityMonitor()
+        self._history_store = history_store
+        self._rate_history = rate_history
+        self._fixed_point_rates = (None, None)  # (snapshot fetched_at, FixedPointRates of that snapshot)
+
+    @property
+    def history_store(self):
+        # Opened on first use, so conversions that never log history don't pay for indexing the file
+        if self._history_store is None:
+            self._history_store = HistoryStore()
+        return self._history_store
+
+    @property
+    def rate_history(self):
+        # Columnar store of every fetched snapshot (rate_history.py), opened on first use
+        if self._rate_history is None:
+            from rate_history import RateHistoryStore
+            self._rate_history = RateHistoryStore()
+        return self._rate_history
+
+    def store_snapshot(self, data):
+        # Snapshots another process fetched (shared_rates.py) are not refreshes of this one
+        source = "shared" if data.get('shared') else "api"
+        self.rate_cache.store(data['rates'], source, data.get('base', "USD"), data.get('fetched_at'))
+        # Keep the snapshot for history queries, stamped with the local fetch time so snapshots of different
+        # providers stay in order after a failover; the provider's publication time is kept as metadata.
+        # Snapshots fetched by another process (shared_rates.py) are recorded by that process.
+        if not data.get('shared'):
+            self.rate_history.append(data['rates'], data.get('fetched_at'), data.get('time_last_updated'))
+        return data['rates']
+
+    def load_cached_rates(self):
+        # Load the snapshot file with its real fetch time, so it is fresh or stale according to its actual age
+        rates, fetched_at = self.provider.load_cached()
+        self.rate_cache.store(rates, "file", "USD", fetched_at)
+        return rates
+
+    def refresh(self):
+        # Fetch a new snapshot now, recording the outcome for connectivity tracking
+        import requests
+        started = time.monotonic()
+        try:
+            data = self.provider.fetch()
+        except (requests.RequestException, ValueError, KeyError) as e:
+            self.connectivity.record_failure(str(e))
+            raise
+        self.connectivity.record_success(time.monotonic() - started)
+        return self.store_snapshot(data)
+
+    def rates(self):
+        # Fresh rates from memory, refreshing synchronously once the snapshot has expired. Falls back to the
+        # stale snapshot or the snapshot file when the API can't be reached.
+        import requests
+        rates = self.rate_cache.get()
+        if rates is not None:
+            return rates
+        if self.connectivity.should_attempt():
+            try:
+                return self.refresh()
+            except (requests.RequestException, ValueError, KeyError):
+                pass
+        if not self.rate_cache.rates:
+            try:
+                self.load_cached_rates()
+            except FileNotFoundError:
+                return {}
+        return self.rate_cache.rates
+
+    def convert(self, amount, source_currency, target_currency):
+        # Convert with the cached snapshot (call rates() first to make sure it is loaded).
+        # Raises ValueError with a user-facing message for invalid input.
+        amount = float(amount)
+        if not math.isfinite(amount) or amount < 0:
+            raise ValueError("Invalid input for amount. Please enter a valid number.")
+
+        source_currency = source_currency.upper()
+        target_currency = target_currency.upper()
+        if not is_valid_currency(source_currency) or not is_valid_currency(target_currency):
+            raise ValueError("Invalid currency code. Please recheck Source and Target currency and enter a valid "
+                             "currency code.")
+
+        rate = self.rate_cache.cross_rates.rate(source_currency, target_currency)
+        if rate is None:
+            raise ValueError("No exchange rate available for this currency pair. "
+                             "Please choose from the supported currencies.")
+        return amount * rate
+
+    def convert_batch(self, amounts, source_codes, target_codes):
+        return convert_batch(amounts, source_codes, target_codes, self.rate_cache.cross_rates)
+
+    def fixed_point_rates(self):
+        # Integer pair factors (fixed_point.py) of the current snapshot, rebuilt when the snapshot changes
+        from fixed_point import FixedPointRates
+        fetched_at, rates = self._fixed_point_rates
+        if rates is None or fetched_at != self.rate_cache.fetched_at:
+            rates = FixedPointRates(self.rate_cache.cross_rates)
+            self._fixed_point_rates = (self.rate_cache.fetched_at, rates)
+        return rates
+
+    def convert_exact(self, amount, source_currency, target_currency):
+        # Like convert(), but in integer minor units: amount is a string or Decimal and the result is a Decimal
+        # rounded half-even to the target currency's minor unit. Raises ValueError for invalid input.
+        from fixed_point import convert_decimal
+        try:
+            amount = Decimal(str(amount).strip())
+        except InvalidOperation:
+            raise ValueError("Invalid input for amount. Please enter a valid number.")
+        if not amount.is_finite() or amount < 0:
+            raise ValueError("Invalid input for amount. Please enter a valid number.")
+
+        source_currency = source_currency.upper()
+        target_currency = target_currency.upper()
+        if not is_valid_currency(source_currency) or not is_valid_currency(target_currency):
+            raise ValueError("Invalid currency code. Please recheck Source and Target currency and enter a valid "
+                             "currency code.")
+
+        converted_amount = convert_decimal(amount, source_currency, target_currency, self.fixed_point_rates())
+        if converted_amount is None:
+            raise ValueError("No exchange rate available for this currency pair. "
+                             "Please choose from the supported currencies.")
+        return converted_amount
+
+    def convert_as_of(self, amount, source_currency, target_currency, when):
+        # Convert with the rates that were in effect at `when` (a datetime or epoch seconds), e.g. to re-run
+        # the conversion of a past transaction. Raises ValueError like convert().
+        timestamp = when.timestamp() if isinstance(when, datetime) else float(when)
+        amount = float(amount)
+        if not math.isfinite(amount) or amount < 0:
+            raise ValueError("Invalid input for amount. Please enter a valid number.")
+        rate = self.rate_history.rate_as_of(source_currency.upper(), target_currency.upper(), timestamp)
+        if rate is None:
+            raise ValueError("No stored exchange rate for this currency pair at that time.")
+        return amount * rate
+
+    def convert_batch_as_of(self, amounts, source_codes, target_codes, timestamps):
+        # Batch version of convert_as_of, timestamps are epoch seconds (sorted streams are matched fastest)
+        return self.rate_history.convert_batch_as_of(amounts, source_codes, target_codes, timestamps)
+
+    def log_conversion(self, from_currency, to_currency, amount, converted_amount):
+        log_entry = {"timestamp": datetime.now().strftime(HISTORY_TIMESTAMP_FORMAT), "from_currency": from_currency,
+                     "to_currency": to_currency, "amount": amount, "converted_amount": converted_amount}
+        self.history_store.append(log_entry)
+        return log_entry
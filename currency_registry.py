@@ -0,0 +1,270 @@
+import sys
+from bisect import bisect_left
+from collections import namedtuple
+
+# Registry of the currencies supported by the converter, built once at import. Every currency gets a small
+# integer id (its position in CURRENCY_CODES); the ids are the shared key for rate arrays (CrossRateMatrix,
+# RateHistoryStore), the history store index and the batch engine, so hot paths index arrays instead of
+# hashing strings. Codes are interned, so equal codes are the same object.
+
+# Currency codes supported by the converter and their names
+CURRENCY_NAMES = {
+    "USD": "United States Dollar",
+    "AED": "United Arab Emirates Dirham",
+    "AFN": "Afghan Afghani",
+    "ALL": "Albanian Lek",
+    "AMD": "Armenian Dram",
+    "ANG": "Netherlands Antillean Guilder",
+    "AOA": "Angolan Kwanza",
+    "ARS": "Argentine Peso",
+    "AUD": "Australian Dollar",
+    "AWG": "Aruban Florin",
+    "AZN": "Azerbaijani Manat",
+    "BAM": "Bosnia-Herzegovina Convertible Mark",
+    "BBD": "Barbadian Dollar",
+    "BDT": "Bangladeshi Taka",
+    "BGN": "Bulgarian Lev",
+    "BHD": "Bahraini Dinar",
+    "BIF": "Burundian Franc",
+    "BMD": "Bermudian Dollar",
+    "BND": "Brunei Dollar",
+    "BOB": "Bolivian Boliviano",
+    "BRL": "Brazilian Real",
+    "BSD": "Bahamian Dollar",
+    "BTN": "Bhutanese Ngultrum",
+    "BWP": "Botswanan Pula",
+    "BYN": "Belarusian Ruble",
+    "BZD": "Belize Dollar",
+    "CAD": "Canadian Dollar",
+    "CDF": "Congolese Franc",
+    "CHF": "Swiss Franc",
+    "CLP": "Chilean Peso",
+    "CNY": "Chinese Yuan",
+    "COP": "Colombian Peso",
+    "CRC": "Costa Rican Colón",
+    "CUP": "Cuban Peso",
+    "CVE": "Cape Verdean Escudo",
+    "CZK": "Czech Republic Koruna",
+    "DJF": "Djiboutian Franc",
+    "DKK": "Danish Krone",
+    "DOP": "Dominican Peso",
+    "DZD": "Algerian Dinar",
+    "EGP": "Egyptian Pound",
+    "ERN": "Eritrean Nakfa",
+    "ETB": "Ethiopian Birr",
+    "EUR": "Euro",
+    "FJD": "Fijian Dollar",
+    "FKP": "Falkland Islands Pound",
+    "FOK": "Faroese Króna",
+    "GBP": "British Pound Sterling",
+    "GEL": "Georgian Lari",
+    "GGP": "Guernsey Pound",
+    "GHS": "Ghanaian Cedi",
+    "GIP": "Gibraltar Pound",
+    "GMD": "Gambian Dalasi",
+    "GNF": "Guinean Franc",
+    "GTQ": "Guatemalan Quetzal",
+    "GYD": "Guyanaese Dollar",
+    "HKD": "Hong Kong Dollar",
+    "HNL": "Honduran Lempira",
+    "HRK": "Croatian Kuna",
+    "HTG": "Haitian Gourde",
+    "HUF": "Hungarian Forint",
+    "IDR": "Indonesian Rupiah",
+    "ILS": "Israeli New Shekel",
+    "IMP": "Isle of Man Pound",
+    "INR": "Indian Rupee",
+    "IQD": "Iraqi Dinar",
+    "IRR": "Iranian Rial",
+    "ISK": "Icelandic Króna",
+    "JEP": "Jersey Pound",
+    "JMD": "Jamaican Dollar",
+    "JOD": "Jordanian Dinar",
+    "JPY": "Japanese Yen",
+    "KES": "Kenyan Shilling",
+    "KGS": "Kyrgystani Som",
+    "KHR": "Cambodian Riel",
+    "KID": "Kiribati Dollar",
+    "KMF": "Comorian Franc",
+    "KRW": "South Korean Won",
+    "KWD": "Kuwaiti Dinar",
+    "KYD": "Cayman Islands Dollar",
+    "KZT": "Kazakhstani Tenge",
+    "LAK": "Laotian Kip",
+    "LBP": "Lebanese Pound",
+    "LKR": "Sri Lankan Rupee",
+    "LRD": "Liberian Dollar",
+    "LSL": "Lesotho Loti",
+    "LYD": "Libyan Dinar",
+    "MAD": "Moroccan Dirham",
+    "MDL": "Moldovan Leu",
+    "MGA": "Malagasy Ariary",
+    "MKD": "Macedonian Denar",
+    "MMK": "Myanma Kyat",
+    "MNT": "Mongolian Tugrik",
+    "MOP": "Macanese Pataca",
+    "MRU": "Mauritanian Ouguiya",
+    "MUR": "Mauritian Rupee",
+    "MVR": "Maldivian Rufiyaa",
+    "MWK": "Malawian Kwacha",
+    "MXN": "Mexican Peso",
+    "MYR": "Malaysian Ringgit",
+    "MZN": "Mozambican Metical",
+    "NAD": "Namibian Dollar",
+    "NGN": "Nigerian Naira",
+    "NIO": "Nicaraguan Córdoba",
+    "NOK": "Norwegian Krone",
+    "NPR": "Nepalese Rupee",
+    "NZD": "New Zealand Dollar",
+    "OMR": "Omani Rial",
+    "PAB": "Panamanian Balboa",
+    "PEN": "Peruvian Nuevo Sol",
+    "PGK": "Papua New Guinean Kina",
+    "PHP": "Philippine Peso",
+    "PKR": "Pakistani Rupee",
+    "PLN": "Polish Złoty",
+    "PYG": "Paraguayan Guarani",
+    "QAR": "Qatari Rial",
+    "RON": "Romanian Leu",
+    "RSD": "Serbian Dinar",
+    "RUB": "Russian Ruble",
+    "RWF": "Rwandan Franc",
+    "SAR": "Saudi Riyal",
+    "SBD": "Solomon Islands Dollar",
+    "SCR": "Seychellois Rupee",
+    "SDG": "Sudanese Pound",
+    "SEK": "Swedish Krona",
+    "SGD": "Singapore Dollar",
+    "SHP": "Saint Helena Pound",
+    "SLE": "Sierra Leonean Leone",
+    "SLL": "Sierra Leonean Leone (old)",
+    "SOS": "Somali Shilling",
+    "SRD": "Surinamese Dollar",
+    "SSP": "South Sudanese Pound",
+    "STN": "São Tomé and Príncipe Dobra",
+    "SYP": "Syrian Pound",
+    "SZL": "Swazi Lilangeni",
+    "THB": "Thai Baht",
+    "TJS": "Tajikistani Somoni",
+    "TMT": "Turkmenistani Manat",
+    "TND": "Tunisian Dinar",
+    "TOP": "Tongan Pa'anga",
+    "TRY": "Turkish Lira",
+    "TTD": "Trinidad and Tobago Dollar",
+    "TVD": "Tuvaluan Dollar",
+    "TWD": "New Taiwan Dollar",
+    "TZS": "Tanzanian Shilling",
+    "UAH": "Ukrainian Hryvnia",
+    "UGX": "Ugandan Shilling",
+    "UYU": "Uruguayan Peso",
+    "UZS": "Uzbekistan Som",
+    "VES": "Venezuelan Bolívar",
+    "VND": "Vietnamese Đồng",
+    "VUV": "Vanuatu Vatu",
+    "WST": "Samoan Tala",
+    "XAF": "Central African CFA Franc",
+    "XCD": "East Caribbean Dollar",
+    "XDR": "Special Drawing Rights",
+    "XOF": "West African CFA Franc",
+    "XPF": "CFP Franc",
+    "YER": "Yemeni Rial",
+    "ZAR": "South African Rand",
+    "ZMW": "Zambian Kwacha",
+    "ZWL": "Zimbabwean Dollar"
+}
+
+# ISO 4217 minor units (digits after the decimal point) for currencies that don't use 2
+MINOR_UNITS = {
+    **dict.fromkeys(["BIF", "CLP", "DJF", "GNF", "ISK", "JPY", "KMF", "KRW", "PYG", "RWF", "UGX", "VND", "VUV",
+                     "XAF", "XOF", "XPF"], 0),
+    **dict.fromkeys(["BHD", "IQD", "JOD", "KWD", "LYD", "OMR", "TND"], 3),
+}
+DEFAULT_MINOR_UNITS = 2
+
+# Display symbols of common currencies, the others are shown with their code
+CURRENCY_SYMBOLS = {
+    "USD": "$", "EUR": "€", "GBP": "£", "JPY": "¥", "CNY": "¥", "INR": "₹", "KRW": "₩", "RUB": "₽", "TRY": "₺",
+    "NGN": "₦", "PHP": "₱", "ILS": "₪", "VND": "₫", "UAH": "₴", "THB": "฿", "PLN": "zł", "CHF": "Fr",
+    "AUD": "A$", "CAD": "C$", "NZD": "NZ$", "HKD": "HK$", "SGD": "S$", "MXN": "Mex$", "BRL": "R$", "ZAR": "R",
+}
+
+Currency = namedtuple("Currency", ["id", "code", "name", "minor_units", "symbol"])
+
+CURRENCIES = tuple(
+    Currency(currency_id, sys.intern(code), name, MINOR_UNITS.get(code, DEFAULT_MINOR_UNITS),
+             CURRENCY_SYMBOLS.get(code, code))
+    for currency_id, (code, name) in enumerate(CURRENCY_NAMES.items())
+)
+CURRENCY_CODES = tuple(currency.code for currency in CURRENCIES)
+CURRENCY_IDS = {currency.code: currency.id for currency in CURRENCIES}
+CURRENCY_COUNT = len(CURRENCIES)
+_currency_index = None
+
+# Prefix index for autocomplete: sorted lower-case keys with the id of their currency, one array for the codes
+# and one for the names and every word of a name ("dollar" finds "Canadian Dollar"). A lookup is a bisect to
+# the first key with the prefix and a walk over the matching keys only.
+_CODE_KEYS = sorted((currency.code.lower(), currency.id) for currency in CURRENCIES)
+_NAME_KEYS = sorted({(key, currency.id) for currency in CURRENCIES
+                     for key in (currency.name.lower(), *currency.name.lower().split())})
+CODE_SEARCH_KEYS = [key for key, _ in _CODE_KEYS]
+CODE_SEARCH_IDS = [currency_id for _, currency_id in _CODE_KEYS]
+NAME_SEARCH_KEYS = [key for key, _ in _NAME_KEYS]
+NAME_SEARCH_IDS = [currency_id for _, currency_id in _NAME_KEYS]
+
+
+def __getattr__(name):
+    # CURRENCY_INDEX, a pandas Index over the codes for mapping whole columns of codes to ids, is built on first
+    # access so that importing the registry does not import pandas
+    global _currency_index
+    if name == "CURRENCY_INDEX":
+        if _currency_index is None:
+            import pandas as pd
+            _currency_index = pd.Index(CURRENCY_CODES)
+        return _currency_index
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def is_valid_currency(currency_code):
+    return currency_code in CURRENCY_IDS
+
+
+def currency_id(currency_code):
+    # Integer id of a currency code, or -1 if it is not supported
+    return CURRENCY_IDS.get(currency_code, -1)
+
+
+def get_currency(currency_code):
+    # Currency(id, code, name, minor_units, symbol), or None
+    position = CURRENCY_IDS.get(currency_code)
+    return None if position is None else CURRENCIES[position]
+
+
+def get_currency_name_by_code(currency_code):
+    position = CURRENCY_IDS.get(currency_code)
+    return "Unknown Currency" if position is None else CURRENCIES[position].name
+
+
+def search_currencies(prefix, limit=10):
+    # Currencies whose code, name or a word of the name starts with `prefix` (case-insensitive), code matches
+    # first (an exact code sorts before the longer keys it prefixes), at most `limit` of them
+    prefix = prefix.strip().lower()
+    if not prefix:
+        return []
+    found = []
+    for keys, ids in ((CODE_SEARCH_KEYS, CODE_SEARCH_IDS), (NAME_SEARCH_KEYS, NAME_SEARCH_IDS)):
+        position = bisect_left(keys, prefix)
+        while position < len(keys) and keys[position].startswith(prefix) and len(found) < limit:
+            if ids[position] not in found:
+                found.append(ids[position])
+            position += 1
+    return [CURRENCIES[currency_id] for currency_id in found]
+
+
+def resolve_currency_code(text):
+    # Currency code typed or picked in a currency field: "eur", "EUR - Euro", or a name prefix with a single
+    # match ("swiss"). Text that names no currency comes back upper-cased, for the error message.
+    code = text.strip().split(" ", 1)[0].upper() if text.strip() else ""
+    if code in CURRENCY_IDS:
+        return code
+    matches = search_currencies(text, limit=2)
+    return matches[0].code if len(matches) == 1 else text.strip().upper()
@@ -0,0 +1,153 @@
+from decimal import Decimal, ROUND_HALF_EVEN
+from math import gcd
+
+import numpy as np
+
+from converter_core import CrossRateMatrix, currency_ids
+from currency_registry import CURRENCIES, CURRENCY_COUNT, CURRENCY_IDS
+
+# Exact conversion in integer minor units (cents, yen, fils, ...). Amounts are int64 counts of the currency's
+# minor unit from the registry and rates are scaled integers: a published rate of 83.1245 INR per USD is
+# 831245 / 10**4. The factor of a currency pair, with the minor-unit difference folded in, is therefore an
+# exact fraction numerator / denominator, and
+#
+#   converted minor units = round_half_even(amount minor units * numerator / denominator)
+#
+# is computed without binary floating point rounding anywhere. The batch path does it on int64 numpy
+# arrays: a float estimate of the quotient is corrected with the exact remainder, which int64 arithmetic
+# gives even when amount * numerator itself wraps around. Rows whose result is too large for that (or pairs
+# whose fraction does not fit in int64) are computed with Python integers, which is exact for any magnitude.
+
+INT64_SAFE = 2 ** 62  # Numerators and denominators must stay below this for the int64 path
+QUOTIENT_SAFE = 2.0 ** 50  # Quotients below this are estimated by float64 to within one unit
+
+MINOR_UNITS = np.array([currency.minor_units for currency in CURRENCIES], dtype=np.int64)
+POWERS_OF_TEN = 10 ** np.arange(19, dtype=np.int64)  # 10**0 .. 10**18, all exact in int64
+
+
+def to_minor_units(amount, currency_code):
+    # Exact minor units of an amount given as a string, int, Decimal or float ("12.345" EUR -> 1234, half-even)
+    minor_units = int(MINOR_UNITS[CURRENCY_IDS[currency_code]])
+    value = Decimal(amount if isinstance(amount, (str, int, Decimal)) else repr(amount))
+    return int(value.scaleb(minor_units).to_integral_value(rounding=ROUND_HALF_EVEN))
+
+
+def from_minor_units(minor_amount, currency_code):
+    # Decimal amount with the currency's number of decimals (1234 EUR -> Decimal("12.34"))
+    return Decimal(int(minor_amount)).scaleb(-int(MINOR_UNITS[CURRENCY_IDS[currency_code]]))
+
+
+def amounts_to_minor_units(amounts, currency_ids_column):
+    # Vectorized conversion of float amounts to int64 minor units. Exact for amounts that have no more
+    # decimals than their currency; unknown currencies (id -1) use 2 decimals.
+    digits = np.where(currency_ids_column >= 0, MINOR_UNITS[currency_ids_column], 2)
+    return np.rint(np.asarray(amounts, dtype=float) * POWERS_OF_TEN[digits]).astype(np.int64)
+
+
+def _round_div(numerators, divisors):
+    # Half-even rounded numerators / divisors for divisors > 0. Works the same on int64 arrays and Python ints.
+    quotients = numerators // divisors
+    twice_remainders = 2 * (numerators - quotients * divisors)
+    return quotients + ((twice_remainders > divisors) | ((twice_remainders == divisors) & (quotients % 2 == 1)))
+
+
+def _scaled_rate(rate):
+    # A rate as (integer, power of ten), from the shortest decimal of the float, i.e. the rate as published
+    _, digits, exponent = Decimal(repr(float(rate))).as_tuple()
+    return int(''.join(map(str, digits))), exponent
+
+
+# Exact pair factors of one rate snapshot, computed on first use from its {code: units per 1 USD} rates
+class FixedPointRates:
+    def __init__(self, rates):
+        cross_rates = rates if isinstance(rates, CrossRateMatrix) else CrossRateMatrix(rates)
+        self.usd_rates = cross_rates.usd_rates.copy()
+        self._factors = {}  # source id * CURRENCY_COUNT + target id -> (numerator, denominator) or None
+
+    def factor(self, source_id, target_id):
+        # (numerator, denominator) in lowest terms of minor units of target per minor unit of source, None if
+        # a rate is missing
+        key = source_id * CURRENCY_COUNT + target_id
+        if key not in self._factors:
+            source_rate = self.usd_rates[source_id]
+            target_rate = self.usd_rates[target_id]
+            if np.isnan(source_rate) or np.isnan(target_rate) or source_rate <= 0 or target_rate <= 0:
+                self._factors[key] = None
+            else:
+                source_digits, source_exponent = _scaled_rate(source_rate)
+                target_digits, target_exponent = _scaled_rate(target_rate)
+                exponent = int(target_exponent - source_exponent + MINOR_UNITS[target_id] - MINOR_UNITS[source_id])
+                numerator = target_digits * 10 ** max(exponent, 0)
+                denominator = source_digits * 10 ** max(-exponent, 0)
+                divisor = gcd(numerator, denominator)
+                self._factors[key] = (numerator // divisor, denominator // divisor)
+        return self._factors[key]
+
+
+def as_fixed_point_rates(rates):
+    return rates if isinstance(rates, FixedPointRates) else FixedPointRates(rates)
+
+
+# Convert one amount exactly. Returns a Decimal with the target currency's number of decimals, or None if
+# there is no rate for the pair. Codes must be valid registry codes.
+def convert_decimal(amount, source_currency, target_currency, rates):
+    rates = as_fixed_point_rates(rates)
+    factor = rates.factor(CURRENCY_IDS[source_currency], CURRENCY_IDS[target_currency])
+    if factor is None:
+        return None
+    numerator, denominator = factor
+    return from_minor_units(_round_div(to_minor_units(amount, source_currency) * numerator, denominator),
+                            target_currency)
+
+
+# Vectorized exact conversion. amounts are integer minor units of each row's source currency. Returns
+# (converted minor units as int64, valid) where valid is False for rows with a negative amount, an unknown
+# currency code or a missing rate (their converted value is 0).
+def convert_batch_minor(minor_amounts, source_codes, target_codes, rates):
+    rates = as_fixed_point_rates(rates)
+    minor_amounts = np.asarray(minor_amounts, dtype=np.int64)
+    sources = currency_ids(source_codes)
+    targets = currency_ids(target_codes)
+
+    # Factors are looked up once per distinct currency pair and spread to the rows through a pair table
+    known = (sources >= 0) & (targets >= 0)
+    pair_ids = np.where(known, sources * CURRENCY_COUNT + targets, 0)
+    pair_numerators = np.ones(CURRENCY_COUNT * CURRENCY_COUNT, dtype=np.int64)
+    pair_denominators = np.ones(CURRENCY_COUNT * CURRENCY_COUNT, dtype=np.int64)
+    pair_has_rate = np.zeros(CURRENCY_COUNT * CURRENCY_COUNT, dtype=bool)
+    pair_fits = np.zeros(CURRENCY_COUNT * CURRENCY_COUNT, dtype=bool)
+    for pair in np.flatnonzero(np.bincount(pair_ids[known], minlength=CURRENCY_COUNT * CURRENCY_COUNT)):
+        factor = rates.factor(*divmod(int(pair), CURRENCY_COUNT))
+        pair_has_rate[pair] = factor is not None
+        if factor is not None and max(factor) < INT64_SAFE:
+            pair_fits[pair] = True
+            pair_numerators[pair], pair_denominators[pair] = factor
+    numerators = pair_numerators[pair_ids]
+    denominators = pair_denominators[pair_ids]
+    valid = known & pair_has_rate[pair_ids] & (minor_amounts >= 0)
+
+    # Float estimate of the quotient, then the exact remainder amount * numerator - quotient * denominator.
+    # Both products may wrap around in int64, their difference is still exact because it is small.
+    estimates = minor_amounts * (numerators / denominators)
+    fast = valid & pair_fits[pair_ids] & (estimates < QUOTIENT_SAFE)
+    quotients = np.where(fast, np.floor(estimates), 0).astype(np.int64)
+    with np.errstate(over='ignore'):
+        remainders = minor_amounts * numerators - quotients * denominators
+    for _ in range(2):
+        low = remainders < 0
+        quotients -= low
+        remainders += np.where(low, denominators, 0)
+        high = remainders >= denominators
+        quotients += high
+        remainders -= np.where(high, denominators, 0)
+    twice_remainders = 2 * remainders
+    quotients += (twice_remainders > denominators) | ((twice_remainders == denominators) & (quotients % 2 == 1))
+
+    converted = np.where(fast, quotients, 0)
+    for row in np.flatnonzero(valid & ~fast):
+        numerator, denominator = rates.factor(int(sources[row]), int(targets[row]))
+        result = int(_round_div(int(minor_amounts[row]) * numerator, denominator))
+        if result >= 2 ** 63:
+            raise OverflowError(f"Converted amount of row {row} does not fit in int64")
+        converted[row] = result
+    return converted, valid
@@ -0,0 +1,118 @@
+import functools
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Lightweight latency instrumentation. Every timed operation feeds a histogram with fixed log-spaced buckets
+# (10 per decade from 10 µs to 100 s), so recording is one bisect and a counter increment and memory does not
+# grow with the number of calls. Percentiles are interpolated inside the bucket they fall in, which is
+# accurate to a few percent. Operations are recorded from any thread; the Performance tab and the exports read
+# a consistent snapshot.
+
+BUCKET_BOUNDS = tuple(1e-5 * 10 ** (i / 10) for i in range(71))  # Upper bounds in seconds, 10 µs .. 100 s
+PERCENTILES = (0.5, 0.95, 0.99)
+PROMETHEUS_METRIC = "currency_converter_latency_seconds"
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)  # The last bucket holds everything above 100 s
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, fraction):
+        # Estimated latency below which `fraction` of the observations fall, None without observations
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bucket, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = BUCKET_BOUNDS[bucket - 1] if bucket else 0.0
+                upper = BUCKET_BOUNDS[bucket] if bucket < len(BUCKET_BOUNDS) else self.max
+                estimate = lower + (upper - lower) * (rank - seen) / bucket_count
+                return min(max(estimate, self.min), self.max)
+            seen += bucket_count
+        return self.max
+
+    def summary(self):
+        summary = {"count": self.count, "sum": self.total, "min": self.min, "max": self.max,
+                   "mean": self.total / self.count if self.count else None}
+        for fraction in PERCENTILES:
+            summary[f"p{round(fraction * 100)}"] = self.percentile(fraction)
+        return summary
+
+
+class LatencyRegistry:
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def measure(self, name):
+        # with METRICS.measure("rates_file_write"): ...
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def timed(self, name):
+        # Decorator recording every call of the function under `name`, including calls that raise
+        def decorate(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - started)
+            return wrapper
+        return decorate
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+    def snapshot(self):
+        # {operation: {"count", "sum", "min", "max", "mean", "p50", "p95", "p99"}}, latencies in seconds
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in sorted(self._histograms.items())}
+
+    def to_json(self):
+        return json.dumps({"unit": "seconds", "operations": self.snapshot()}, indent=2)
+
+    def to_prometheus(self):
+        # Prometheus text exposition format, one summary with an operation label per timed operation
+        lines = [f"# HELP {PROMETHEUS_METRIC} Latency of currency converter operations.",
+                 f"# TYPE {PROMETHEUS_METRIC} summary"]
+        for name, summary in self.snapshot().items():
+            for fraction in PERCENTILES:
+                value = summary[f"p{round(fraction * 100)}"]
+                lines.append(f'{PROMETHEUS_METRIC}{{operation="{name}",quantile="{fraction}"}} {value!r}')
+            lines.append(f'{PROMETHEUS_METRIC}_sum{{operation="{name}"}} {summary["sum"]!r}')
+            lines.append(f'{PROMETHEUS_METRIC}_count{{operation="{name}"}} {summary["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by the converter core and the GUI
+METRICS = LatencyRegistry()
+timed = METRICS.timed
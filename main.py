@@ -1,10 +1,25 @@
+import time
+
+STARTED_AT = time.perf_counter()  # Start of the startup time measurement (--startup-time), before the imports
+
 import tkinter as tk
-from tkinter import ttk, messagebox
-import requests
-import json
-import pandas as pd
-from datetime import datetime, timedelta
+from tkinter import ttk, messagebox, filedialog
+import argparse
+import queue
+import threading
 import os
+import sys
+
+# Heavy modules are imported on first use: pandas by the batch/export paths, requests by the refresh worker
+from converter_core import (HISTORY_PAGE_SIZE, ONLINE, DEGRADED, CurrencyConverter, ConversionHistoryModel,
+                            RefreshSchedule, convert_file)
+import converter_core
+import currency_registry
+from latency_metrics import METRICS, timed
+from rate_providers import DEFAULT_PROVIDER_URLS, FIRST_VALID, MERGE_STRATEGIES, build_rate_source
+from shared_rates import build_shared_source
+
+IMPORTED_AT = time.perf_counter()
 
 # Color Scheme
 PRIMARY_COLOR = "#3498db"  # Blue
@@ -13,95 +28,225 @@ ACCENT_COLOR = "#e74c3c"  # Red
 BACKGROUND_COLOR = "#ecf0f1"  # Light Gray
 TEXT_COLOR = "#2c3e50"  # Dark Gray
 
+# How often (in milliseconds) the Tk main loop checks for results from the background refresh worker
+REFRESH_POLL_MS = 50
+
+# Pause in typing (in milliseconds) after which the Convert Currency tab updates its live result
+LIVE_CONVERSION_DELAY_MS = 150
+
+# How often (in milliseconds) the app looks for snapshots published by other processes (shared_rates.py)
+SHARED_RATES_POLL_MS = 1000
+
+# Delay (in milliseconds) before the currency suggestion list hides after its field lost the focus, so a click on
+# the list still picks the suggestion
+SUGGESTIONS_HIDE_DELAY_MS = 200
+
+# How often (in milliseconds) the History tab checks whether the history file has been indexed
+HISTORY_LOADING_POLL_MS = 100
+
+# How often (in milliseconds) the Performance tab redraws its latency table while it is selected
+PERFORMANCE_REFRESH_MS = 1000
+
 
-# Check if internet connection is available by attempting to make a request to Google.
-def is_internet_available():
+# Runs exchange rate refreshes on a background thread so the Tk event loop never blocks on network I/O.
+# Results are handed back to the main thread by polling a queue with root.after, because Tk widgets
+# must only be touched from the thread running mainloop().
+class RateRefreshWorker:
+    def __init__(self, root, provider):
+        self.root = root
+        self.provider = provider
+        self.refreshing = False
+        self._results = queue.Queue()
+        self._callbacks = []
+        self._generation = 0
+        self._cancel_event = threading.Event()
+
+    def refresh(self, on_done):
+        # on_done(data, error) is called on the Tk thread; concurrent requests share the running refresh
+        self._callbacks.append(on_done)
+        if self.refreshing:
+            return
+        self.refreshing = True
+        self._generation += 1
+        self._cancel_event = threading.Event()
+        thread = threading.Thread(target=self._run, args=(self._generation, self._cancel_event), daemon=True)
+        thread.start()
+        self.root.after(REFRESH_POLL_MS, self._poll)
+
+    def cancel(self):
+        # Abandon the running refresh, its result (if any) is discarded and the snapshot file is left untouched
+        self._cancel_event.set()
+        self._generation += 1
+        self._callbacks = []
+        self.refreshing = False
+
+    def _run(self, generation, cancel_event):
+        # Every failure is handed back as the error (not only network ones, e.g. an OSError writing the snapshot
+        # file), otherwise the refresh would never finish and the callbacks would never run
+        try:
+            data = self.provider.fetch(cancel_event)
+            self._results.put((generation, data, None))
+        except Exception as e:
+            self._results.put((generation, None, str(e)))
+
+    def _poll(self):
+        try:
+            generation, data, error = self._results.get_nowait()
+        except queue.Empty:
+            if self.refreshing:
+                self.root.after(REFRESH_POLL_MS, self._poll)
+            return
+
+        if generation != self._generation:
+            # Result of a cancelled refresh, keep waiting for the current one
+            self.root.after(REFRESH_POLL_MS, self._poll)
+            return
+
+        self.refreshing = False
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(data, error)
+
+
+# Command line entry point for batch conversion (python main.py --batch ledger.csv [more.csv ...] [--workers N])
+def run_batch_cli(input_paths, output_path=None, workers=1, provider=None):
+    import requests
+    converter = CurrencyConverter(provider)
+    # Start from the cached snapshot with its real age, so a recent one is used as is
     try:
-        response = requests.get('http://www.google.com', timeout=1)
-        response.raise_for_status()
-        return True
-    except requests.RequestException:
-        return False
+        converter.load_cached_rates()
+    except FileNotFoundError:
+        pass
+    if not converter.rate_cache.is_fresh():
+        try:
+            converter.refresh()
+        except (requests.RequestException, ValueError, KeyError) as e:
+            if not converter.rate_cache.rates:
+                raise
+            fetched = time.strftime("%Y-%m-%d %H:%M", time.localtime(converter.rate_cache.fetched_at))
+            print(f"Warning: could not refresh the exchange rates ({e}), using the cached rates from {fetched}",
+                  file=sys.stderr)
+    cross_rates = converter.rate_cache.cross_rates
+
+    def show_progress(done, fraction):
+        unit = "files" if len(input_paths) > 1 else "rows"
+        print(f"\rConverted {done:,} {unit} ({fraction:.0%})", end="", flush=True)
+
+    started = time.perf_counter()
+    if len(input_paths) > 1:
+        from parallel_batch import convert_files_parallel
+        results = convert_files_parallel(input_paths, cross_rates, workers=workers, progress=show_progress)
+    elif workers > 1:
+        from parallel_batch import convert_file_parallel
+        results = [convert_file_parallel(input_paths[0], cross_rates, output_path, workers, progress=show_progress)]
+    else:
+        results = [convert_file(input_paths[0], cross_rates, output_path, show_progress)]
+    print()
+    elapsed = time.perf_counter() - started
+    for output_path, rows in results:
+        print(f"Converted {rows} rows -> {output_path}")
+    print(f"Done in {elapsed:.2f}s")
 
 
 class CurrencyConverterApp:
-    def __init__(self, root):
+    def __init__(self, root, converter=None):
         self.root = root
         self.root.title("Currency Converter")
 
         # Initialize notebook attribute
         self.notebook = ttk.Notebook(self.root)
 
-        if is_internet_available():
-            self.initialize_with_internet()
-        else:
-            self.initialize_without_internet()
+        # The conversion logic lives in the headless converter core, the app only adds the Tk front end
+        self.converter = converter or CurrencyConverter()
+        self.api_url = self.converter.provider.api_url
+        self.rate_cache = self.converter.rate_cache  # Exchange rates snapshot shared by all tabs
+        self.connectivity = self.converter.connectivity  # Reachability of the rates endpoint
+        self.rate_worker = RateRefreshWorker(self.root, self.converter.provider)
+        self.refresh_schedule = RefreshSchedule(self.connectivity)  # When the background refresh runs next
+        self.refresh_job = None
+        self.shared_generation = 0  # Generation of the last shared snapshot seen
+        self.live_conversion_job = None
+        self.suggestion_popup = None  # List of matching currencies shown under the currency field being typed in
+        self.suggestion_target = None
+        self.exchange_rates = {}
+        self._history_model = None
+        self.history_page = 0
+        self.history_loading_job = None
+        self.history_search_job = None
+        self.tab_builders = {}  # Tab widget name -> function building its widgets, until it is first selected
+
+        # The full UI also starts offline: it begins with the cached rates file, and the connectivity label shows
+        # "No Internet" once refreshes fail
+        self.initialize_with_internet()
 
     def initialize_with_internet(self):
-        # Internet is available, proceed with the initialization
-        internet_label = tk.Label(self.root, text="Internet Available", font=("Arial", 10, "bold"), fg=SECONDARY_COLOR,
-                                  background=BACKGROUND_COLOR)
-        internet_label.pack(padx=10, pady=10)
+        # Whether the rates endpoint is reachable is only known after the first refresh, so there is no separate
+        # offline layout
+        self.internet_label = tk.Label(self.root, text="Internet Available", font=("Arial", 10, "bold"),
+                                       fg=SECONDARY_COLOR, background=BACKGROUND_COLOR)
+        self.internet_label.pack(padx=10, pady=10)
+        self.connectivity.add_listener(self.update_connectivity_label)
         # Add home button
         home_button = tk.Button(self.root, text="Home", command=self.go_to_dashboard, bg=PRIMARY_COLOR, fg="white")
         home_button.pack(pady=3)
+        # Shows "Refreshing exchange rates…" while the background worker is fetching
+        self.refresh_status_label = tk.Label(self.root, text="", font=("Arial", 9), fg=TEXT_COLOR,
+                                             background=BACKGROUND_COLOR)
+        self.refresh_status_label.pack()
 
         self.notebook = ttk.Notebook(self.root)
-        self.api_url = "https://api.exchangerate-api.com/v4/latest/USD"
-        self.exchange_rates = self.fetch_exchange_rates()
+        # Start from the cached rates file, the refresh schedule keeps it up to date in the background
+        self.exchange_rates = self.load_exchange_rates_from_file(show_error=False)
+        self.scheduled_refresh()
+        self.poll_shared_rates()
+        # Opening the history store starts indexing the history file on a background thread
+        self.converter.history_store
 
         self.dashboard_tab = ttk.Frame(self.notebook)
         self.convert_currency_tab = ttk.Frame(self.notebook)
         self.view_conversion_history_tab = ttk.Frame(self.notebook)
         self.display_exchange_rates_tab = ttk.Frame(self.notebook)
         self.view_currency_name_tab = ttk.Frame(self.notebook)
+        self.performance_tab = ttk.Frame(self.notebook)
 
         self.notebook.add(self.dashboard_tab, text="Dashboard")
         self.notebook.add(self.convert_currency_tab, text="Convert Currency")
         self.notebook.add(self.view_conversion_history_tab, text="View Conversion History")
         self.notebook.add(self.display_exchange_rates_tab, text="1 USD to Target Currency")
         self.notebook.add(self.view_currency_name_tab, text="View Currency Name for Currency Code")
+        self.notebook.add(self.performance_tab, text="Performance")
 
+        # Only the dashboard is built now, the other tabs are built the first time they are selected
         self.create_dashboard_tab()
-        self.create_convert_currency_tab()
-        self.create_view_conversion_history_tab()
-        self.create_display_exchange_rates_tab()
-        self.create_view_currency_name_tab()
+        self.defer_tab(self.convert_currency_tab, self.create_convert_currency_tab)
+        self.defer_tab(self.view_conversion_history_tab, self.create_view_conversion_history_tab)
+        self.defer_tab(self.display_exchange_rates_tab, self.create_display_exchange_rates_tab)
+        self.defer_tab(self.view_currency_name_tab, self.create_view_currency_name_tab)
+        self.defer_tab(self.performance_tab, self.create_performance_tab)
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
 
         self.notebook.pack(padx=10, pady=10)
 
-        # Initialize conversion history list
-        self.conversion_history = []
-        self.create_view_conversion_history_tab()
-
-    def initialize_without_internet(self):
-        # Internet is not available, show a message
-        internet_label = tk.Label(self.root, text="No Internet", font=("Arial", 10, "bold"), fg=ACCENT_COLOR,
-                                  background=BACKGROUND_COLOR)
-        internet_label.pack(padx=10, pady=10)
-        # Add home button
-        home_button = tk.Button(self.root, text="Home", command=self.go_to_dashboard, bg=PRIMARY_COLOR, fg="white")
-        home_button.pack(pady=3)
-        # Create Convert Currency, View Conversion History, and View Currency Name for Currency Code tabs
-        self.convert_currency_tab = ttk.Frame(self.notebook)
-        self.view_conversion_history_tab = ttk.Frame(self.notebook)
-        self.view_currency_name_tab = ttk.Frame(self.notebook)
-
-        # Create history_text attribute even when there is no internet
-        self.history_text = tk.Text(self.view_conversion_history_tab, height=20, width=80)
-        self.history_text.grid(row=1, column=0, padx=5, pady=5)
+    def defer_tab(self, tab, builder):
+        self.tab_builders[str(tab)] = builder
 
-        # Add tabs to the notebook
-        self.notebook.add(self.convert_currency_tab, text="Convert Currency")
-        self.notebook.add(self.view_conversion_history_tab, text="View Conversion History")
-        self.notebook.add(self.view_currency_name_tab, text="View Currency Name for Currency Code")
+    def on_tab_changed(self, event=None):
+        # Build the selected tab's widgets if this is the first time it is shown
+        builder = self.tab_builders.pop(self.notebook.select(), None)
+        if builder is not None:
+            builder()
 
-        # Pack the notebook to the main window
-        self.notebook.pack(padx=10, pady=10, fill='both', expand=True)
+    def history_ready(self):
+        # True once the history model can be used without waiting for the store's background indexing
+        return self._history_model is not None or self.converter.history_store.indexed
 
-        # Create Convert Currency and View Currency Name for Currency Code widgets
-        self.create_convert_currency_tab()
-        self.create_view_currency_name_tab()
+    @property
+    def history_model(self):
+        # The history is loaded when it is first needed (History tab or first conversion), not at startup
+        if self._history_model is None:
+            self._history_model = ConversionHistoryModel(self.converter.history_store)
+            self._history_model.add_listener(self.on_history_entry_added)
+        return self._history_model
 
     def go_to_dashboard(self):
         # Navigate to the Dashboard tab
@@ -149,21 +294,29 @@ class CurrencyConverterApp:
         amount_label = tk.Label(self.convert_currency_tab, text="Amount:")
         amount_label.grid(row=0, column=0, padx=5, pady=5)
 
-        self.amount_entry = tk.Entry(self.convert_currency_tab)
+        # The result follows the input as you type (live_convert), the Convert button also logs it to the history
+        amount_var = tk.StringVar()
+        self.amount_entry = tk.Entry(self.convert_currency_tab, textvariable=amount_var)
         self.amount_entry.grid(row=0, column=1, padx=5, pady=5)
 
         source_currency_label = tk.Label(self.convert_currency_tab, text="Source Currency:")
         source_currency_label.grid(row=1, column=0, padx=5, pady=5)
 
-        self.source_currency_entry = tk.Entry(self.convert_currency_tab)
+        # Currency fields take a code or a name and suggest matching currencies while typing
+        source_currency_var = tk.StringVar()
+        self.source_currency_entry = self.create_currency_combobox(self.convert_currency_tab, source_currency_var)
         self.source_currency_entry.grid(row=1, column=1, padx=5, pady=5)
 
         target_currency_label = tk.Label(self.convert_currency_tab, text="Target Currency:")
         target_currency_label.grid(row=2, column=0, padx=5, pady=5)
 
-        self.target_currency_entry = tk.Entry(self.convert_currency_tab)
+        target_currency_var = tk.StringVar()
+        self.target_currency_entry = self.create_currency_combobox(self.convert_currency_tab, target_currency_var)
         self.target_currency_entry.grid(row=2, column=1, padx=5, pady=5)
 
+        for variable in (amount_var, source_currency_var, target_currency_var):
+            variable.trace_add("write", lambda *args: self.schedule_live_conversion())
+
         convert_button = tk.Button(self.convert_currency_tab, text="Convert", command=self.convert_currency,
                                    bg="#4caf50", fg="white")
         convert_button.grid(row=3, column=0, pady=10)
@@ -175,6 +328,192 @@ class CurrencyConverterApp:
         self.converted_result_label = tk.Label(self.convert_currency_tab, text="")
         self.converted_result_label.grid(row=4, column=0, columnspan=2, pady=5)
 
+        batch_button = tk.Button(self.convert_currency_tab, text="Batch Convert File", command=self.batch_convert_file,
+                                 bg=PRIMARY_COLOR, fg="white")
+        batch_button.grid(row=5, column=0, columnspan=2, pady=10)
+
+        # Exact mode converts in integer minor units (fixed_point.py) instead of binary floats
+        self.exact_mode = tk.BooleanVar(value=False)
+        exact_mode_checkbutton = tk.Checkbutton(self.convert_currency_tab, text="Exact decimal arithmetic",
+                                                variable=self.exact_mode, command=self.schedule_live_conversion)
+        exact_mode_checkbutton.grid(row=6, column=0, columnspan=2, pady=5)
+
+    def create_currency_combobox(self, parent, variable=None):
+        combobox = ttk.Combobox(parent, textvariable=variable, width=32)
+        combobox.bind("<KeyRelease>", lambda event: self.on_currency_key_release(combobox, event))
+        combobox.bind("<Down>", lambda event: self.move_currency_suggestion(combobox, 1))
+        combobox.bind("<Up>", lambda event: self.move_currency_suggestion(combobox, -1))
+        combobox.bind("<Return>", lambda event: self.pick_currency_suggestion(combobox))
+        combobox.bind("<Escape>", lambda event: self.hide_currency_suggestions())
+        combobox.bind("<FocusOut>", lambda event: self.root.after(SUGGESTIONS_HIDE_DELAY_MS,
+                                                                   self.hide_currency_suggestions_unless_focused))
+        return combobox
+
+    def on_currency_key_release(self, combobox, event):
+        # Keys handled by the suggestion list itself don't start a new search
+        if event.keysym not in ("Up", "Down", "Return", "Escape", "Tab"):
+            self.update_currency_suggestions(combobox)
+
+    def update_currency_suggestions(self, combobox):
+        # Shows the currencies matching the typed prefix (code, name or a word of the name) in a list under the
+        # field, without taking the focus away from it. An exact code match is listed (and selected) first.
+        suggestions = [f"{currency.code} - {currency.name}"
+                       for currency in currency_registry.search_currencies(combobox.get())]
+        combobox['values'] = suggestions
+        if not suggestions or self.root.focus_get() is not combobox:
+            self.hide_currency_suggestions()
+            return
+        if self.suggestion_popup is None:
+            self.suggestion_popup = tk.Toplevel(self.root)
+            self.suggestion_popup.overrideredirect(True)
+            self.suggestion_listbox = tk.Listbox(self.suggestion_popup, takefocus=0, exportselection=False)
+            self.suggestion_listbox.pack(fill="both", expand=True)
+            self.suggestion_listbox.bind("<ButtonRelease-1>",
+                                         lambda event: self.pick_currency_suggestion(self.suggestion_target))
+        self.suggestion_target = combobox
+        listbox = self.suggestion_listbox
+        listbox.config(height=len(suggestions), width=combobox.cget("width"))
+        listbox.delete(0, "end")
+        listbox.insert("end", *suggestions)
+        listbox.selection_set(0)
+        self.suggestion_popup.geometry(f"+{combobox.winfo_rootx()}+{combobox.winfo_rooty() + combobox.winfo_height()}")
+        self.suggestion_popup.deiconify()
+        self.suggestion_popup.lift()
+
+    def suggestions_shown_for(self, combobox):
+        return (self.suggestion_popup is not None and self.suggestion_target is combobox
+                and self.suggestion_popup.winfo_viewable())
+
+    def move_currency_suggestion(self, combobox, step):
+        # Up/Down move through the suggestion list while the focus stays in the field; without a list they keep
+        # their usual combobox behavior
+        if not self.suggestions_shown_for(combobox):
+            return None
+        listbox = self.suggestion_listbox
+        selected = listbox.curselection()
+        position = min(max((selected[0] if selected else -1) + step, 0), listbox.size() - 1)
+        listbox.selection_clear(0, "end")
+        listbox.selection_set(position)
+        listbox.see(position)
+        return "break"
+
+    def pick_currency_suggestion(self, combobox):
+        # Puts the selected suggestion into the field (Return or a click); resolve_currency_code reads its code
+        if combobox is None or not self.suggestions_shown_for(combobox):
+            return None
+        selected = self.suggestion_listbox.curselection()
+        if selected:
+            combobox.set(self.suggestion_listbox.get(selected[0]))
+            combobox.icursor("end")
+        self.hide_currency_suggestions()
+        combobox.focus_set()
+        return "break"
+
+    def hide_currency_suggestions(self):
+        if self.suggestion_popup is not None:
+            self.suggestion_popup.withdraw()
+
+    def hide_currency_suggestions_unless_focused(self):
+        # Focus left the field: hide the list, unless the focus only moved to the list itself (a click on it)
+        if self.suggestion_popup is not None and self.root.focus_get() not in (self.suggestion_target,
+                                                                              self.suggestion_listbox):
+            self.hide_currency_suggestions()
+
+    def schedule_live_conversion(self):
+        # Debounce: the live result is computed once typing pauses for LIVE_CONVERSION_DELAY_MS
+        if self.live_conversion_job is not None:
+            self.root.after_cancel(self.live_conversion_job)
+        self.live_conversion_job = self.root.after(LIVE_CONVERSION_DELAY_MS, self.live_convert)
+
+    @timed("live_convert")
+    def live_convert(self):
+        # Result for the current input from the in-memory snapshot: no request, no history entry and no dialogs,
+        # incomplete input just clears the result
+        self.live_conversion_job = None
+        source_currency = currency_registry.resolve_currency_code(self.source_currency_entry.get())
+        target_currency = currency_registry.resolve_currency_code(self.target_currency_entry.get())
+        if not (self.rate_cache.rates and self.is_valid_currency(source_currency)
+                and self.is_valid_currency(target_currency)):
+            self.converted_result_label.config(text="")
+            return
+        try:
+            _, _, result_text = self.conversion_result(self.amount_entry.get(), source_currency, target_currency)
+        except ValueError:
+            result_text = ""
+        self.converted_result_label.config(text=result_text)
+
+    def conversion_result(self, amount_text, source_currency, target_currency):
+        # (amount, converted amount, result text) with the current snapshot, ValueError for invalid input
+        amount = float(amount_text)
+        # Validation and the cross-rate lookup are done by the converter core
+        if self.exact_mode.get():
+            # Decimal result rounded to the target currency's minor unit
+            exact_amount = self.converter.convert_exact(amount_text, source_currency, target_currency)
+            result_text = f"{amount_text.strip()} {source_currency} is equal to {exact_amount} {target_currency}"
+            return amount, float(exact_amount), result_text
+        converted_amount = self.converter.convert(amount, source_currency, target_currency)
+        result_text = f"{amount:.2f} {source_currency} is equal to {converted_amount:.2f} {target_currency}"
+        return amount, converted_amount, result_text
+
+    def batch_convert_file(self):
+        # Convert a CSV/Excel file with amount, source_currency and target_currency columns
+        input_path = filedialog.askopenfilename(title="Select file to convert",
+                                                filetypes=[("CSV files", "*.csv"), ("Excel files", "*.xlsx"),
+                                                           ("Parquet files", "*.parquet")])
+        if not input_path:
+            return
+
+        rates = self.get_exchange_rates() or self.load_exchange_rates_from_file()
+        if not rates:
+            return
+
+        def report(result, error):
+            if error is not None:
+                self.converted_result_label.config(text="")
+                messagebox.showerror("Error", f"An error occurred during batch conversion: {error}")
+            else:
+                output_path, rows = result
+                self.converted_result_label.config(text=f"Converted {rows} rows to {output_path}")
+
+        def show_progress(rows, fraction):
+            self.converted_result_label.config(text=f"Converting file… {fraction:.0%} ({rows:,} rows)")
+
+        self.converted_result_label.config(text="Converting file…")
+        cross_rates = converter_core.CrossRateMatrix(rates)
+        self.run_in_background(lambda progress: convert_file(input_path, cross_rates, progress=progress), report,
+                               on_progress=show_progress)
+
+    def run_in_background(self, work, on_done, on_progress=None):
+        # Run work() on a thread and call on_done(result, error) on the Tk thread when it finishes. With
+        # on_progress, work is called as work(progress) and every progress(*args) call on the thread is
+        # forwarded to on_progress(*args) on the Tk thread.
+        results = queue.Queue()
+
+        def run():
+            try:
+                if on_progress is None:
+                    results.put(("done", (work(), None)))
+                else:
+                    results.put(("done", (work(lambda *args: results.put(("progress", args))), None)))
+            except Exception as e:
+                results.put(("done", (None, e)))
+
+        def poll():
+            while True:
+                try:
+                    kind, payload = results.get_nowait()
+                except queue.Empty:
+                    self.root.after(REFRESH_POLL_MS, poll)
+                    return
+                if kind == "progress":
+                    on_progress(*payload)
+                else:
+                    on_done(*payload)
+                    return
+
+        threading.Thread(target=run, daemon=True).start()
+        self.root.after(REFRESH_POLL_MS, poll)
+
     def clear_entries(self):
         # Clear the entry fields
         self.amount_entry.delete(0, tk.END)
@@ -186,9 +525,25 @@ class CurrencyConverterApp:
         history_label = tk.Label(self.view_conversion_history_tab, text="Conversion History:")
         history_label.grid(row=0, column=0, padx=5, pady=5)
 
+        # Search box, filters the history model as you type
+        self.history_search_entry = tk.Entry(self.view_conversion_history_tab)
+        self.history_search_entry.grid(row=0, column=1, columnspan=2, padx=5, pady=5, sticky="ew")
+        self.history_search_entry.bind("<KeyRelease>", lambda event: self.filter_conversion_history())
+
         # Increase the width and height of the Text widget
         self.history_text = tk.Text(self.view_conversion_history_tab, height=20, width=80, bg="white")
-        self.history_text.grid(row=1, column=0, padx=5, pady=5)
+        self.history_text.grid(row=1, column=0, columnspan=3, padx=5, pady=5)
+
+        # Only one page of the history is rendered at a time
+        newer_button = tk.Button(self.view_conversion_history_tab, text="< Newer",
+                                 command=lambda: self.show_history_page(self.history_page - 1))
+        newer_button.grid(row=2, column=0, padx=5, pady=5)
+        self.history_page_label = tk.Label(self.view_conversion_history_tab, text="")
+        self.history_page_label.grid(row=2, column=1, padx=5, pady=5)
+        older_button = tk.Button(self.view_conversion_history_tab, text="Older >",
+                                 command=lambda: self.show_history_page(self.history_page + 1))
+        older_button.grid(row=2, column=2, padx=5, pady=5)
+
         self.update_conversion_history_tab()  # Call this function after creating the history_text widget
 
     def create_display_exchange_rates_tab(self):
@@ -200,11 +555,36 @@ class CurrencyConverterApp:
                                   bg="#4caf50", fg="white")
         export_button.grid(row=0, column=1, padx=5, pady=5)
 
+        discard_button = tk.Button(self.display_exchange_rates_tab, text="Discard Cached Rates",
+                                   command=self.invalidate_exchange_rates, bg=ACCENT_COLOR, fg="white")
+        discard_button.grid(row=0, column=4, padx=5, pady=5)
+
+        # Base currency of the table, the rates for any base come from the cross-rate matrix
+        self.table_base_currency = ttk.Combobox(self.display_exchange_rates_tab, width=6,
+                                                values=list(self.rate_cache.cross_rates.codes))
+        self.table_base_currency.set("USD")
+        self.table_base_currency.bind("<<ComboboxSelected>>", lambda event: self.display_exchange_rates_table())
+        self.table_base_currency.bind("<Return>", lambda event: self.display_exchange_rates_table())
+        self.table_base_currency.grid(row=0, column=2, padx=5, pady=5)
+
+        # Filters the rows (by currency code or name) without rebuilding the table
+        self.table_filter_entry = tk.Entry(self.display_exchange_rates_tab, width=12)
+        self.table_filter_entry.bind("<KeyRelease>", lambda event: self.apply_exchange_rates_table_view())
+        self.table_filter_entry.grid(row=0, column=3, padx=5, pady=5)
+
+        # Rows are keyed by currency code (item id), so a refresh only touches the cells that changed
         self.exchange_rates_treeview = ttk.Treeview(self.display_exchange_rates_tab,
                                                     columns=("Currency", "Exchange Rate"), show="headings")
-        self.exchange_rates_treeview.heading("Currency", text="Target Currency")
-        self.exchange_rates_treeview.heading("Exchange Rate", text="1USD to Target Currency")
-        self.exchange_rates_treeview.grid(row=1, column=0, columnspan=2, padx=5, pady=5)
+        self.exchange_rates_treeview.heading("Currency", text="Target Currency",
+                                             command=lambda: self.sort_exchange_rates_table("Currency"))
+        self.exchange_rates_treeview.heading("Exchange Rate", text="1USD to Target Currency",
+                                             command=lambda: self.sort_exchange_rates_table("Exchange Rate"))
+        self.exchange_rates_treeview.tag_configure("changed", background="#fff3b0")
+        self.exchange_rates_treeview.grid(row=1, column=0, columnspan=4, padx=5, pady=5)
+        self.table_rows = {}  # Currency code -> rate currently shown in the Treeview
+        self.table_changed = set()  # Currency codes highlighted as changed by the last refresh
+        self.table_base = None
+        self.table_sort = ("Currency", False)  # (column, descending)
 
         self.display_exchange_rates_table()  # Call the method to display exchange rates
 
@@ -212,7 +592,7 @@ class CurrencyConverterApp:
         currency_code_label = tk.Label(self.view_currency_name_tab, text="Currency Code:")
         currency_code_label.grid(row=0, column=0, padx=5, pady=5)
 
-        self.currency_code_entry = tk.Entry(self.view_currency_name_tab)
+        self.currency_code_entry = self.create_currency_combobox(self.view_currency_name_tab)
         self.currency_code_entry.grid(row=0, column=1, padx=5, pady=5)
 
         get_name_button = tk.Button(self.view_currency_name_tab, text="Get Currency Name",
@@ -222,173 +602,326 @@ class CurrencyConverterApp:
         self.currency_name_label = tk.Label(self.view_currency_name_tab, text="")
         self.currency_name_label.grid(row=2, column=0, columnspan=2, pady=5)
 
-    def fetch_exchange_rates(self):
-        # Check if internet connection is available
-        if is_internet_available():
+    def create_performance_tab(self):
+        # Latency percentiles of the timed operations (latency_metrics.py), refreshed while the tab is visible
+        self.performance_treeview = ttk.Treeview(self.performance_tab,
+                                                 columns=("Count", "p50", "p95", "p99", "Max"), height=10)
+        self.performance_treeview.heading("#0", text="Operation")
+        self.performance_treeview.column("#0", width=220)
+        for column in ("Count", "p50", "p95", "p99", "Max"):
+            self.performance_treeview.heading(column, text=column if column == "Count" else f"{column} (ms)")
+            self.performance_treeview.column(column, width=80, anchor="e")
+        self.performance_treeview.grid(row=0, column=0, columnspan=3, padx=5, pady=5)
+
+        export_json_button = tk.Button(self.performance_tab, text="Export JSON",
+                                       command=lambda: self.export_performance_metrics("json"), bg=PRIMARY_COLOR,
+                                       fg="white")
+        export_json_button.grid(row=1, column=0, pady=10)
+        export_prometheus_button = tk.Button(self.performance_tab, text="Export Prometheus",
+                                             command=lambda: self.export_performance_metrics("prometheus"),
+                                             bg=PRIMARY_COLOR, fg="white")
+        export_prometheus_button.grid(row=1, column=1, pady=10)
+        reset_button = tk.Button(self.performance_tab, text="Reset", command=self.reset_performance_metrics,
+                                 bg=ACCENT_COLOR, fg="white")
+        reset_button.grid(row=1, column=2, pady=10)
+
+        # Health of the upstream rate providers (rate_providers.py), in the order they are routed to
+        self.provider_treeview = ttk.Treeview(self.performance_tab,
+                                              columns=("Status", "Latency", "Successes", "Failures", "Outliers"),
+                                              height=4)
+        self.provider_treeview.heading("#0", text="Provider")
+        self.provider_treeview.column("#0", width=220)
+        for column in ("Status", "Latency", "Successes", "Failures", "Outliers"):
+            self.provider_treeview.heading(column, text="Latency (ms)" if column == "Latency" else column)
+            self.provider_treeview.column(column, width=80, anchor="e")
+        self.provider_treeview.grid(row=2, column=0, columnspan=3, padx=5, pady=5)
+
+        # Counters of the in-memory rate snapshot (RateCache.stats)
+        self.rate_cache_label = tk.Label(self.performance_tab, text="", font=("Arial", 9), fg=TEXT_COLOR)
+        self.rate_cache_label.grid(row=3, column=0, columnspan=3, padx=5, pady=5)
+
+        self.update_performance_tab()
+
+    def update_performance_tab(self):
+        if self.notebook.select() == str(self.performance_tab):
+            self.performance_treeview.delete(*self.performance_treeview.get_children())
+            for name, summary in METRICS.snapshot().items():
+                values = [summary["count"]] + [f"{summary[key] * 1000:.2f}" for key in ("p50", "p95", "p99", "max")]
+                self.performance_treeview.insert("", "end", text=name, values=values)
+            self.update_provider_health()
+            self.update_rate_cache_stats()
+        self.root.after(PERFORMANCE_REFRESH_MS, self.update_performance_tab)
+
+    def update_provider_health(self):
+        if not hasattr(self.converter.provider, 'health_report'):
+            return
+        self.provider_treeview.delete(*self.provider_treeview.get_children())
+        for name, health in self.converter.provider.health_report().items():
+            latency = f"{health['latency'] * 1000:.0f}" if health["latency"] is not None else "-"
+            status = "OK" if health["available"] else "Cooling off"
+            self.provider_treeview.insert("", "end", text=name, values=(status, latency, health["successes"],
+                                                                        health["failures"], health["outliers"]))
+
+    def update_rate_cache_stats(self):
+        stats = self.rate_cache.stats()
+        if stats["age"] is None:
+            snapshot = "no snapshot yet"
+        else:
+            snapshot = f"{stats['source']} snapshot ({stats['base']}), {stats['age']:.0f} s old"
+        self.rate_cache_label.config(text=f"Rate cache: {stats['hits']} fresh lookups, {stats['misses']} stale, "
+                                          f"{stats['refreshes']} refreshes; {snapshot}")
+
+    def export_performance_metrics(self, export_format):
+        extension = ".json" if export_format == "json" else ".prom"
+        filename = filedialog.asksaveasfilename(title="Export latency metrics", defaultextension=extension,
+                                                initialfile=f"latency_metrics{extension}")
+        if not filename:
+            return
+        try:
+            with open(filename, 'w') as file:
+                file.write(METRICS.to_json() if export_format == "json" else METRICS.to_prometheus())
+            messagebox.showinfo("Export Successful", f"Latency metrics exported to {filename}")
+        except OSError as e:
+            messagebox.showerror("Error", f"An error occurred during export: {str(e)}")
+
+    def reset_performance_metrics(self):
+        METRICS.reset()
+        self.performance_treeview.delete(*self.performance_treeview.get_children())
+
+    def fetch_exchange_rates(self, on_done=None):
+        # Refresh the exchange rates on the background worker, on_done(rates, error) runs on the Tk thread
+        started = time.monotonic()
+
+        def handle_result(data, error):
+            # Time from the request to the rates arriving on the Tk thread, including the wait for the worker
+            METRICS.observe("fetch_exchange_rates", time.monotonic() - started)
             try:
-                response = requests.get(self.api_url)
-                if response.status_code == 200:
-                    data = response.json()
-                    # Save the fetched exchange rates to a JSON file
-                    with open('exchange_rates.json', 'w') as json_file:
-                        json.dump(data['rates'], json_file)
-                    return data['rates']
+                if data is not None:
+                    self.connectivity.record_success(time.monotonic() - started)
                 else:
-                    messagebox.showerror("Error", "Failed to fetch exchange rates. Please try again later.")
-                    return {}
-            except requests.RequestException as e:
-                messagebox.showerror("Error", f"An error occurred: {str(e)}")
-                return {}
+                    self.connectivity.record_failure(error)
+
+                if data is not None:
+                    self.refresh_schedule.record_success(data['rates'])
+                    self.exchange_rates = self.converter.store_snapshot(data)
+                    self.refresh_status_label.config(text="")
+                    self.show_new_rates()
+                else:
+                    self.refresh_status_label.config(text="Exchange rates could not be refreshed, using cached rates.")
+                if on_done is not None:
+                    on_done(self.exchange_rates if data is not None else None, error)
+            finally:
+                # Even if storing the snapshot fails, the background refresh must keep running
+                self.schedule_next_refresh()
+
+        self.refresh_status_label.config(text="Refreshing exchange rates…")
+        self.rate_worker.refresh(handle_result)
+
+    def scheduled_refresh(self):
+        self.refresh_job = None
+        self.fetch_exchange_rates()
+
+    def schedule_next_refresh(self):
+        # (Re)arm the timer of the background refresh, every finished refresh restarts it
+        if self.refresh_job is not None:
+            self.root.after_cancel(self.refresh_job)
+        delay = self.refresh_schedule.next_delay()
+        self.refresh_job = self.root.after(int(delay * 1000), self.scheduled_refresh)
+
+    def poll_shared_rates(self):
+        # Adopt snapshots other instances fetched as soon as they are published. Checking the shared segment's
+        # generation is a memory read, the snapshot is only copied when it changed.
+        provider = self.converter.provider
+        if not hasattr(provider, 'read_shared'):
+            return
+        if provider.generation != self.shared_generation:
+            data = provider.read_shared()
+            if data is not None:
+                self.shared_generation = data["generation"]
+                if self.rate_cache.fetched_at is None or data["fetched_at"] > self.rate_cache.fetched_at:
+                    self.exchange_rates = self.converter.store_snapshot(data)
+                    self.show_new_rates()
+        self.root.after(SHARED_RATES_POLL_MS, self.poll_shared_rates)
+
+    def show_new_rates(self):
+        # Redraw what depends on the snapshot in the tabs that were built
+        if hasattr(self, 'exchange_rates_treeview'):
+            self.display_exchange_rates_table()
+        if hasattr(self, 'converted_result_label'):
+            self.schedule_live_conversion()
+
+    def get_exchange_rates(self):
+        # The latest snapshot in memory. Lookups never trigger a request, the refresh schedule keeps the
+        # snapshot recent in the background. get() counts fresh and stale lookups for the Performance tab.
+        return self.rate_cache.get() or self.rate_cache.rates
+
+    def update_connectivity_label(self, state):
+        # Reflect the state reported by ConnectivityMonitor in the label at the top of the window
+        if state == ONLINE:
+            self.internet_label.config(text="Internet Available", fg=SECONDARY_COLOR)
+        elif state == DEGRADED:
+            self.internet_label.config(text="Connection Degraded", fg=PRIMARY_COLOR)
         else:
-            # Use cached exchange rates from the JSON file
-            return self.load_exchange_rates_from_file()
+            self.internet_label.config(text="No Internet", fg=ACCENT_COLOR)
+
+    def invalidate_exchange_rates(self):
+        # Drop the in-memory snapshot and its cross rates, clear the table and fetch new rates right away
+        def report(rates, error):
+            if rates is None:
+                messagebox.showerror("Error", f"An error occurred: {error}")
+
+        self.rate_cache.invalidate()
+        self.exchange_rates = {}
+        self.display_exchange_rates_table()
+        self.fetch_exchange_rates(on_done=report)
 
-    def load_exchange_rates_from_file(self):
+    def load_exchange_rates_from_file(self, show_error=True):
         try:
-            with open('exchange_rates.json', 'r') as json_file:
-                return json.load(json_file)
+            # Stored with its real fetch time, the refresh schedule replaces it in the background
+            return self.converter.load_cached_rates()
         except FileNotFoundError:
-            messagebox.showerror("Error", "No internet connection and no cached exchange rates found.")
+            if show_error:
+                messagebox.showerror("Error", "No internet connection and no cached exchange rates found.")
             return {}
 
     def convert_currency(self):
+        # Only the conversion itself is timed, not the time an error dialog stays open
+        with METRICS.measure("convert_currency"):
+            error = self.run_conversion()
+        if error is not None:
+            messagebox.showerror("Error", error)
+
+    def run_conversion(self):
+        # Convert the Convert Currency tab's input and log it, returns the error message to show or None
         try:
-            amount = float(self.amount_entry.get())
-            if amount < 0:
-                raise ValueError("Invalid input for amount. Please enter a valid number.")
-
-            source_currency = self.source_currency_entry.get().upper()
-            target_currency = self.target_currency_entry.get().upper()
-
-            # Check if entered currency codes are valid
-            if not self.is_valid_currency(source_currency) or not self.is_valid_currency(target_currency):
-                messagebox.showerror("Error",
-                                     "Invalid currency code. Please recheck Source and Target currency and enter a valid currency code.")
-                return
-
-            # Check if internet connection is available
-            if is_internet_available():
-                # Fetch exchange rates from the API
-                self.exchange_rates = self.fetch_exchange_rates()
-            else:
-                # Use cached exchange rates from the JSON file
-                self.exchange_rates = self.load_exchange_rates_from_file()
+            float(self.amount_entry.get())  # An invalid amount is reported before anything else
+            source_currency = currency_registry.resolve_currency_code(self.source_currency_entry.get())
+            target_currency = currency_registry.resolve_currency_code(self.target_currency_entry.get())
 
-            rate = self.exchange_rates.get(target_currency)
+            # Use the cached snapshot, the API is only contacted (in the background) when it has expired
+            self.exchange_rates = self.get_exchange_rates() or self.load_exchange_rates_from_file(show_error=False)
 
-            if rate is not None:
-                converted_amount = amount * rate
-                result_text = f"{amount:.2f} {source_currency} is equal to {converted_amount:.2f} {target_currency}"
-                self.converted_result_label.config(text=result_text)
+            if not self.exchange_rates:
+                if self.rate_worker.refreshing:
+                    # Nothing cached yet, convert as soon as the running refresh delivers rates
+                    self.converted_result_label.config(text="Fetching exchange rates…")
+                    self.rate_worker.refresh(self.retry_conversion)
+                    return None
+                return "No internet connection and no cached exchange rates found."
 
-                # Update conversion history
-                self.log_conversion_history(source_currency, target_currency, amount, converted_amount)
-                self.update_conversion_history_tab()
+            amount, converted_amount, result_text = self.conversion_result(self.amount_entry.get(), source_currency,
+                                                                           target_currency)
+            self.converted_result_label.config(text=result_text)
 
-            else:
-                messagebox.showerror("Error",
-                                     "Invalid target currency code. Please choose from the supported currencies.")
+            # Update conversion history, the history view is updated through the history model
+            self.log_conversion_history(source_currency, target_currency, amount, converted_amount)
+            return None
 
         except ValueError as e:
-            messagebox.showerror("Error", str(e))
+            return str(e)
+
+    def retry_conversion(self, data, error):
+        # Called by the refresh worker once the first exchange rates have arrived
+        if data is not None:
+            self.convert_currency()
+        else:
+            self.converted_result_label.config(text="")
+            messagebox.showerror("Error", f"An error occurred: {error}")
 
     def is_valid_currency(self, currency_code):
-        # Check if the currency code is valid (you can customize this validation based on your requirements)
-        # For example, you can maintain a list of valid currency codes or fetch them from an API
-        valid_currency_codes = ['USD', 'AED', 'AFN', 'ALL', 'AMD', 'ANG', 'AOA', 'ARS', 'AUD', 'AWG', 'AZN', 'BAM',
-                                'BBD', 'BDT', 'BGN', 'BHD', 'BIF', 'BMD', 'BND', 'BOB', 'BRL', 'BSD', 'BTN', 'BWP',
-                                'BYN', 'BZD', 'CAD', 'CDF', 'CHF', 'CLP', 'CNY', 'COP', 'CRC', 'CUP', 'CVE', 'CZK',
-                                'DJF', 'DKK', 'DOP', 'DZD', 'EGP', 'ERN', 'ETB', 'EUR', 'FJD', 'FKP', 'FOK', 'GBP',
-                                'GEL', 'GGP', 'GHS', 'GIP', 'GMD', 'GNF', 'GTQ', 'GYD', 'HKD', 'HNL', 'HRK', 'HTG',
-                                'HUF', 'IDR', 'ILS', 'IMP', 'INR', 'IQD', 'IRR', 'ISK', 'JEP', 'JMD', 'JOD', 'JPY',
-                                'KES', 'KGS', 'KHR', 'KID', 'KMF', 'KRW', 'KWD', 'KYD', 'KZT', 'LAK', 'LBP', 'LKR',
-                                'LRD', 'LSL', 'LYD', 'MAD', 'MDL', 'MGA', 'MKD', 'MMK', 'MNT', 'MOP', 'MRU', 'MUR',
-                                'MVR', 'MWK', 'MXN', 'MYR', 'MZN', 'NAD', 'NGN', 'NIO', 'NOK', 'NPR', 'NZD', 'OMR',
-                                'PAB', 'PEN', 'PGK', 'PHP', 'PKR', 'PLN', 'PYG', 'QAR', 'RON', 'RSD', 'RUB', 'RWF',
-                                'SAR', 'SBD', 'SCR', 'SDG', 'SEK', 'SGD', 'SHP', 'SLE', 'SLL', 'SOS', 'SRD', 'SSP',
-                                'STN', 'SYP', 'SZL', 'THB', 'TJS', 'TMT', 'TND', 'TOP', 'TRY', 'TTD', 'TVD', 'TWD',
-                                'TZS', 'UAH', 'UGX', 'UYU', 'UZS', 'VES', 'VND', 'VUV', 'WST', 'XAF', 'XCD', 'XDR',
-                                'XOF', 'XPF', 'YER', 'ZAR', 'ZMW', 'ZWL'
-                                ]  # Update with your valid codes
-        return currency_code in valid_currency_codes
+        # Check if the currency code is valid, O(1) lookup in the currency registry
+        return currency_registry.is_valid_currency(currency_code)
 
+    @timed("log_conversion_history")
     def log_conversion_history(self, from_currency, to_currency, amount, converted_amount):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_entry = {"timestamp": timestamp, "from_currency": from_currency, "to_currency": to_currency,
-                     "amount": amount, "converted_amount": converted_amount}
-
-        filename = 'conversion_history.json'
-
-        if not os.path.exists(filename):
-            with open(filename, 'w') as file:
-                json.dump([], file)
-
-        with open(filename, 'r+') as file:
-            try:
-                history = json.load(file)
-            except json.decoder.JSONDecodeError:
-                history = []
-
-            if len(history) >= 100:
-                history.pop(0)
-
-            history.append(log_entry)
-
-            cutoff_date = datetime.now() - timedelta(days=15)
-            history = [entry for entry in history if
-                       datetime.strptime(entry["timestamp"], "%Y-%m-%d %H:%M:%S") > cutoff_date]
-
-            file.seek(0)
-            json.dump(history, file, indent=2)
-            file.truncate()
+        # Constant-time append, retention is applied by the store's background compaction
+        log_entry = self.converter.log_conversion(from_currency, to_currency, amount, converted_amount)
+        if self.history_ready():
+            # Otherwise the model is built from the store, this entry included, once indexing is done
+            self.history_model.append(log_entry)
 
+    @timed("update_conversion_history_tab")
     def update_conversion_history_tab(self):
-        filename = 'conversion_history.json'
-
-        if os.path.exists(filename):
-            with open(filename, 'r') as file:
-                try:
-                    history = json.load(file)
-                except json.decoder.JSONDecodeError:
-                    history = []
-
-                # Clear existing content in the Text widget
-                self.history_text.delete(1.0, tk.END)
-
-                for entry in reversed(history):  # Reverse the order to display the latest entry first
-                    timestamp = entry["timestamp"]
-                    from_currency = entry["from_currency"]
-                    to_currency = entry["to_currency"]
-                    amount = entry["amount"]
-                    converted_amount = entry["converted_amount"]
-                    history_entry = f"{timestamp}: {amount:.2f} {from_currency} => {converted_amount:.2f} {to_currency}\n"
-                    # Insert the new history entry at the end of the Text widget
-                    self.history_text.insert(tk.END, history_entry)
-
-                # Scroll to the bottom of the Text widget
-                self.history_text.see(tk.END)
+        # Render the current page of the history model, latest entry first
+        if not self.history_ready():
+            # The history file is still being indexed in the background, look again shortly
+            self.history_text.delete(1.0, tk.END)
+            self.history_text.insert(tk.END, "Loading conversion history...\n")
+            self.history_page_label.config(text="")
+            if self.history_loading_job is None:
+                self.history_loading_job = self.root.after(HISTORY_LOADING_POLL_MS, self.finish_history_loading)
+            return
+        if self.history_model.searching:
+            # Scan the next chunk of the history on a later turn of the event loop, so typing stays responsive
+            self.history_text.delete(1.0, tk.END)
+            self.history_text.insert(tk.END, "Searching conversion history...\n")
+            self.history_page_label.config(text="")
+            if self.history_search_job is None:
+                self.history_search_job = self.root.after(1, self.continue_history_search)
+            return
+        self.history_page = min(self.history_page, self.history_model.page_count() - 1)
+        lines = self.history_model.page(self.history_page)
+
+        # Clear existing content in the Text widget and insert the whole page at once
+        self.history_text.delete(1.0, tk.END)
+        if lines:
+            self.history_text.insert(tk.END, "\n".join(lines) + "\n")
+        self.history_page_label.config(text=f"Page {self.history_page + 1} of {self.history_model.page_count()}")
+
+    def finish_history_loading(self):
+        self.history_loading_job = None
+        if self.history_ready():
+            # Apply whatever was typed into the search box while the history was loading
+            self.history_model.set_filter(self.history_search_entry.get(), chunked=True)
+        self.update_conversion_history_tab()
+
+    def continue_history_search(self):
+        self.history_search_job = None
+        self.history_model.search_step()
+        self.update_conversion_history_tab()
+
+    def show_history_page(self, number):
+        if not self.history_ready() or self.history_model.searching:
+            return
+        if 0 <= number < self.history_model.page_count():
+            self.history_page = number
+            self.update_conversion_history_tab()
+
+    def filter_conversion_history(self):
+        if not self.history_ready():
+            return  # Applied by finish_history_loading
+        self.history_model.set_filter(self.history_search_entry.get(), chunked=True)
+        self.history_page = 0
+        self.update_conversion_history_tab()
+
+    def on_history_entry_added(self, line):
+        # Push only the new entry to the widget, the cost doesn't depend on the history length
+        if not hasattr(self, 'history_text') or self.history_page != 0:
+            return
+        self.history_text.insert("1.0", line + "\n")
+        if len(self.history_model) > HISTORY_PAGE_SIZE:
+            # Keep the page at HISTORY_PAGE_SIZE lines by dropping the oldest one
+            self.history_text.delete(f"{HISTORY_PAGE_SIZE + 1}.0", tk.END)
+            self.history_text.insert(tk.END, "\n")
+        self.history_page_label.config(text=f"Page 1 of {self.history_model.page_count()}")
 
     def update_exchange_rates(self):
-        # Check if internet connection is available
-        if is_internet_available():
-            try:
-                response = requests.get(self.api_url)
-                if response.status_code == 200:
-                    data = response.json()
-                    # Save the fetched exchange rates to a JSON file
-                    with open('exchange_rates.json', 'w') as json_file:
-                        json.dump(data['rates'], json_file)
-                    # Update the exchange rates attribute
-                    self.exchange_rates = data['rates']
-                    # Display the updated exchange rates in the Treeview
-                    self.display_exchange_rates_table()
-                    messagebox.showinfo("Success", "Exchange rates updated successfully.")
-                else:
-                    messagebox.showerror("Error", "Failed to fetch exchange rates. Please try again later.")
-            except requests.RequestException as e:
-                messagebox.showerror("Error", f"An error occurred: {str(e)}")
-        else:
-            messagebox.showerror("Error", "No internet connection. Unable to update exchange rates.")
+        # Fetch new rates in the background and report the outcome once the worker is done
+        def report(rates, error):
+            if rates is not None:
+                messagebox.showinfo("Success", "Exchange rates updated successfully.")
+            else:
+                messagebox.showerror("Error", f"An error occurred: {error}")
+
+        if not self.connectivity.is_online() and not self.connectivity.should_attempt():
+            messagebox.showerror("Error", "No internet connection. Unable to update exchange rates. "
+                                          f"Retrying in {self.connectivity.retry_in():.0f} seconds.")
+            return
+        if self.refresh_schedule.is_recent():
+            # Repeated clicks don't turn into requests, the background schedule refreshed the rates moments ago
+            messagebox.showinfo("Up to Date", "Exchange rates are up to date.")
+            return
+        self.fetch_exchange_rates(on_done=report)
 
     def export_to_excel(self):
         # Retrieve the exchange rates
@@ -399,15 +932,9 @@ class CurrencyConverterApp:
             messagebox.showwarning("No Data", "No exchange rates to export.")
             return
 
-        # Create a DataFrame from the exchange rates
-        df = pd.DataFrame(list(exchange_rates.items()), columns=['Currency Code', 'Exchange Rate'])
-
-        # Specify the file name for the Excel file
-        excel_filename = 'exchange_rates_export.xlsx'
-
         try:
-            # Export the DataFrame to Excel
-            df.to_excel(excel_filename, index=False)
+            # Export the exchange rates table to Excel
+            excel_filename = converter_core.export_rates_to_excel(exchange_rates)
 
             # Display a success message
             messagebox.showinfo("Export Successful", f"Exchange rates exported to {excel_filename}")
@@ -416,187 +943,89 @@ class CurrencyConverterApp:
             messagebox.showerror("Error", f"An error occurred during export: {str(e)}")
 
     def get_currency_name(self):
-        currency_code = self.currency_code_entry.get().upper()
+        currency_code = currency_registry.resolve_currency_code(self.currency_code_entry.get())
         currency_name = self.get_currency_name_by_code(currency_code)
         result_text = f"The currency name for {currency_code} is: {currency_name}"
         self.currency_name_label.config(text=result_text)
 
     def get_currency_name_by_code(self, currency_code):
-        currency_names = {
-            "USD": "United States Dollar",
-            "AED": "United Arab Emirates Dirham",
-            "AFN": "Afghan Afghani",
-            "ALL": "Albanian Lek",
-            "AMD": "Armenian Dram",
-            "ANG": "Netherlands Antillean Guilder",
-            "AOA": "Angolan Kwanza",
-            "ARS": "Argentine Peso",
-            "AUD": "Australian Dollar",
-            "AWG": "Aruban Florin",
-            "AZN": "Azerbaijani Manat",
-            "BAM": "Bosnia-Herzegovina Convertible Mark",
-            "BBD": "Barbadian Dollar",
-            "BDT": "Bangladeshi Taka",
-            "BGN": "Bulgarian Lev",
-            "BHD": "Bahraini Dinar",
-            "BIF": "Burundian Franc",
-            "BMD": "Bermudian Dollar",
-            "BND": "Brunei Dollar",
-            "BOB": "Bolivian Boliviano",
-            "BRL": "Brazilian Real",
-            "BSD": "Bahamian Dollar",
-            "BTN": "Bhutanese Ngultrum",
-            "BWP": "Botswanan Pula",
-            "BYN": "Belarusian Ruble",
-            "BZD": "Belize Dollar",
-            "CAD": "Canadian Dollar",
-            "CDF": "Congolese Franc",
-            "CHF": "Swiss Franc",
-            "CLP": "Chilean Peso",
-            "CNY": "Chinese Yuan",
-            "COP": "Colombian Peso",
-            "CRC": "Costa Rican Colón",
-            "CUP": "Cuban Peso",
-            "CVE": "Cape Verdean Escudo",
-            "CZK": "Czech Republic Koruna",
-            "DJF": "Djiboutian Franc",
-            "DKK": "Danish Krone",
-            "DOP": "Dominican Peso",
-            "DZD": "Algerian Dinar",
-            "EGP": "Egyptian Pound",
-            "ERN": "Eritrean Nakfa",
-            "ETB": "Ethiopian Birr",
-            "EUR": "Euro",
-            "FJD": "Fijian Dollar",
-            "FKP": "Falkland Islands Pound",
-            "FOK": "Faroese Króna",
-            "GBP": "British Pound Sterling",
-            "GEL": "Georgian Lari",
-            "GGP": "Guernsey Pound",
-            "GHS": "Ghanaian Cedi",
-            "GIP": "Gibraltar Pound",
-            "GMD": "Gambian Dalasi",
-            "GNF": "Guinean Franc",
-            "GTQ": "Guatemalan Quetzal",
-            "GYD": "Guyanaese Dollar",
-            "HKD": "Hong Kong Dollar",
-            "HNL": "Honduran Lempira",
-            "HRK": "Croatian Kuna",
-            "HTG": "Haitian Gourde",
-            "HUF": "Hungarian Forint",
-            "IDR": "Indonesian Rupiah",
-            "ILS": "Israeli New Shekel",
-            "IMP": "Isle of Man Pound",
-            "INR": "Indian Rupee",
-            "IQD": "Iraqi Dinar",
-            "IRR": "Iranian Rial",
-            "ISK": "Icelandic Króna",
-            "JEP": "Jersey Pound",
-            "JMD": "Jamaican Dollar",
-            "JOD": "Jordanian Dinar",
-            "JPY": "Japanese Yen",
-            "KES": "Kenyan Shilling",
-            "KGS": "Kyrgystani Som",
-            "KHR": "Cambodian Riel",
-            "KID": "Kiribati Dollar",
-            "KMF": "Comorian Franc",
-            "KRW": "South Korean Won",
-            "KWD": "Kuwaiti Dinar",
-            "KYD": "Cayman Islands Dollar",
-            "KZT": "Kazakhstani Tenge",
-            "LAK": "Laotian Kip",
-            "LBP": "Lebanese Pound",
-            "LKR": "Sri Lankan Rupee",
-            "LRD": "Liberian Dollar",
-            "LSL": "Lesotho Loti",
-            "LYD": "Libyan Dinar",
-            "MAD": "Moroccan Dirham",
-            "MDL": "Moldovan Leu",
-            "MGA": "Malagasy Ariary",
-            "MKD": "Macedonian Denar",
-            "MMK": "Myanma Kyat",
-            "MNT": "Mongolian Tugrik",
-            "MOP": "Macanese Pataca",
-            "MRU": "Mauritanian Ouguiya",
-            "MUR": "Mauritian Rupee",
-            "MVR": "Maldivian Rufiyaa",
-            "MWK": "Malawian Kwacha",
-            "MXN": "Mexican Peso",
-            "MYR": "Malaysian Ringgit",
-            "MZN": "Mozambican Metical",
-            "NAD": "Namibian Dollar",
-            "NGN": "Nigerian Naira",
-            "NIO": "Nicaraguan Córdoba",
-            "NOK": "Norwegian Krone",
-            "NPR": "Nepalese Rupee",
-            "NZD": "New Zealand Dollar",
-            "OMR": "Omani Rial",
-            "PAB": "Panamanian Balboa",
-            "PEN": "Peruvian Nuevo Sol",
-            "PGK": "Papua New Guinean Kina",
-            "PHP": "Philippine Peso",
-            "PKR": "Pakistani Rupee",
-            "PLN": "Polish Złoty",
-            "PYG": "Paraguayan Guarani",
-            "QAR": "Qatari Rial",
-            "RON": "Romanian Leu",
-            "RSD": "Serbian Dinar",
-            "RUB": "Russian Ruble",
-            "RWF": "Rwandan Franc",
-            "SAR": "Saudi Riyal",
-            "SBD": "Solomon Islands Dollar",
-            "SCR": "Seychellois Rupee",
-            "SDG": "Sudanese Pound",
-            "SEK": "Swedish Krona",
-            "SGD": "Singapore Dollar",
-            "SHP": "Saint Helena Pound",
-            "SLE": "Sierra Leonean Leone",
-            "SLL": "Sierra Leonean Leone (old)",
-            "SOS": "Somali Shilling",
-            "SRD": "Surinamese Dollar",
-            "SSP": "South Sudanese Pound",
-            "STN": "São Tomé and Príncipe Dobra",
-            "SYP": "Syrian Pound",
-            "SZL": "Swazi Lilangeni",
-            "THB": "Thai Baht",
-            "TJS": "Tajikistani Somoni",
-            "TMT": "Turkmenistani Manat",
-            "TND": "Tunisian Dinar",
-            "TOP": "Tongan Pa'anga",
-            "TRY": "Turkish Lira",
-            "TTD": "Trinidad and Tobago Dollar",
-            "TVD": "Tuvaluan Dollar",
-            "TWD": "New Taiwan Dollar",
-            "TZS": "Tanzanian Shilling",
-            "UAH": "Ukrainian Hryvnia",
-            "UGX": "Ugandan Shilling",
-            "UYU": "Uruguayan Peso",
-            "UZS": "Uzbekistan Som",
-            "VES": "Venezuelan Bolívar",
-            "VND": "Vietnamese Đồng",
-            "VUV": "Vanuatu Vatu",
-            "WST": "Samoan Tala",
-            "XAF": "Central African CFA Franc",
-            "XCD": "East Caribbean Dollar",
-            "XDR": "Special Drawing Rights",
-            "XOF": "West African CFA Franc",
-            "XPF": "CFP Franc",
-            "YER": "Yemeni Rial",
-            "ZAR": "South African Rand",
-            "ZMW": "Zambian Kwacha",
-            "ZWL": "Zimbabwean Dollar"
-        }
-
-        return currency_names.get(currency_code, "Unknown Currency")
+        return currency_registry.get_currency_name_by_code(currency_code)
 
+    @timed("display_exchange_rates_table")
     def display_exchange_rates_table(self):
-        # Clear existing items in the Treeview
-        for item in self.exchange_rates_treeview.get_children():
-            self.exchange_rates_treeview.delete(item)
+        base_currency = self.table_base_currency.get().upper() or "USD"
+        if base_currency == "USD":
+            exchange_rates = self.exchange_rates
+        else:
+            exchange_rates = {code: round(rate, 6) for code, rate in
+                              self.rate_cache.cross_rates.row(base_currency).items()}
+        # Highlight changes of the same table only, not the switch to another base currency
+        highlight = base_currency == self.table_base
+        if not highlight:
+            self.exchange_rates_treeview.heading("Exchange Rate", text=f"1{base_currency} to Target Currency")
+            self.table_base_currency.config(values=list(self.rate_cache.cross_rates.codes))
+            self.table_base = base_currency
+
+        tree = self.exchange_rates_treeview
+        rows_changed = False
+
+        # Remove rows of currencies that are no longer in the snapshot
+        removed = [code for code in self.table_rows if code not in exchange_rates]
+        if removed:
+            tree.delete(*removed)
+            rows_changed = True
+            for code in removed:
+                del self.table_rows[code]
+                self.table_changed.discard(code)
+
+        # Only insert new rows and update the cells whose rate changed
+        changed = set()
+        for currency_code, exchange_rate in exchange_rates.items():
+            shown_rate = self.table_rows.get(currency_code)
+            if shown_rate is None:
+                tree.insert("", tk.END, iid=currency_code, values=(currency_code, exchange_rate))
+                rows_changed = True
+            elif shown_rate != exchange_rate:
+                tree.item(currency_code, values=(currency_code, exchange_rate),
+                          tags=("changed",) if highlight else ())
+                if highlight:
+                    changed.add(currency_code)
+            else:
+                continue
+            self.table_rows[currency_code] = exchange_rate
+
+        # Clear the highlight of values that changed in the previous refresh but not in this one
+        for currency_code in self.table_changed - changed:
+            if currency_code in self.table_rows:
+                tree.item(currency_code, tags=())
+        self.table_changed = changed
+
+        if rows_changed or (changed and self.table_sort[0] == "Exchange Rate") or not highlight:
+            self.apply_exchange_rates_table_view()
+
+    def sort_exchange_rates_table(self, column):
+        # Clicking the same heading again reverses the order
+        sort_column, descending = self.table_sort
+        self.table_sort = (column, not descending if column == sort_column else False)
+        self.apply_exchange_rates_table_view()
+
+    def apply_exchange_rates_table_view(self):
+        # Reorder and filter the existing rows in place (move/detach), without deleting and reinserting them
+        query = self.table_filter_entry.get().strip().lower()
+        column, descending = self.table_sort
+        if column == "Currency":
+            order = sorted(self.table_rows, reverse=descending)
+        else:
+            order = sorted(self.table_rows, key=self.table_rows.get, reverse=descending)
 
-        # Display the exchange rates in the Treeview
-        for currency_code, exchange_rate in self.exchange_rates.items():
-            self.exchange_rates_treeview.insert("", tk.END, values=(currency_code, exchange_rate))
+        position = 0
+        for currency_code in order:
+            if query and query not in currency_code.lower() and \
+                    query not in self.get_currency_name_by_code(currency_code).lower():
+                self.exchange_rates_treeview.detach(currency_code)
+            else:
+                self.exchange_rates_treeview.move(currency_code, "", position)
+                position += 1
 
     def get_exchange_rate(self, currency_code):
         # Get the exchange rate for 1 USD to the specified currency
@@ -605,9 +1034,50 @@ class CurrencyConverterApp:
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Currency Converter")
+    parser.add_argument("--batch", metavar="INPUT", nargs="+",
+                        help="convert CSV/Parquet/xlsx files of amounts instead of opening the GUI")
+    parser.add_argument("--output", metavar="OUTPUT", help="where to write the converted file (with one --batch file)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes for --batch (0 = one per CPU); several files are converted in parallel")
+    parser.add_argument("--serve", action="store_true", help="run the local HTTP/JSON conversion service")
+    parser.add_argument("--host", default="127.0.0.1", help="address the service listens on (with --serve)")
+    parser.add_argument("--port", type=int, default=8765, help="port the service listens on (with --serve)")
+    parser.add_argument("--upstream", metavar="URL", nargs="+", default=list(DEFAULT_PROVIDER_URLS),
+                        help="exchange rates API URLs, queried concurrently (default: the built-in providers)")
+    parser.add_argument("--merge", choices=MERGE_STRATEGIES, default=FIRST_VALID,
+                        help="use the first valid response, or the per-currency median of all providers")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="print how long the window took to appear, then exit")
+    args = parser.parse_args()
+    # Every process on the machine shares one snapshot, only one of them fetches it
+    provider = build_shared_source(build_rate_source(args.upstream, args.merge))
+
+    if args.batch:
+        if args.output and len(args.batch) > 1:
+            parser.error("--output can only be used with a single --batch file")
+        run_batch_cli(args.batch, args.output, args.workers or os.cpu_count() or 1, provider)
+        return
+
+    if args.serve:
+        from rate_server import run_server
+        run_server(args.host, args.port, provider=provider)
+        return
+
     root = tk.Tk()  # Create the main Tkinter root window
-    app = CurrencyConverterApp(root)  # Create an instance of the CurrencyConverterApp, passing the root window
-    app.update_conversion_history_tab()  # Call update_conversion_history_tab to load the conversion history
+    # Create an instance of the CurrencyConverterApp, passing the root window
+    app = CurrencyConverterApp(root, CurrencyConverter(provider))
+
+    # Draw the first frame: the window is usable from here on while the rates refresh in the background
+    root.update()
+    startup_seconds = time.perf_counter() - STARTED_AT
+    METRICS.observe("startup", startup_seconds)
+    if args.startup_time:
+        print(f"Window shown after {startup_seconds * 1000:.0f} ms (imports {(IMPORTED_AT - STARTED_AT) * 1000:.0f} ms, "
+              f"window {(time.perf_counter() - IMPORTED_AT) * 1000:.0f} ms)")
+        app.rate_worker.cancel()
+        root.destroy()
+        return
     root.mainloop()  # Start the Tkinter event loop
 
 
@@ -620,6 +1090,7 @@ if __name__ == "__main__":
 1. pip install requests [requests: Used for making HTTP requests]
 2. pip install pandas   [pandas: Used for handling data and exporting to Excel.]
 3. pip install openpyxl [openpyxl: Python library for reading and writing Excel files (xlsx)]
+4. pip install pyarrow  [pyarrow: Only needed for batch converting Parquet files]
 api_url = https://api.exchangerate-api.com/v4/latest/USD
 ---------------------------------------------------------------------------------------------------------------------------------
 Currency Converter Application - 
@@ -636,26 +1107,46 @@ Usage:
     - View Currency Name for Currency Code: Retrieves and displays the full name of a currency based on its code.
 
 Functionality:
-    - Automatic exchange rate update when the internet is available.
-    - Ability to perform currency conversion and view conversion history.
+    - Automatic exchange rate update in the background, on a schedule that adapts to how often the rates change.
+    - Ability to perform currency conversion (updated live while typing) and view conversion history.
     - Display of exchange rates for 1 USD to various currencies.
     - Retrieval of currency names based on currency codes.
 
 File Usage:
-    - exchange_rates.json: Cache file storing the latest exchange rates fetched from the API.
-    - conversion_history.json: Log file storing recent conversion history.
+    - main.py: Tkinter application (CurrencyConverterApp) and command line entry point.
+    - batch_pipeline.py: Streaming chunked batch conversion of CSV, Parquet and xlsx files.
+    - parallel_batch.py: Multi-process batch conversion (--workers) sharing one rate snapshot through shared memory.
+    - fixed_point.py: Exact conversion in integer minor units (the "Exact decimal arithmetic" option).
+    - latency_metrics.py: Latency histograms of the timed operations, shown in the Performance tab.
+    - rate_providers.py: Concurrent fetching from several rate APIs with failover, health-based routing and consensus.
+    - benchmarks/: Benchmark suite (python benchmarks/run_benchmarks.py, results in benchmarks/results/<commit>.json),
+      a stub rates API (stub_upstream.py) and scaling benchmarks (bench_parallel.py, bench_fixed_point.py).
+    - rate_history.py: Memory-mapped columnar store of historical rate snapshots (RateHistoryStore).
+    - rate_server.py: Local HTTP/JSON service (python main.py --serve) exposing /convert, /rates and /batch.
+    - converter_core.py: GUI-independent conversion core (rate provider, rate cache, cross rates, batch conversion,
+      history store). It does not import tkinter and can be used from servers and workers.
+    - currency_registry.py: Currency registry built once at import: interned codes, integer ids, names, minor units
+      and symbols.
+    - rate_snapshot.py: Crash-safe binary snapshot file format (atomic write, header with checksum, fast load).
+    - shared_rates.py: Memory-mapped rate snapshot shared by all converter processes, so only one of them fetches.
+    - exchange_rates.bin: Snapshot file storing the latest exchange rates fetched from the API. The older
+      exchange_rates.json cache file is still read when there is no valid snapshot.
+    - conversion_history.jsonl: Append-only log (one JSON entry per line) storing recent conversion history. An existing
+      conversion_history.json from older versions is imported on first start.
     - exchange_rates_export.xlsx: Excel file for exporting exchange rates.
+    - rate_history/: Columnar history of every fetched rate snapshot (codes.json, timestamps.f8, rates.f8).
 
 Methods:
 
 1.	def is_internet_available():
-    - is_internet_available is a function designed to check if the internet connection is available.
+    - is_internet_available is a function designed to check if the internet connection is available. It is no longer called
+      on startup or per conversion; it can be plugged into ConnectivityMonitor as an optional active probe.
 
 2.	initialize_with_internet(self)
-    - Initializes the application when the internet is available, Creates tabs, fetches exchange rates, and sets up the UI components.
+    - Initializes the application, online or not: Creates tabs, starts from the cached exchange rates, schedules the background refresh, and sets up the UI components. The connectivity label follows the refresh outcomes.
 
 3.	initialize_without_internet(self)
-    - Initializes the application when there is no internet connection, Creates tabs, sets up UI components, and uses cached exchange rates.
+    - Removed. A new ConnectivityMonitor always starts ONLINE, so this branch was never taken; the app always starts through initialize_with_internet and shows "No Internet" once refreshes fail.
 
 4.	go_to_dashboard(self)
     - Navigates to the Dashboard tab within the application.
@@ -664,40 +1155,41 @@ Methods:
     - Creates widgets for the Dashboard tab, Includes buttons for navigation to other tabs.
 
 6.	create_convert_currency_tab(self)
-    - Creates widgets for the "Convert Currency" tab, Includes entry fields for amount, source currency, and target currency.
+    - Creates widgets for the "Convert Currency" tab, Includes an entry field for the amount and autocompleting source and target currency fields.
 
 7.	clear_entries(self)
     - Clears the entry fields in the "Convert Currency" tab.
 
 8.	create_view_conversion_history_tab(self)
-    - Creates widgets for the "View Conversion History" tab, Displays a text widget showing the conversion history.
+    - Creates widgets for the "View Conversion History" tab, Displays a paged text widget showing the conversion history with a search box.
 
 9.	create_display_exchange_rates_tab(self)
-    - Creates widgets for the "1 USD to Target Currency" tab, Displays exchange rates in a Treeview widget.
+    - Creates widgets for the "1 USD to Target Currency" tab, Displays exchange rates in a Treeview widget for a selectable base currency.
 
 10.	create_view_currency_name_tab(self)
     - Creates widgets for the "View Currency Name for Currency Code" tab, Allows users to enter a currency code and retrieves the corresponding currency name.
 
-11.	fetch_exchange_rates(self)
-    - Fetches exchange rates from an API or uses cached rates. Saves the rates to a JSON file.
+11.	fetch_exchange_rates(self, on_done=None)
+    - Starts a background refresh of the exchange rates (see RateRefreshWorker) and updates the cache and table when it completes.
 
-12.	load_exchange_rates_from_file(self)
-    - Loads exchange rates from a JSON file.
+12.	load_exchange_rates_from_file(self, show_error=True)
+    - Loads the cached snapshot (exchange_rates.bin, or the older exchange_rates.json) into the rate cache with its real fetch time, so it counts as fresh or stale by its actual age. Shows an error dialog when there is no valid cached file unless show_error is False.
 
-13.	convert_currency(self)
-    - Converts currency based on user input. Fetches or uses cached exchange rates.
+13.	convert_currency(self) / run_conversion(self)
+    - Converts currency based on user input with the in-memory exchange rates and logs the conversion to the history. run_conversion does the work and returns the error message, which convert_currency shows after the convert_currency measurement ends, so the latency excludes the time a dialog stays open.
 
 14.	is_valid_currency(self, currency_code)
     - Checks if a currency code is valid.
 
 15.	log_conversion_history(self, from_currency, to_currency, amount, converted_amount)
-    - Logs conversion history entries to a JSON file.
+    - Appends a conversion history entry to the history store (constant time, retention runs in the background).
 
 16.	update_conversion_history_tab(self)
-    - Updates the "View Conversion History" tab with the latest conversion history.
+    - Renders the current page of the "View Conversion History" tab from the history model.
 
-17.	update_exchange_rates(self)
-    - Updates exchange rates from the API.
+17.	update_exchange_rates(self) / invalidate_exchange_rates(self)
+    - Updates exchange rates from the API in the background and reports the result when done. Clicks within MIN_REFRESH_INTERVAL_SECONDS of the last refresh are answered from the current snapshot.
+    - invalidate_exchange_rates ("Discard Cached Rates" button) drops the snapshot and its cross rates from the rate cache, clears the table and fetches new rates right away.
 
 18.	export_to_excel(self)
     - Exports exchange rates to an Excel file.
@@ -709,18 +1201,138 @@ Methods:
     - Retrieves the currency name for a given currency code.
 
 21.	display_exchange_rates_table(self)
-    - Clears and updates the exchange rates displayed in the Treeview widget.
+    - Updates the exchange rates displayed in the Treeview widget in place: rows are keyed by currency code, only changed cells are updated and highlighted.
 
 22.	get_exchange_rate(self, currency_code)
     - Retrieves the exchange rate for a given currency code.
 
 23.	main()
     - Entry point of the program. Creates the Tkinter root window and the CurrencyConverterApp instance.
+
+24.	RateCache
+    - In-memory exchange rate snapshot with a freshness window (RATES_TTL_SECONDS), fetched-at/source/base metadata, explicit invalidation (invalidate() drops the snapshot and its cross rates) and hit/miss/refresh counters (stats(), shown in the Performance tab).
+
+25.	get_exchange_rates(self)
+    - Returns the latest exchange rates snapshot in memory. It never triggers a request; the refresh schedule keeps the snapshot recent.
+
+26.	update_rate_cache_stats(self)
+    - Shows RateCache.stats() under the provider health in the Performance tab: fresh and stale lookups (counted by get_exchange_rates), refreshes (snapshots this process fetched itself, not the ones adopted from other processes), and the source (api, shared or file), base and age of the current snapshot.
+
+27.	download_exchange_rates(api_url, timeout=REQUEST_TIMEOUT, cancel_event=None)
+    - Downloads the latest rates with a request timeout and saves them to the exchange_rates.bin snapshot. Runs on the refresh worker thread.
+
+28.	RateRefreshWorker
+    - Runs rate refreshes on a background thread and hands results back to the Tk main loop via root.after, with cancellation.
+
+29.	retry_conversion(self, data, error)
+    - Re-runs a conversion that was waiting for the first exchange rates to arrive.
+
+30.	ConnectivityMonitor
+    - Tracks reachability of the rates endpoint passively from real fetch results, with online/degraded/offline state, cached lookups and exponential backoff.
+
+31.	update_connectivity_label(self, state)
+    - Updates the connection label at the top of the window when the connectivity state changes.
+
+32.	convert_batch(amounts, source_codes, target_codes, rates)
+    - Converts a column of amounts with per-row source/target codes in one vectorized NumPy pass (about 0.1s for one million rows). Invalid rows become NaN.
+
+33.	convert_dataframe(df, rates, ...) / convert_file(input_path, rates, output_path=None)
+    - Batch-converts a DataFrame or a CSV/Excel file with amount, source_currency and target_currency columns.
+
+34.	run_batch_cli(input_paths, output_path=None, workers=1)
+    - Command line batch conversion: python main.py --batch ledger.csv [more.csv ...] [--output converted.csv] [--workers N]. --workers 0 uses one process per CPU. Uses the cached snapshot while it is fresh (RATES_TTL_SECONDS), refreshes it otherwise, and only falls back to the stale cache, with a warning on stderr, when the refresh fails.
+
+35.	batch_convert_file(self) / run_in_background(self, work, on_done)
+    - "Batch Convert File" button on the Convert Currency tab. The file is converted on a background thread.
+
+36.	CrossRateMatrix
+    - N×N cross-rate matrix built once per rate snapshot (incrementally when only some rates change). rate(source, target) and row(source) are direct lookups, used for conversions, batch conversion and the exchange rates table.
+
+37.	HistoryStore
+    - Append-only JSON Lines conversion history with an in-memory (timestamp, offset) index, lazy readers (entries, latest) and background compaction for the 15-day retention and MAX_HISTORY_ENTRIES cap. The index is built on a background thread when the app starts, reading only the leading timestamp and currency fields of each line (one strptime per hour of history). Readers wait for it; appends don't, and the History tab shows "Loading conversion history..." until it is done.
+
+38.	ConversionHistoryModel
+    - Model behind the history tab with newest-first paging, search filtering and listeners notified of each new entry. Pages are read from the HistoryStore offset index (entries, entries_at) when shown, so only the current page and the numbers of the search matches are kept in memory. Letters-only queries are answered from the store's currency id arrays; other queries scan the store HISTORY_SEARCH_CHUNK entries per event loop turn (search_step) while the tab shows "Searching conversion history...".
+
+39.	show_history_page(self, number) / filter_conversion_history(self)
+    - Page through and search the conversion history.
+
+40.	on_history_entry_added(self, line)
+    - Inserts a single new entry at the top of the history view instead of redrawing it.
+
+41.	sort_exchange_rates_table(self, column) / apply_exchange_rates_table_view(self)
+    - Sorts (by clicking a column heading) and filters the exchange rates table by moving and detaching existing rows instead of rebuilding it.
+
+42.	CurrencyConverter (converter_core.py)
+    - Headless facade over RateProvider, RateCache, ConnectivityMonitor and HistoryStore: rates(), refresh(), convert(amount, source, target), convert_batch(...), log_conversion(...).
+
+43.	RateProvider (converter_core.py)
+    - Fetches snapshots from the rates API and loads the exchange_rates.bin snapshot (or the old exchange_rates.json). A damaged file is treated like a missing one.
+
+44.	is_valid_currency / get_currency_name_by_code (currency_registry.py)
+    - Module-level currency registry shared by the app and the core.
+
+45.	RateServer (rate_server.py)
+    - asyncio HTTP/JSON service started with python main.py --serve [--host H] [--port P] [--upstream URL ...]. Serves GET /convert?amount=&from=&to=, GET /rates?base= and POST /batch from the in-memory snapshot. Request bodies over MAX_BODY_BYTES (16 MiB) are refused with 413 before they are read. Concurrent requests on a stale snapshot share one upstream refresh; point --upstream at a local stub to test it.
+
+46.	RateFetchClient / get_rate_fetch_client() (converter_core.py)
+    - Shared pooled keep-alive requests session for the rates API with gzip, ETag/Last-Modified conditional GETs (a 304 skips the download and the cache file rewrite) and retries with jittered exponential backoff.
+
+47.	RateHistoryStore (rate_history.py)
+    - Appends each fetched snapshot as a float64 row in a fixed currency order and memory-maps the files for reads. Rows are stamped with the local fetch time, so snapshots of different providers stay in order after a failover; the provider's own publication time (time_last_updated) is kept alongside as metadata (published). series(code, start, end) and last_days(code, days) return zero-copy column views, and as_of(timestamp) binary-searches the timestamps. Appends hold rate_history/append.lock (shared_rates.file_lock) and the row count is re-derived from the file sizes on every read and append, so several converter processes can share the store.
+
+48.	convert_as_of / convert_batch_as_of (converter_core.py, rate_history.py)
+    - Point-in-time conversion with the rates in effect at a transaction's timestamp. Batch lookups for a sorted stream use one merge pass (a search per snapshot boundary, then a single np.repeat) instead of a search per row.
+
+49.	currency_registry.py
+    - CURRENCIES / CURRENCY_CODES / CURRENCY_IDS built once at import. currency_id(code), get_currency(code) (id, code, name, minor units, symbol) and is_valid_currency are O(1). The ids index CrossRateMatrix, RateHistoryStore columns, the HistoryStore id arrays and batch conversion.
+
+50.	convert_stream(input_path, rates, output_path=None, chunk_rows=DEFAULT_CHUNK_ROWS, progress=None) (batch_pipeline.py)
+    - Streams a ledger file through read chunk → vectorized convert → write chunk for CSV, Parquet and xlsx (openpyxl read-only/write-only), so peak memory is constant. progress(rows, fraction) feeds the GUI label and the CLI.
+
+51.	convert_file_parallel(input_path, rates, output_path=None, workers=None, ...) / convert_files_parallel(input_paths, rates, ...) (parallel_batch.py)
+    - Splits one large CSV into line-aligned byte ranges (or a list of files into one task per file) and converts them on a ProcessPoolExecutor. The USD rate vector is written once to multiprocessing.shared_memory and each worker builds its CrossRateMatrix from it at start-up; part files are appended to the output in input order, so the result is identical to convert_stream's.
+
+52.	convert_exact(amount, source_currency, target_currency) (converter_core.py) / convert_batch_minor(minor_amounts, source_codes, target_codes, rates) (fixed_point.py)
+    - Exact conversion for accounting. Amounts are integer minor units per the registry (2 decimals for EUR, 0 for JPY, 3 for KWD), published rates are scaled integers and each pair factor is an exact fraction, so results are rounded once, half-even, to the target's minor unit. The batch path runs on int64 numpy arrays (float quotient estimate + exact int64 remainder correction) and falls back to Python integers for rows too large for int64. Used by the Convert tab when "Exact decimal arithmetic" is ticked; python benchmarks/bench_fixed_point.py compares it with float and Decimal.
+
+53.	benchmarks/run_benchmarks.py [-k NAME] [--quick] [--compare BASE HEAD]
+    - Times the hot paths in benchmarks/suite.py (single conversion, upstream refresh against a local stub API, is_valid_currency, get_currency_name_by_code, currency autocomplete search, history logging with 100 to 1,000,000 stored entries, exchange rates table redraws when a display is available, Excel export, rate JSON parsing, exchange_rates.bin loading, shared segment reads, snapshot storing and the multi-provider fetch with both merge strategies) and saves the medians per commit. --compare prints the ratio between two saved runs and exits non-zero when something got slower than --threshold (default 1.2x).
+
+54.	export_rates_to_excel(rates, filename=EXPORT_FILE) (converter_core.py)
+    - Writes the rates table used by the Export to Excel button; export_to_excel only adds the dialogs.
+
+55.	create_performance_tab(self) / update_performance_tab(self) / export_performance_metrics(self, export_format)
+    - Performance tab listing count, p50, p95, p99 and max latency of every timed operation: fetch_exchange_rates (request to rates on the Tk thread), rates_download (HTTP), rates_file_write (exchange_rates.bin rewrite), provider:<name> (one per upstream provider), convert_currency (without the time an error dialog is open), live_convert, log_conversion_history, update_conversion_history_tab, display_exchange_rates_table and startup. is_internet_available is still timed as internet_probe, but it only runs when plugged into ConnectivityMonitor as a probe, which the app doesn't do. Redrawn every second while selected; exports the numbers as JSON or Prometheus text (a summary metric with an operation label).
+
+56.	LatencyRegistry / METRICS / timed(name) (latency_metrics.py)
+    - Process-wide latency registry. @timed(name) or METRICS.measure(name) records a call into a fixed log-bucket histogram (10 buckets per decade, about 1 µs per observation, constant memory); snapshot() returns the percentiles, to_json() / to_prometheus() export them.
+
+57.	defer_tab(self, tab, builder) / on_tab_changed(self, event=None)
+    - Fast start-up: only the selected tab is built when the window opens, the others are built on their first <<NotebookTabChanged>>. pandas is imported by the batch and export paths, requests by the refresh worker thread, and the conversion history is loaded when the History tab or the first conversion needs it, so the window appears right away with the cached exchange_rates.bin while the refresh runs in the background. python main.py --startup-time prints how long the window took to appear; the startup.* benchmarks track it.
+
+58.	MultiProviderRateSource(providers, strategy=FIRST_VALID) / build_rate_source(urls=None, strategy=FIRST_VALID) (rate_providers.py)
+    - Drop-in RateProvider that queries several rate APIs at once (exchangerate-api, open.er-api.com and Frankfurter by default, or the URLs given with --upstream), each with its own timeout. Responses are normalized to USD-based rates. With --merge first the best-scored provider is asked alone and the next one only after a failure or a hedge delay (three times its usual latency); the first valid response wins, ties go to the better score. With --merge consensus every answer is awaited and the per-currency median is taken after dropping rates more than 2% from the median of the other providers; a currency nobody agrees on falls back to the plain median, then to the best-scored provider. test_rate_providers.py covers failover, cooldown, hedging, outliers and cancellation against benchmarks/stub_upstream.py (python -m pytest). Every provider keeps a health record (moving-average latency, failures, outliers): failing providers cool off with exponential backoff and the rest are routed by score. The health is shown under the latencies in the Performance tab, and each provider's latency is recorded as provider:<name>.
+
+59.	RefreshSchedule (converter_core.py) / scheduled_refresh(self) / schedule_next_refresh(self)
+    - Background refresh of the exchange rates on a root.after timer, replacing refreshes triggered by conversions. The interval is half the smoothed time between upstream changes, so the snapshot and exchange_rates.bin stay within about half a publication period of the API. It grows while nothing changes and stays within MIN_REFRESH_INTERVAL_SECONDS and MAX_REFRESH_INTERVAL_SECONDS, starting from REFRESH_INTERVAL_SECONDS. After failures the interval is suspended and retries follow the ConnectivityMonitor backoff (up to RETRY_BACKOFF_MAX_SECONDS while offline). Every delay is jittered by ±REFRESH_JITTER.
+
+60.	write_snapshot(filename, rates, base, fetched_at) / read_snapshot(filename) (rate_snapshot.py)
+    - exchange_rates.bin is written to a temporary file in the same directory, fsynced and renamed over the old file, so a crash leaves either the old or the new snapshot. A 30-byte header holds a magic number, the schema version, the base currency, the fetch time and a CRC-32; the body is a column of currency codes and a column of float64 rates that numpy reads without parsing (about 20 µs for the full table, against about 50 µs for parsing the JSON). Truncated, corrupted or unknown-version files raise SnapshotError, and RateProvider.load_cached then falls back to the old exchange_rates.json (whose JSON errors are handled the same way) or reports that there are no cached rates.
+
+61.	SharedRateProvider(source) / SharedRateSegment (shared_rates.py) / poll_shared_rates(self)
+    - Cross-process rate cache. The latest snapshot lives in exchange_rates.shm, a memory-mapped file holding a header and the USD rate vector indexed by currency registry id, guarded by a sequence lock. The generation counter is odd while a snapshot is being written, so readers copy without locks or parsing and retry if a write overlapped. A refresh first uses a snapshot another process published in the last minute. Otherwise it takes the refresh lock (fcntl/msvcrt on exchange_rates.lock) without waiting: the process that gets it fetches and publishes, and the others wait for its snapshot, retrying the lock while they wait so they fetch themselves if the elected process fails without publishing. Only the fetching process writes the rate history. GUI instances check the generation every second (a memory read) and adopt new snapshots. --batch and --serve load their start-up rates from the segment, so many instances and batch workers cost one upstream request per refresh.
+
+62.	schedule_live_conversion(self) / live_convert(self) / update_currency_suggestions(self, combobox)
+    - The Convert Currency tab updates its result as the amount, the currencies or the exact mode change. StringVar traces are debounced with root.after (LIVE_CONVERSION_DELAY_MS), and the result is computed from the in-memory snapshot only: no request, no dialog, and no history entry (the Convert button still logs the conversion). The currency fields (and the code field of the currency name tab) are comboboxes that take a code, a name, or a pick from the suggestions, resolved by resolve_currency_code. While typing, the matching currencies are listed under the field (an exact code match first and selected) without taking the focus from it: Up/Down move through the list, Return or a click picks, Escape hides it.
+
+63.	search_currencies(prefix, limit=10) / resolve_currency_code(text) (currency_registry.py)
+    - Prefix index over the currency codes, full names and every word of the names ("dollar" finds the Canadian Dollar), kept as sorted arrays searched with bisect. Code matches come first. A lookup costs a few microseconds, well under a millisecond per keystroke.
 ---------------------------------------------------------------------------------------------------------------------------------
 Notes:
 -> The program relies on external APIs for currency data, so internet connectivity is necessary for the most up-to-date information.
--> If no internet connection is available, the app will use cached exchange rates from the 'exchange_rates.json' file
--> It uses a local JSON file ('exchange_rates.json') to store exchange rates data to avoid frequent API calls when there is no internet connection.
+-> If no internet connection is available, the app will use cached exchange rates from the 'exchange_rates.bin' snapshot file (or an older 'exchange_rates.json')
+-> It uses a local snapshot file ('exchange_rates.bin') to store exchange rates data to avoid frequent API calls when there is no internet connection.
 -> The script uses the pandas library for exporting the exchange rates table to an Excel file.
 
 References:
@@ -0,0 +1,154 @@
+import io
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from batch_pipeline import DEFAULT_CHUNK_ROWS, convert_stream, default_output_path, file_format
+from converter_core import CrossRateMatrix, convert_dataframe
+from currency_registry import CURRENCY_COUNT
+
+# Multi-core batch conversion on top of batch_pipeline. Work is split into shards (byte ranges of one large
+# CSV file, or whole files when converting many) and run on a ProcessPoolExecutor. The rate snapshot is
+# written once into a shared memory block as a float64 vector indexed by currency registry id; every worker
+# process attaches to it when it starts and builds its own CrossRateMatrix, so no task carries the rates.
+# Shard results are merged in input order while the remaining shards are still being converted.
+
+DEFAULT_SHARD_BYTES = 32 * 1024 * 1024  # Upper bound on the input one task holds in memory
+SHARDS_PER_WORKER = 4  # Several shards per worker keep every core busy until the end
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+# Worker process state, set once by _init_worker
+_worker_rates = None
+
+
+def _init_worker(shared_rates_name):
+    global _worker_rates
+    shared_rates = shared_memory.SharedMemory(name=shared_rates_name)
+    try:
+        usd_rates = np.ndarray((CURRENCY_COUNT,), dtype=np.float64, buffer=shared_rates.buf)
+        _worker_rates = CrossRateMatrix()
+        _worker_rates.update_usd_rates(usd_rates)
+        del usd_rates  # The buffer can only be closed once no array refers to it
+    finally:
+        shared_rates.close()
+
+
+@contextmanager
+def rate_snapshot_pool(rates, workers=None):
+    # ProcessPoolExecutor whose workers share one copy of the rate snapshot (a CrossRateMatrix or a
+    # {code: units per USD} dict). The shared memory block is released when the pool is shut down.
+    cross_rates = rates if isinstance(rates, CrossRateMatrix) else CrossRateMatrix(rates)
+    shared_rates = shared_memory.SharedMemory(create=True, size=cross_rates.usd_rates.nbytes)
+    try:
+        np.ndarray((CURRENCY_COUNT,), dtype=np.float64, buffer=shared_rates.buf)[:] = cross_rates.usd_rates
+        with ProcessPoolExecutor(max_workers=workers or default_workers(), initializer=_init_worker,
+                                 initargs=(shared_rates.name,)) as executor:
+            yield executor
+    finally:
+        shared_rates.close()
+        shared_rates.unlink()
+
+
+def csv_shards(path, shard_bytes):
+    # Split a CSV file into (start, end) byte ranges that begin and end on line boundaries. Returns the header
+    # line and the ranges. Fields with embedded newlines are not supported (ledger files do not use them).
+    size = os.path.getsize(path)
+    with open(path, 'rb') as file:
+        header = file.readline()
+        start = file.tell()
+        shards = []
+        while start < size:
+            file.seek(min(size, start + shard_bytes))
+            if file.tell() < size:
+                file.readline()
+            end = file.tell()
+            shards.append((start, end))
+            start = end
+    return header, shards
+
+
+def _convert_csv_shard(input_path, start, end, header, part_path, write_header, chunk_rows):
+    # Runs in a worker: convert one byte range of the input CSV into its own part file
+    with open(input_path, 'rb') as file:
+        file.seek(start)
+        data = header + file.read(end - start)
+    rows = 0
+    with open(part_path, 'w', newline='') as output:
+        for chunk in pd.read_csv(io.BytesIO(data), chunksize=chunk_rows):
+            convert_dataframe(chunk, _worker_rates).to_csv(output, index=False, header=write_header)
+            write_header = False
+            rows += len(chunk)
+    return rows
+
+
+def _convert_whole_file(input_path, output_path, chunk_rows):
+    # Runs in a worker: convert one file of a multi-file batch
+    return convert_stream(input_path, _worker_rates, output_path, chunk_rows)
+
+
+# Convert one large CSV file on `workers` processes. The output is identical to convert_stream's. Other
+# formats are converted by convert_stream in this process. progress(rows_done, fraction) is called after each
+# merged shard. Returns (output_path, number of rows).
+def convert_file_parallel(input_path, rates, output_path=None, workers=None, shard_bytes=None,
+                          chunk_rows=DEFAULT_CHUNK_ROWS, progress=None):
+    output_path = output_path or default_output_path(input_path)
+    if file_format(input_path) != '.csv' or file_format(output_path) != '.csv':
+        return convert_stream(input_path, rates, output_path, chunk_rows, progress)
+
+    workers = workers or default_workers()
+    size = os.path.getsize(input_path) or 1
+    shard_bytes = shard_bytes or max(1024 * 1024, min(DEFAULT_SHARD_BYTES, size // (workers * SHARDS_PER_WORKER)))
+    header, shards = csv_shards(input_path, shard_bytes)
+    if not shards:
+        return convert_stream(input_path, rates, output_path, chunk_rows, progress)
+
+    part_directory = tempfile.mkdtemp(prefix='batch_parts_', dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        with rate_snapshot_pool(rates, workers) as executor:
+            futures = [executor.submit(_convert_csv_shard, input_path, start, end, header,
+                                       os.path.join(part_directory, f'{number:06d}.csv'), number == 0, chunk_rows)
+                       for number, (start, end) in enumerate(shards)]
+
+            # Append the parts in input order as they become available
+            rows = 0
+            with open(output_path, 'wb') as output:
+                for number, future in enumerate(futures):
+                    rows += future.result()
+                    part_path = os.path.join(part_directory, f'{number:06d}.csv')
+                    with open(part_path, 'rb') as part:
+                        shutil.copyfileobj(part, output)
+                    os.remove(part_path)
+                    if progress is not None:
+                        progress(rows, shards[number][1] / size)
+    finally:
+        shutil.rmtree(part_directory, ignore_errors=True)
+    return output_path, rows
+
+
+# Convert many files, one file per task. output_paths defaults to <name>_converted.<ext> next to each input.
+# progress(files_done, fraction) is called as files finish, in input order. Returns [(output_path, rows), ...].
+def convert_files_parallel(input_paths, rates, output_paths=None, workers=None, chunk_rows=DEFAULT_CHUNK_ROWS,
+                           progress=None):
+    output_paths = output_paths or [default_output_path(path) for path in input_paths]
+    for path in list(input_paths) + list(output_paths):
+        file_format(path)
+
+    results = []
+    with rate_snapshot_pool(rates, min(workers or default_workers(), len(input_paths) or 1)) as executor:
+        futures = [executor.submit(_convert_whole_file, input_path, output_path, chunk_rows)
+                   for input_path, output_path in zip(input_paths, output_paths)]
+        for future in futures:
+            results.append(future.result())
+            if progress is not None:
+                progress(len(results), len(results) / len(futures))
+    return results
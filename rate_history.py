@@ -0,0 +1,217 @@
+import json
+import os
+import time
+
+import numpy as np
+
+import currency_registry
+from converter_core import currency_code_indexer
+from currency_registry import CURRENCY_CODES
+from shared_rates import file_lock
+
+# Historical exchange rates as a compact columnar store. Every snapshot is one row of float64 rates (units
+# per 1 USD) in a fixed currency order, plus a float64 timestamp: the local time the snapshot was fetched, so
+# snapshots of different providers share one clock. The files are plain arrays that are memory-mapped for
+# reading, so "EUR over the last 90 days" is a strided view into the page cache and "rates as of T" is a binary
+# search over the timestamps; nothing is parsed.
+#
+#   rate_history/codes.json     column order, fixed when the store is created (the currency registry ids)
+#   rate_history/timestamps.f8  one float64 epoch timestamp per row, ascending
+#   rate_history/rates.f8       row-major float64 matrix, one row per snapshot, NaN for missing currencies
+#   rate_history/published.f8   the provider's own publication time of each row (NaN if unknown), metadata only
+#   rate_history/append.lock    held while appending, so several converter processes can share the store
+#
+# The row count is derived from the size of timestamps.f8 whenever the store is read or appended to, so rows
+# appended by other processes show up; a timestamp is written after its rates row and publication time, so every
+# counted row is complete.
+
+RATE_HISTORY_DIR = 'rate_history'
+
+
+class RateHistoryStore:
+    def __init__(self, directory=RATE_HISTORY_DIR, codes=None):
+        self.directory = directory
+        self.codes_file = os.path.join(directory, 'codes.json')
+        self.timestamps_file = os.path.join(directory, 'timestamps.f8')
+        self.rates_file = os.path.join(directory, 'rates.f8')
+        self.published_file = os.path.join(directory, 'published.f8')
+        self.lock_file = os.path.join(directory, 'append.lock')
+        os.makedirs(directory, exist_ok=True)
+
+        with file_lock(self.lock_file):
+            if os.path.exists(self.codes_file):
+                with open(self.codes_file, 'r') as file:
+                    self.codes = json.load(file)
+            else:
+                self.codes = list(codes or CURRENCY_CODES)
+                with open(self.codes_file, 'w') as file:
+                    json.dump(self.codes, file)
+            self.index = {code: i for i, code in enumerate(self.codes)}
+            self._recover()
+        self._code_index = None
+        self._mapped_rows = -1
+        self._timestamps = None
+        self._rates = None
+        self._published = None
+
+    def _recover(self):
+        # Drop a partially written last row, e.g. after a crash in the middle of an append. Called with the
+        # append lock held, so no other process is in the middle of writing one.
+        row_bytes = len(self.codes) * 8
+        timestamp_rows = os.path.getsize(self.timestamps_file) // 8 if os.path.exists(self.timestamps_file) else 0
+        rate_rows = os.path.getsize(self.rates_file) // row_bytes if os.path.exists(self.rates_file) else 0
+        rows = min(timestamp_rows, rate_rows)
+        published_rows = os.path.getsize(self.published_file) // 8 if os.path.exists(self.published_file) else 0
+        if published_rows < rows:
+            # Rows of a store written before publication times were kept, their publication time is unknown
+            with open(self.published_file, 'ab') as file:
+                file.write(np.full(rows - published_rows, np.nan).tobytes())
+        for filename, size in ((self.timestamps_file, rows * 8), (self.rates_file, rows * row_bytes),
+                               (self.published_file, rows * 8)):
+            if os.path.exists(filename) and os.path.getsize(filename) != size:
+                with open(filename, 'r+b') as file:
+                    file.truncate(size)
+
+    def _disk_rows(self):
+        # Complete rows on disk, including the ones appended by other processes
+        try:
+            return os.path.getsize(self.timestamps_file) // 8
+        except FileNotFoundError:
+            return 0
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def code_index(self):
+        # pandas Index of the columns for batch lookups, built on first use so appends don't import pandas.
+        # Columns are the currency registry ids unless the store was created with another currency list.
+        if self._code_index is None:
+            if tuple(self.codes) == CURRENCY_CODES:
+                self._code_index = currency_registry.CURRENCY_INDEX
+            else:
+                import pandas as pd
+                self._code_index = pd.Index(self.codes)
+        return self._code_index
+
+    def append(self, rates, timestamp=None, published_at=None):
+        # Append one snapshot ({code: units per 1 USD}) fetched at `timestamp` (default now), with the provider's
+        # publication time as metadata. Returns False if it repeats the last row, or if it is not newer than the
+        # last row (only possible when the local clock went backwards).
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        published_at = np.nan if published_at is None else float(published_at)
+        row = np.full(len(self.codes), np.nan)
+        for code, rate in rates.items():
+            position = self.index.get(code)
+            if position is not None:
+                row[position] = rate
+
+        with file_lock(self.lock_file):
+            self._recover()
+            timestamps, matrix = self._mapped()
+            if len(timestamps) and (timestamp <= timestamps[-1] or
+                                    np.array_equal(row, matrix[-1], equal_nan=True)):
+                return False
+
+            # The rates row is written first, so a crash between the two writes leaves a row that _recover drops
+            with open(self.rates_file, 'ab') as file:
+                file.write(row.tobytes())
+            with open(self.published_file, 'ab') as file:
+                file.write(np.float64(published_at).tobytes())
+            with open(self.timestamps_file, 'ab') as file:
+                file.write(np.float64(timestamp).tobytes())
+        return True
+
+    def _mapped(self):
+        # Memory maps of (timestamps, rates matrix), remapped only when rows were appended (by any process)
+        rows = self._disk_rows()
+        if self._mapped_rows != rows:
+            if rows:
+                self._timestamps = np.memmap(self.timestamps_file, dtype=np.float64, mode='r', shape=(rows,))
+                self._rates = np.memmap(self.rates_file, dtype=np.float64, mode='r', shape=(rows, len(self.codes)))
+                self._published = np.memmap(self.published_file, dtype=np.float64, mode='r', shape=(rows,))
+            else:
+                self._timestamps = np.empty(0)
+                self._rates = np.empty((0, len(self.codes)))
+                self._published = np.empty(0)
+            self._mapped_rows = rows
+        return self._timestamps, self._rates
+
+    @property
+    def timestamps(self):
+        return self._mapped()[0]
+
+    @property
+    def matrix(self):
+        return self._mapped()[1]
+
+    @property
+    def published(self):
+        # Provider publication time of every row (NaN if unknown); lookups by time use the fetch timestamps
+        self._mapped()
+        return self._published
+
+    def row_index_as_of(self, timestamp):
+        # Index of the snapshot in effect at `timestamp` (the last one taken at or before it), or -1
+        return int(np.searchsorted(self.timestamps, timestamp, side='right')) - 1
+
+    def row_indexes_as_of(self, timestamps):
+        # Snapshot index in effect for every timestamp (-1 before the first snapshot). Sorted input is matched
+        # in one merge pass: each snapshot boundary is located among the transactions (a search per snapshot,
+        # not per row) and the row indexes are laid out with a single np.repeat. Unsorted input is sorted first.
+        timestamps = np.asarray(timestamps, dtype=float)
+        if len(timestamps) > 1 and np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind='stable')
+            rows = np.empty(len(timestamps), dtype=np.int64)
+            rows[order] = self.row_indexes_as_of(timestamps[order])
+            return rows
+
+        snapshot_timestamps = self.timestamps
+        boundaries = np.searchsorted(timestamps, snapshot_timestamps, side='left')
+        counts = np.diff(np.concatenate(([0], boundaries, [len(timestamps)])))
+        return np.repeat(np.arange(-1, len(snapshot_timestamps), dtype=np.int64), counts)
+
+    def rate_as_of(self, source_currency, target_currency, timestamp):
+        # Units of target_currency per 1 source_currency in the snapshot in effect at `timestamp`, or None
+        row = self.row_index_as_of(timestamp)
+        source = self.index.get(source_currency)
+        target = self.index.get(target_currency)
+        if row < 0 or source is None or target is None:
+            return None
+        rate = float(self.matrix[row, target] / self.matrix[row, source])
+        return None if np.isnan(rate) else rate
+
+    def convert_batch_as_of(self, amounts, source_codes, target_codes, timestamps):
+        # Vectorized point-in-time conversion: each row uses the rates in effect at its own timestamp.
+        # Rows before the first snapshot, with unknown codes or negative amounts come back as NaN.
+        amounts = np.asarray(amounts, dtype=float)
+        rows = self.row_indexes_as_of(timestamps)
+        sources = currency_code_indexer(self.code_index, source_codes)
+        targets = currency_code_indexer(self.code_index, target_codes)
+
+        valid = (rows >= 0) & (sources >= 0) & (targets >= 0) & (amounts >= 0)
+        converted = np.full(len(amounts), np.nan)
+        matrix = self.matrix
+        with np.errstate(divide='ignore', invalid='ignore'):
+            converted[valid] = (amounts[valid] / matrix[rows[valid], sources[valid]]
+                                * matrix[rows[valid], targets[valid]])
+        return converted
+
+    def as_of(self, timestamp):
+        # {code: rate} of the snapshot in effect at `timestamp`, or {} if there is none that old
+        row = self.row_index_as_of(timestamp)
+        if row < 0:
+            return {}
+        values = self.matrix[row]
+        return {code: float(values[i]) for i, code in enumerate(self.codes) if not np.isnan(values[i])}
+
+    def series(self, currency_code, start=None, end=None):
+        # (timestamps, rates) of one currency between start and end (inclusive), both zero-copy views
+        timestamps, matrix = self._mapped()
+        first = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        last = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side='right'))
+        return timestamps[first:last], matrix[first:last, self.index[currency_code]]
+
+    def last_days(self, currency_code, days):
+        # e.g. last_days("EUR", 90)
+        return self.series(currency_code, start=time.time() - days * 86400)
@@ -0,0 +1,305 @@
+import math
+import threading
+import time
+import warnings
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from converter_core import (API_URL, RATES_FILE, REQUEST_TIMEOUT, RETRY_BACKOFF_BASE_SECONDS,
+                            RETRY_BACKOFF_MAX_SECONDS, RateFetchClient, RateProvider)
+from currency_registry import CURRENCY_CODES, CURRENCY_COUNT, CURRENCY_IDS
+from latency_metrics import METRICS
+from rate_snapshot import write_snapshot
+
+# Several rate APIs queried concurrently, so one slow or failing upstream no longer leaves the app without
+# rates. Each upstream has its own timeout and health record (latency, failures, disagreements with the
+# others). The health decides the routing: providers that keep failing are skipped for a cooling-off period
+# and the others are tried best score first. Responses are merged with one of two strategies:
+#
+#   first      ask the best provider; the next one is only asked as well when the first fails or has not
+#              answered within its hedge delay (a multiple of its usual latency). The first valid response
+#              wins, ties go to the better score. This is the default and costs one request per refresh.
+#   consensus  ask every provider at once and take the per-currency median, after dropping rates that are more
+#              than OUTLIER_TOLERANCE away from the median of the other providers. A currency on which no
+#              provider agrees with the others falls back to the plain median, then to the best-scored provider.
+#
+# MultiProviderRateSource is a drop-in RateProvider: fetch() returns one {"base": "USD", "rates": {...}}
+# snapshot and writes it to the rates snapshot file.
+
+FIRST_VALID = "first"
+CONSENSUS = "consensus"
+MERGE_STRATEGIES = (FIRST_VALID, CONSENSUS)
+
+# A response must contain at least this many supported currencies to be accepted
+MIN_VALID_CURRENCIES = 20
+# Relative distance from the per-currency median beyond which a provider's rate is rejected as an outlier
+OUTLIER_TOLERANCE = 0.02
+# Weight of the newest latency sample in a provider's moving average
+LATENCY_SMOOTHING = 0.3
+# In "first" mode the next provider is asked as well after HEDGE_LATENCY_FACTOR times the current one's usual
+# latency, within MIN/MAX_HEDGE_DELAY_SECONDS, or after HEDGE_DELAY_SECONDS while its latency is unknown
+HEDGE_LATENCY_FACTOR = 3
+HEDGE_DELAY_SECONDS = 1.0
+MIN_HEDGE_DELAY_SECONDS = 0.2
+MAX_HEDGE_DELAY_SECONDS = 5.0
+
+DEFAULT_PROVIDER_URLS = (
+    API_URL,
+    "https://open.er-api.com/v6/latest/USD",
+    "https://api.frankfurter.app/latest?from=USD",
+)
+
+
+def normalize_snapshot(data):
+    # Bring the response formats of the supported APIs into {"base": "USD", "rates": {code: units per USD},
+    # "time_last_updated": epoch or None}. Raises ValueError for responses that can't be used.
+    if not isinstance(data, dict) or not isinstance(data.get("rates"), dict):
+        raise ValueError("Response has no rates table")
+    base = data.get("base") or data.get("base_code") or "USD"
+    rates = {}
+    for code, rate in data["rates"].items():
+        if code in CURRENCY_IDS and isinstance(rate, (int, float)) and math.isfinite(rate) and rate > 0:
+            rates[code] = float(rate)
+    rates.setdefault(base, 1.0)
+    if base != "USD":
+        # Rates quoted per another base currency (e.g. EUR) are rebased on USD
+        if "USD" not in rates:
+            raise ValueError(f"Rates are based on {base} and have no USD rate")
+        usd = rates["USD"]
+        rates = {code: rate / usd for code, rate in rates.items()}
+    rates["USD"] = 1.0
+    if len(rates) < MIN_VALID_CURRENCIES:
+        raise ValueError(f"Response only has {len(rates)} supported currencies")
+    return {"base": "USD", "rates": rates,
+            "time_last_updated": data.get("time_last_updated") or data.get("time_last_update_unix")}
+
+
+class ProviderHealth:
+    def __init__(self):
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.outliers = 0  # Rates rejected by consensus merges
+        self.compared = 0  # Rates compared in consensus merges
+        self.latency = None  # Moving average of successful fetches, seconds
+        self.last_error = None
+        self.cooldown_until = 0.0
+
+    def record_success(self, latency):
+        self.successes += 1
+        self.consecutive_failures = 0
+        self.last_error = None
+        self.cooldown_until = 0.0
+        self.latency = latency if self.latency is None else (
+            LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * self.latency)
+
+    def record_failure(self, error):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+        backoff = RETRY_BACKOFF_BASE_SECONDS * 2 ** (self.consecutive_failures - 1)
+        self.cooldown_until = time.monotonic() + min(backoff, RETRY_BACKOFF_MAX_SECONDS)
+
+    def available(self):
+        return time.monotonic() >= self.cooldown_until
+
+    def score(self):
+        # Lower is better: expected latency, penalized by the share of failed fetches and rejected rates
+        attempts = self.successes + self.failures
+        failure_rate = self.failures / attempts if attempts else 0.0
+        outlier_rate = self.outliers / self.compared if self.compared else 0.0
+        return (self.latency if self.latency is not None else 1.0) * (1 + 4 * failure_rate + 4 * outlier_rate)
+
+    def as_dict(self):
+        return {"successes": self.successes, "failures": self.failures, "outliers": self.outliers,
+                "latency": self.latency, "last_error": self.last_error, "available": self.available(),
+                "score": self.score()}
+
+
+class UpstreamProvider:
+    def __init__(self, url, name=None, timeout=REQUEST_TIMEOUT):
+        self.url = url
+        self.name = name or url.split("//")[-1].split("/")[0]
+        self.timeout = timeout  # (connect, read) seconds, like REQUEST_TIMEOUT
+        self.health = ProviderHealth()
+
+    def deadline(self):
+        return sum(self.timeout) if isinstance(self.timeout, tuple) else self.timeout
+
+
+class MultiProviderRateSource(RateProvider):
+    def __init__(self, providers, strategy=FIRST_VALID, rates_file=RATES_FILE, client=None):
+        if strategy not in MERGE_STRATEGIES:
+            raise ValueError(f"Unknown merge strategy {strategy!r}, use one of {', '.join(MERGE_STRATEGIES)}")
+        providers = [provider if isinstance(provider, UpstreamProvider) else UpstreamProvider(provider)
+                     for provider in providers]
+        super().__init__(providers[0].url, rates_file, providers[0].timeout, client)
+        self.providers = providers
+        self.strategy = strategy
+        self._executor = ThreadPoolExecutor(max_workers=2 * len(providers), thread_name_prefix="rate-provider")
+        self._lock = threading.Lock()
+        self._saved_rates = None
+
+    @property
+    def client(self):
+        # Failover across providers replaces retrying the same one, so the own client does not retry
+        with self._lock:
+            if self._client is None:
+                self._client = RateFetchClient(retries=0)
+            return self._client
+
+    def route(self):
+        # Providers to query, best first; the ones cooling off after failures are skipped unless all are
+        available = [provider for provider in self.providers if provider.health.available()]
+        return sorted(available or self.providers, key=lambda provider: provider.health.score())
+
+    def _query(self, provider, cancel_event):
+        # Runs on the executor: one provider's fetch, recorded in its health and the latency metrics
+        import requests
+        started = time.monotonic()
+        try:
+            data, _ = self.client.get_json(provider.url, provider.timeout, cancel_event)
+            if data is None:
+                return provider, None
+            snapshot = normalize_snapshot(data)
+        except (requests.RequestException, ValueError, KeyError) as e:
+            with self._lock:
+                provider.health.record_failure(str(e))
+            raise
+        latency = time.monotonic() - started
+        with self._lock:
+            provider.health.record_success(latency)
+        METRICS.observe(f"provider:{provider.name}", latency)
+        return provider, snapshot
+
+    def hedge_delay(self, provider):
+        # How long a provider has to answer before the next one is asked as well
+        latency = provider.health.latency
+        if latency is None:
+            return HEDGE_DELAY_SECONDS
+        return min(max(HEDGE_LATENCY_FACTOR * latency, MIN_HEDGE_DELAY_SECONDS), MAX_HEDGE_DELAY_SECONDS)
+
+    def fetch(self, cancel_event=None):
+        # Query the routed providers and merge their answers. Returns None if cancelled, raises ValueError
+        # listing every provider's error if none of them delivered valid rates.
+        import requests
+        queued = self.route()
+        # Consensus needs every provider, "first" starts with the best one and hedges with the next ones
+        launch = len(queued) if self.strategy == CONSENSUS else 1
+        futures = {}
+        pending = set()
+        snapshots = []
+        errors = []
+        deadline = hedge_at = time.monotonic()
+        while True:
+            now = time.monotonic()
+            if queued and (not pending or now >= hedge_at):
+                for provider in queued[:launch]:
+                    future = self._executor.submit(self._query, provider, cancel_event)
+                    futures[future] = provider
+                    pending.add(future)
+                    deadline = max(deadline, now + provider.deadline())
+                hedge_at = now + self.hedge_delay(queued[launch - 1])
+                queued = queued[launch:]
+                launch = 1
+            if not pending or now >= deadline:
+                break
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            timeout = min(0.1, deadline - now, hedge_at - now if queued else deadline - now)
+            done, pending = wait(pending, timeout=max(0.0, timeout), return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    provider, snapshot = future.result()
+                except (requests.RequestException, ValueError, KeyError) as e:
+                    errors.append(f"{futures[future].name}: {e}")
+                    continue
+                if snapshot is not None:
+                    snapshots.append((provider, snapshot))
+            if snapshots and self.strategy == FIRST_VALID:
+                break
+
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        if not snapshots:
+            errors += [f"{futures[future].name}: timed out" for future in pending]
+            errors += [f"{provider.name}: not tried" for provider in queued]
+            raise ValueError("Failed to fetch exchange rates from any provider. " + "; ".join(errors))
+
+        if self.strategy == FIRST_VALID:
+            # Responses that arrived together: the better-scored provider wins
+            with self._lock:
+                provider, snapshot = min(snapshots, key=lambda item: item[0].health.score())
+            data = dict(snapshot)
+            data["providers"] = [provider.name]
+        else:
+            data = self.consensus(snapshots)
+            data["providers"] = [provider.name for provider, _ in snapshots]
+        self._save(data["rates"])
+        return data
+
+    def consensus(self, snapshots):
+        # Per-currency median across providers, ignoring rates further than OUTLIER_TOLERANCE from the median
+        # of the other providers' rates for that currency
+        matrix = np.full((len(snapshots), CURRENCY_COUNT), np.nan)
+        for row, (_, snapshot) in enumerate(snapshots):
+            for code, rate in snapshot["rates"].items():
+                matrix[row, CURRENCY_IDS[code]] = rate
+
+        present = ~np.isnan(matrix)
+        outliers = np.zeros(matrix.shape, dtype=bool)
+        with warnings.catch_warnings(), np.errstate(invalid='ignore'):
+            # Currencies only one provider has give all-NaN medians, they are simply not compared
+            warnings.simplefilter("ignore", RuntimeWarning)
+            for row in range(len(snapshots) if len(snapshots) > 1 else 0):
+                others = np.nanmedian(np.delete(matrix, row, axis=0), axis=0)
+                outliers[row] = np.abs(matrix[row] / others - 1) > OUTLIER_TOLERANCE
+
+        # Currencies where every rate was rejected (with three providers the median of the other two is their
+        # mean, so one outlier drags it away from the good rates too) are compared with the plain median instead,
+        # and the ones still unresolved (e.g. two providers far apart) keep the rate of the best-scored provider
+        # that has them instead of disappearing
+        unresolved = present.any(axis=0) & (outliers | ~present).all(axis=0)
+        if unresolved.any():
+            with warnings.catch_warnings(), np.errstate(invalid='ignore'):
+                warnings.simplefilter("ignore", RuntimeWarning)
+                median = np.nanmedian(matrix[:, unresolved], axis=0)
+                outliers[:, unresolved] = np.abs(matrix[:, unresolved] / median - 1) > OUTLIER_TOLERANCE
+            unresolved = present.any(axis=0) & (outliers | ~present).all(axis=0)
+        with self._lock:
+            ranking = sorted(range(len(snapshots)), key=lambda row: snapshots[row][0].health.score())
+        for row in ranking:
+            take = unresolved & present[row]
+            outliers[row, take] = False
+            unresolved &= ~take
+
+        kept = np.where(outliers, np.nan, matrix)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            merged = np.nanmedian(kept, axis=0)
+
+        with self._lock:
+            for row, (provider, _) in enumerate(snapshots):
+                provider.health.compared += int(np.count_nonzero(present[row]))
+                provider.health.outliers += int(np.count_nonzero(outliers[row]))
+        timestamps = [snapshot["time_last_updated"] for _, snapshot in snapshots if snapshot["time_last_updated"]]
+        return {"base": "USD", "time_last_updated": max(timestamps) if timestamps else None,
+                "rates": {CURRENCY_CODES[i]: float(merged[i]) for i in np.flatnonzero(~np.isnan(merged))}}
+
+    def _save(self, rates):
+        # Rewrite the snapshot file only when the merged rates changed
+        if rates != self._saved_rates:
+            with METRICS.measure("rates_file_write"):
+                write_snapshot(self.rates_file, rates, "USD", time.time())
+            self._saved_rates = rates
+
+    def health_report(self):
+        # {provider name: health counters and routing score}
+        with self._lock:
+            return {provider.name: provider.health.as_dict() for provider in self.providers}
+
+
+def build_rate_source(urls=None, strategy=FIRST_VALID, rates_file=RATES_FILE):
+    # Rate source for the given upstream URLs (the built-in provider list by default)
+    return MultiProviderRateSource(list(urls or DEFAULT_PROVIDER_URLS), strategy, rates_file)
@@ -0,0 +1,200 @@
+import asyncio
+import json
+import math
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import requests
+
+from converter_core import CurrencyConverter, RateProvider, API_URL
+
+# Local HTTP/JSON service exposing the converter to other processes on the machine, so they share one cached
+# rate snapshot instead of each calling the rates API. Endpoints:
+#   GET  /convert?amount=100&from=EUR&to=INR
+#   GET  /rates?base=EUR
+#   POST /batch  {"amounts": [...], "from": [...], "to": [...]}
+# It runs on a single asyncio event loop with a minimal HTTP/1.1 parser (keep-alive supported). Upstream
+# refreshes run in a thread and are coalesced: a burst of requests arriving while the snapshot is stale
+# triggers at most one upstream fetch, which all of them wait on.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Largest request body accepted (a /batch of about a million rows); bigger ones are refused before being read
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+           503: "Service Unavailable"}
+
+
+class RateServer:
+    def __init__(self, converter=None, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.converter = converter or CurrencyConverter()
+        self.host = host
+        self.port = port
+        self.upstream_refreshes = 0
+        self._refresh_task = None
+        self._rates_bodies = {}  # (snapshot fetched_at, base) -> serialized /rates response
+        self._server = None
+
+    async def start(self):
+        try:
+            self.converter.load_cached_rates()
+        except FileNotFoundError:
+            pass
+        self._server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        # Port 0 picks a free port, report the real one
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self._server
+
+    async def serve_forever(self):
+        server = await self.start()
+        print(f"Serving exchange rates on http://{self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+
+    async def ensure_rates(self):
+        # Serve from memory while the snapshot is fresh. When it has expired, start (or join) a single
+        # upstream refresh; requests only wait for it when there is no snapshot at all.
+        cache = self.converter.rate_cache
+        if cache.get() is not None:
+            return
+        if self._refresh_task is None and self.converter.connectivity.should_attempt():
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh())
+        if not cache.rates and self._refresh_task is not None:
+            await asyncio.shield(self._refresh_task)
+
+    async def _refresh(self):
+        try:
+            self.upstream_refreshes += 1
+            await asyncio.get_running_loop().run_in_executor(None, self.converter.refresh)
+        except (requests.RequestException, ValueError, KeyError):
+            # Recorded by the connectivity monitor, requests keep using the stale snapshot
+            pass
+        finally:
+            self._refresh_task = None
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self.send(writer, 400, {"error": "Malformed request line."}, keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode('latin-1').partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                body = b""
+                if "content-length" in headers:
+                    length = headers["content-length"]
+                    if not length.isdigit():
+                        # The rest of the stream can't be framed, answer and drop the connection
+                        await self.send(writer, 400, {"error": "Invalid Content-Length."}, keep_alive=False)
+                        break
+                    if int(length) > MAX_BODY_BYTES:
+                        # Not read at all, so the connection is dropped too
+                        await self.send(writer, 413, {"error": f"Request body over {MAX_BODY_BYTES} bytes."},
+                                        keep_alive=False)
+                        break
+                    body = await reader.readexactly(int(length))
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" and (version == "HTTP/1.1" or connection == "keep-alive")
+
+                status, payload = await self.dispatch(method, target, body)
+                await self.send(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def send(self, writer, status, payload, keep_alive=True):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload, allow_nan=False).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        routes = {"/convert": ("GET", self.convert), "/rates": ("GET", self.rates), "/batch": ("POST", self.batch)}
+        if url.path not in routes:
+            return 404, {"error": f"Unknown path {url.path}"}
+        allowed_method, handler = routes[url.path]
+        if method != allowed_method:
+            return 405, {"error": f"Use {allowed_method} for {url.path}"}
+
+        await self.ensure_rates()
+        if not self.converter.rate_cache.rates:
+            return 503, {"error": "No exchange rates available."}
+        try:
+            result = handler(query, body)
+            # Serialized here so a result that isn't valid JSON (e.g. an overflow to infinity) is a 400 too
+            if not isinstance(result, bytes):
+                result = json.dumps(result, allow_nan=False).encode('utf-8')
+            return 200, result
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {"error": str(e)}
+
+    def convert(self, query, body):
+        source_currency = query.get("from", "USD").upper()
+        target_currency = query["to"].upper()
+        amount = float(query["amount"])
+        if not math.isfinite(amount):
+            raise ValueError("Invalid input for amount. Please enter a valid number.")
+        converted_amount = self.converter.convert(amount, source_currency, target_currency)
+        return {"amount": amount, "from": source_currency, "to": target_currency,
+                "converted_amount": converted_amount, "fetched_at": self.converter.rate_cache.fetched_at}
+
+    def rates(self, query, body):
+        # The serialized table is cached per snapshot and base currency
+        cache = self.converter.rate_cache
+        base_currency = query.get("base", "USD").upper()
+        key = (cache.fetched_at, base_currency)
+        if key not in self._rates_bodies:
+            rates = cache.rates if base_currency == "USD" else cache.cross_rates.row(base_currency)
+            if not rates:
+                raise ValueError(f"Unknown base currency {base_currency}")
+            self._rates_bodies = {key: json.dumps({"base": base_currency, "fetched_at": cache.fetched_at,
+                                                   "rates": rates}, allow_nan=False).encode('utf-8')}
+        return self._rates_bodies[key]
+
+    def batch(self, query, body):
+        request = json.loads(body)
+        columns = request["amounts"], request["from"], request["to"]
+        if not all(isinstance(column, list) for column in columns):
+            raise ValueError("amounts, from and to must be arrays.")
+        if len(set(map(len, columns))) != 1:
+            raise ValueError("amounts, from and to must have the same length.")
+        amounts = np.asarray(columns[0], dtype=float)
+        if amounts.ndim != 1 or not np.isfinite(amounts).all():
+            raise ValueError("amounts must be finite numbers.")
+        with np.errstate(over='ignore'):
+            converted = self.converter.convert_batch(amounts, request["from"], request["to"])
+        # NaN (invalid rows) and infinity (overflow) are not valid JSON, report those rows as null
+        return {"converted_amounts": [value if math.isfinite(value) else None for value in converted.tolist()]}
+
+
+def run_server(host=DEFAULT_HOST, port=DEFAULT_PORT, api_url=API_URL, provider=None):
+    server = RateServer(CurrencyConverter(provider or RateProvider(api_url)), host, port)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,111 @@
+import json
+import os
+import struct
+import tempfile
+import zlib
+
+import numpy as np
+
+from currency_registry import CURRENCY_CODES
+
+# Crash-safe binary file holding the latest exchange rates snapshot (exchange_rates.bin). A snapshot is
+# written to a temporary file in the same directory, flushed to disk and renamed over the old one, so readers
+# see either the previous or the new snapshot, never a truncated one. The fixed header carries everything
+# needed to use and check the body, and the body is a packed array that numpy reads without parsing:
+#
+#   header  magic (8 bytes), schema version (uint16), base currency (3 ASCII bytes), fetched-at (float64 epoch
+#           seconds), number of rates (uint32), CRC-32 of the header fields and the body (uint32)
+#   body    the currency codes (3 ASCII bytes each), then their rates in the same order (float64 units per
+#           1 base unit)
+#
+# Codes are stored instead of registry ids so a file stays valid when currencies are added to the registry.
+# The code column rarely changes between snapshots, so its decoded form is reused from the previous load.
+# The old exchange_rates.json (a plain {code: rate} object) is still read when there is no valid binary file.
+
+SNAPSHOT_MAGIC = b"CCRATES\n"
+SNAPSHOT_VERSION = 1
+HEADER = struct.Struct("<8sH3sxdII")
+CODE_BYTES = 3
+RATE_BYTES = 8
+
+# Interned registry code for every stored code, so loading doesn't decode or allocate strings
+_CODES_BY_BYTES = {code.encode('ascii'): code for code in CURRENCY_CODES}
+_decoded_codes = (None, None)  # (code column bytes, list of codes) of the last load
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def encode_snapshot(rates, base="USD", fetched_at=0.0):
+    body = b"".join(code.encode('ascii') for code in rates) + np.array(list(rates.values()), dtype='<f8').tobytes()
+    fields = (SNAPSHOT_MAGIC, SNAPSHOT_VERSION, base.encode('ascii'), float(fetched_at), len(rates))
+    checksum = zlib.crc32(body, zlib.crc32(HEADER.pack(*fields, 0)))
+    return HEADER.pack(*fields, checksum) + body
+
+
+def decode_snapshot(data):
+    # (rates, base, fetched_at) from the bytes of a snapshot file, raises SnapshotError if they are not valid
+    if len(data) < HEADER.size:
+        raise SnapshotError("Snapshot file is truncated")
+    magic, version, base, fetched_at, count, checksum = HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC:
+        raise SnapshotError("Not an exchange rates snapshot file")
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot version {version}")
+    body = memoryview(data)[HEADER.size:]
+    if len(body) != count * (CODE_BYTES + RATE_BYTES):
+        raise SnapshotError("Snapshot file is truncated")
+    fields = (magic, version, base, fetched_at, count)
+    if zlib.crc32(body, zlib.crc32(HEADER.pack(*fields, 0))) != checksum:
+        raise SnapshotError("Snapshot checksum mismatch")
+
+    global _decoded_codes
+    code_column = bytes(body[:count * CODE_BYTES])
+    if code_column != _decoded_codes[0]:
+        codes = [code_column[i:i + CODE_BYTES] for i in range(0, len(code_column), CODE_BYTES)]
+        _decoded_codes = (code_column, [_CODES_BY_BYTES.get(code) or code.decode('ascii') for code in codes])
+    rates = np.frombuffer(body, dtype='<f8', offset=count * CODE_BYTES).tolist()
+    return dict(zip(_decoded_codes[1], rates)), base.decode('ascii'), fetched_at
+
+
+def write_snapshot(filename, rates, base="USD", fetched_at=0.0):
+    # Atomic replace: temporary file in the target directory, fsync, rename, fsync of the directory
+    directory = os.path.dirname(os.path.abspath(filename))
+    data = encode_snapshot(rates, base, fetched_at)
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(filename) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, filename)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    if hasattr(os, 'O_DIRECTORY'):
+        # Make the rename itself durable (POSIX only, Windows has no directory handles)
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def read_snapshot(filename):
+    # (rates, base, fetched_at), raises FileNotFoundError or SnapshotError
+    with open(filename, 'rb') as file:
+        return decode_snapshot(file.read())
+
+
+def read_legacy_rates(filename):
+    # (rates, base, fetched_at) from an old exchange_rates.json, dated by its modification time. Raises
+    # FileNotFoundError or SnapshotError (e.g. for a file truncated by a crash while it was rewritten).
+    try:
+        with open(filename, 'r') as json_file:
+            rates = json.load(json_file)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise SnapshotError(f"Unreadable rates file: {e}") from e
+    if not isinstance(rates, dict):
+        raise SnapshotError("Unreadable rates file: not a rates table")
+    return rates, "USD", os.path.getmtime(filename)
@@ -0,0 +1,255 @@
+import mmap
+import os
+import struct
+import time
+import zlib
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from converter_core import MIN_REFRESH_INTERVAL_SECONDS, RATES_FILE, RateProvider
+from currency_registry import CURRENCY_CODES, CURRENCY_COUNT, CURRENCY_IDS
+
+# Rate snapshot shared by every converter process on the machine (GUI instances, --serve, --batch and its
+# workers), so they fetch from the upstream once instead of once each. The snapshot lives in a small memory-
+# mapped file next to the rates file (exchange_rates.shm): a header and the USD rate vector indexed by
+# currency registry id. Reading it is a few memory loads and one vector copy, no system call and no parsing.
+#
+# Writers and readers are coordinated with a sequence lock: the generation counter is odd while a snapshot is
+# being written and is bumped to the next even value when it is complete, so a reader that sees the same even
+# generation before and after copying has a consistent snapshot, and a changed generation tells it there is
+# something new. Only one process writes at a time: the one holding the refresh lock (an fcntl/msvcrt lock on
+# exchange_rates.lock, released by the OS if the process dies). Whoever wants fresh rates takes the lock
+# without waiting; the process that gets it fetches and publishes, the others wait for its snapshot.
+#
+#   header  magic (8 bytes), version (uint16), registry fingerprint (uint32), generation (uint64), fetched-at
+#           (float64 epoch seconds), base currency (3 ASCII bytes)
+#   body    CURRENCY_COUNT float64 rates at offset 64, NaN for currencies the snapshot doesn't have
+
+SEGMENT_MAGIC = b"CCSHMEM\n"
+SEGMENT_VERSION = 1
+HEADER = struct.Struct("<8sH2xI")
+GENERATION_OFFSET = 16
+SNAPSHOT_FIELDS = struct.Struct("<d3s")
+SNAPSHOT_FIELDS_OFFSET = 24
+BODY_OFFSET = 64
+SEGMENT_SIZE = BODY_OFFSET + CURRENCY_COUNT * 8
+# Registry the rate vector is laid out for; processes with a different registry re-create the segment
+REGISTRY_FINGERPRINT = zlib.crc32(",".join(CURRENCY_CODES).encode('ascii'))
+
+# Reads that keep overlapping a write give up after this many attempts (a writer died mid-write)
+SEQLOCK_RETRIES = 100
+# How long a process waits for another one's refresh before giving up, and how often it looks
+WAIT_FOR_REFRESH_SECONDS = 30
+WAIT_POLL_SECONDS = 0.05
+
+
+def shared_paths(rates_file=RATES_FILE):
+    # (segment file, lock file) belonging to a rates file
+    stem = os.path.splitext(rates_file)[0]
+    return stem + '.shm', stem + '.lock'
+
+
+def _lock(fd, blocking):
+    # Exclusive lock on the file, False if it is held elsewhere and blocking is off
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+    except (BlockingIOError, PermissionError):
+        return False
+    return True
+
+
+def _unlock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path, blocking=True):
+    # with file_lock(path, blocking=False) as acquired: ... (also excludes other threads of this process)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    acquired = _lock(fd, blocking)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            _unlock(fd)
+        os.close(fd)
+
+
+class SharedRateSegment:
+    def __init__(self, path, lock_path):
+        self.path = path
+        self.lock_path = lock_path
+        if not self._valid():
+            with file_lock(lock_path):
+                if not self._valid():
+                    self._create()
+        with open(path, 'r+b') as file:
+            self._mmap = mmap.mmap(file.fileno(), SEGMENT_SIZE)
+        self._generation = np.ndarray((1,), dtype='<u8', buffer=self._mmap, offset=GENERATION_OFFSET)
+        self._rates = np.ndarray((CURRENCY_COUNT,), dtype='<f8', buffer=self._mmap, offset=BODY_OFFSET)
+
+    def _valid(self):
+        try:
+            with open(self.path, 'rb') as file:
+                header = file.read(HEADER.size)
+                size = os.fstat(file.fileno()).st_size
+        except FileNotFoundError:
+            return False
+        return size == SEGMENT_SIZE and header == HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, REGISTRY_FINGERPRINT)
+
+    def _create(self):
+        # Empty segment (generation 0), written aside and renamed so mapped readers never see it half-written
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as file:
+            file.write(HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, REGISTRY_FINGERPRINT))
+            file.write(bytes(SEGMENT_SIZE - HEADER.size))
+        os.replace(temp_path, self.path)
+
+    @property
+    def generation(self):
+        # 0 while nothing was published; compare with a previous value to see if there is a new snapshot
+        return int(self._generation[0])
+
+    def read(self):
+        # (generation, USD rate vector, fetched_at, base) of the latest snapshot, or None if there is none
+        for _ in range(SEQLOCK_RETRIES):
+            start = int(self._generation[0])
+            if start == 0:
+                return None
+            if start % 2:
+                time.sleep(0)  # Being written, let the writer finish
+                continue
+            rates = self._rates.copy()
+            fetched_at, base = SNAPSHOT_FIELDS.unpack_from(self._mmap, SNAPSHOT_FIELDS_OFFSET)
+            if int(self._generation[0]) == start:
+                return start, rates, fetched_at, base.decode('ascii')
+        return None
+
+    def publish(self, rates, fetched_at, base="USD"):
+        # Only called while holding the refresh lock, so there is a single writer
+        vector = np.full(CURRENCY_COUNT, np.nan)
+        for code, rate in rates.items():
+            currency_id = CURRENCY_IDS.get(code)
+            if currency_id is not None:
+                vector[currency_id] = rate
+        generation = int(self._generation[0])
+        writing = generation if generation % 2 else generation + 1  # Odd already if a writer died mid-write
+        self._generation[0] = writing
+        self._rates[:] = vector
+        SNAPSHOT_FIELDS.pack_into(self._mmap, SNAPSHOT_FIELDS_OFFSET, fetched_at, base.encode('ascii'))
+        self._generation[0] = writing + 1
+        return writing + 1
+
+    def refresh_lock(self, blocking=False):
+        return file_lock(self.lock_path, blocking)
+
+    def close(self):
+        del self._generation, self._rates
+        self._mmap.close()
+
+
+# Wraps a rate provider (RateProvider or MultiProviderRateSource) so all processes share its fetches. A
+# snapshot another process published less than max_age seconds ago is used as is; otherwise the refresh lock
+# decides who fetches, and the others pick up the published result.
+class SharedRateProvider(RateProvider):
+    def __init__(self, source, max_age=MIN_REFRESH_INTERVAL_SECONDS):
+        super().__init__(source.api_url, source.rates_file, source.timeout)
+        self.source = source
+        self.max_age = max_age
+        self.segment = SharedRateSegment(*shared_paths(source.rates_file))
+
+    def __getattr__(self, name):
+        # Everything else (health_report, providers, ...) is the wrapped source's
+        source = self.__dict__.get('source')
+        if source is None:
+            raise AttributeError(name)
+        return getattr(source, name)
+
+    @property
+    def generation(self):
+        return self.segment.generation
+
+    def read_shared(self):
+        # Latest published snapshot as a fetch result marked "shared", or None
+        snapshot = self.segment.read()
+        if snapshot is None:
+            return None
+        generation, vector, fetched_at, base = snapshot
+        rates = {CURRENCY_CODES[i]: rate for i, rate in enumerate(vector.tolist()) if rate == rate}
+        return {"base": base, "rates": rates, "fetched_at": fetched_at, "time_last_updated": None,
+                "generation": generation, "shared": True}
+
+    def _is_recent(self, data):
+        return data is not None and time.time() - data["fetched_at"] < self.max_age
+
+    def fetch(self, cancel_event=None):
+        shared = self.read_shared()
+        if self._is_recent(shared):
+            return shared
+        elected, data = self._refresh_if_elected(cancel_event)
+        if elected:
+            return data
+        return self._wait_for_refresh(shared, cancel_event)
+
+    def _refresh_if_elected(self, cancel_event):
+        # (True, fetch result) if this process got the refresh lock, (False, None) while another process holds it
+        with self.segment.refresh_lock() as elected:
+            if not elected:
+                return False, None
+            # Someone may have published while we were taking the lock
+            shared = self.read_shared()
+            if self._is_recent(shared):
+                return True, shared
+            data = self.source.fetch(cancel_event)
+            if data is not None:
+                self.segment.publish(data['rates'], time.time(), data.get('base', "USD"))
+            return True, data
+
+    def _wait_for_refresh(self, shared, cancel_event):
+        # Another process is fetching: wait for its snapshot instead of sending a second request. If it gives up
+        # without publishing (e.g. its upstream failed), the lock is free again and this process fetches itself.
+        seen = shared["generation"] if shared is not None else 0
+        deadline = time.monotonic() + WAIT_FOR_REFRESH_SECONDS
+        while time.monotonic() < deadline:
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            if self.segment.generation != seen:
+                shared = self.read_shared()
+                if shared is not None:
+                    return shared
+            elected, data = self._refresh_if_elected(cancel_event)
+            if elected:
+                return data
+            time.sleep(WAIT_POLL_SECONDS)
+        raise ValueError("Another process is refreshing the exchange rates and has not published them.")
+
+    def load_cached(self):
+        # The shared snapshot if there is one, otherwise the rates file
+        shared = self.read_shared()
+        if shared is not None:
+            return shared["rates"], shared["fetched_at"]
+        return self.source.load_cached()
+
+
+def build_shared_source(source):
+    # The rate source shared through the machine-wide segment, or the source itself when the segment can't be
+    # used (e.g. a read-only directory)
+    try:
+        return SharedRateProvider(source)
+    except OSError:
+        return source
@@ -0,0 +1,64 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+from converter_core import HISTORY_TIMESTAMP_FORMAT, ConversionHistoryModel, HistoryStore, format_history_entry
+
+# Conversion history store and the paged model of the View Conversion History tab
+
+
+def history_entry(when, amount):
+    return {"timestamp": when.strftime(HISTORY_TIMESTAMP_FORMAT), "from_currency": "USD", "to_currency": "EUR",
+            "amount": float(amount), "converted_amount": amount * 0.9}
+
+
+def write_history(filename, entries, corrupt_after=None):
+    # JSON Lines history file, with a torn line (as left by a crash in the middle of an append) after entry
+    # number corrupt_after
+    with open(filename, 'w') as file:
+        for i, entry in enumerate(entries):
+            file.write(json.dumps(entry) + "\n")
+            if i == corrupt_after:
+                file.write('{"timestamp": "2026-01-01 00:0\n')
+
+
+def test_corrupt_middle_line_is_skipped(tmp_path):
+    now = datetime.now()
+    entries = [history_entry(now - timedelta(minutes=10 - i), i) for i in range(10)]
+    filename = os.path.join(tmp_path, "history.jsonl")
+    write_history(filename, entries, corrupt_after=4)
+    store = HistoryStore(filename)
+    assert len(store) == 10
+    assert list(store.entries()) == entries
+    assert list(store.entries(3, 7)) == entries[3:7]
+    assert store.entries_at([4, 5]) == entries[4:6]
+    model = ConversionHistoryModel(store)
+    assert model.page(0) == [format_history_entry(entry) for entry in reversed(entries)]
+
+
+def test_compaction_during_iteration_skips_removed_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr("converter_core.HISTORY_READ_CHUNK", 5)
+    now = datetime.now()
+    expired = [history_entry(now - timedelta(days=30, minutes=10 - i), i) for i in range(10)]
+    recent = [history_entry(now - timedelta(minutes=10 - i), 100 + i) for i in range(10)]
+    filename = os.path.join(tmp_path, "history.jsonl")
+    write_history(filename, expired + recent, corrupt_after=12)
+    store = HistoryStore(filename)
+    reader = store.entries()
+    first = [next(reader) for _ in range(3)]
+    store.compact()
+    assert store.dropped == 10
+    assert first + list(reader) == expired[:5] + recent
+    assert list(store.entries()) == recent
+
+
+def test_compacting_every_entry_empties_the_file(tmp_path):
+    old = datetime.now() - timedelta(days=30)
+    filename = os.path.join(tmp_path, "history.jsonl")
+    write_history(filename, [history_entry(old + timedelta(minutes=i), i) for i in range(5)])
+    store = HistoryStore(filename)
+    store.compact()
+    assert len(store) == 0
+    assert os.path.getsize(filename) == 0
+    store.append(history_entry(datetime.now(), 1))
+    assert [entry["amount"] for entry in store.entries()] == [1.0]
@@ -0,0 +1,36 @@
+import os
+import time
+
+import numpy as np
+
+from converter_core import CurrencyConverter, HistoryStore, RateProvider
+from rate_history import RateHistoryStore
+
+# Columnar rate history: one clock for every snapshot, whatever provider it came from
+
+
+def test_failover_to_provider_with_older_publication_time_is_recorded(tmp_path):
+    store = RateHistoryStore(os.path.join(tmp_path, "rate_history"))
+    converter = CurrencyConverter(RateProvider(rates_file=os.path.join(tmp_path, "exchange_rates.bin")),
+                                  HistoryStore(os.path.join(tmp_path, "history.jsonl")), rate_history=store)
+    now = time.time()
+    converter.store_snapshot({"rates": {"USD": 1.0, "EUR": 0.90}, "time_last_updated": now})
+    # The next provider publishes less often, its latest snapshot is an hour older than the first one's
+    converter.store_snapshot({"rates": {"USD": 1.0, "EUR": 0.91}, "time_last_updated": now - 3600})
+    assert len(store) == 2
+    assert store.timestamps[1] > store.timestamps[0]
+    assert list(store.published) == [now, now - 3600]
+    assert store.as_of(time.time())["EUR"] == 0.91
+
+
+def test_store_without_publication_times_is_upgraded(tmp_path):
+    directory = os.path.join(tmp_path, "rate_history")
+    store = RateHistoryStore(directory)
+    store.append({"USD": 1.0, "EUR": 0.9}, 100.0)
+    store.append({"USD": 1.0, "EUR": 0.8}, 200.0, published_at=150.0)
+    os.remove(os.path.join(directory, "published.f8"))
+    store = RateHistoryStore(directory)
+    assert len(store) == 2
+    assert np.isnan(store.published).all()
+    assert store.append({"USD": 1.0, "EUR": 0.7}, 300.0, published_at=250.0)
+    assert store.published[-1] == 250.0
@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+import warnings
+
+import pytest
+
+from benchmarks.stub_upstream import StubUpstream, stub_rates
+from rate_providers import CONSENSUS, FIRST_VALID, MultiProviderRateSource, UpstreamProvider
+
+# Routing and merging of MultiProviderRateSource against local stub upstreams (no network access needed)
+
+
+@pytest.fixture
+def stubs():
+    # stubs(**options) starts a stub upstream that is stopped after the test
+    started = []
+
+    def start(**options):
+        stub = StubUpstream(**options).start()
+        started.append(stub)
+        return stub
+    yield start
+    for stub in started:
+        stub.stop()
+
+
+def make_source(tmp_path, stubs, strategy=FIRST_VALID, timeout=(1, 3)):
+    providers = [UpstreamProvider(stub.url, f"stub{i}", timeout) for i, stub in enumerate(stubs)]
+    return MultiProviderRateSource(providers, strategy, os.path.join(tmp_path, "exchange_rates.bin"))
+
+
+def test_failover_to_next_provider(tmp_path, stubs):
+    down, up = stubs(status=503), stubs()
+    source = make_source(tmp_path, [down, up])
+    data = source.fetch()
+    assert data["providers"] == ["stub1"]
+    assert data["rates"]["USD"] == 1.0
+    assert source.providers[0].health.failures == 1
+    assert os.path.exists(source.rates_file)
+
+
+def test_failing_provider_cools_off(tmp_path, stubs):
+    down, up = stubs(status=503), stubs()
+    source = make_source(tmp_path, [down, up])
+    source.fetch()
+    assert not source.providers[0].health.available()
+    assert source.route() == [source.providers[1]]
+    source.fetch()
+    assert down.requests == 1
+    assert up.requests == 2
+
+
+def test_all_providers_failing_raises(tmp_path, stubs):
+    source = make_source(tmp_path, [stubs(status=503), stubs(status=500)])
+    with pytest.raises(ValueError, match="stub0.*stub1"):
+        source.fetch()
+
+
+def test_best_provider_is_asked_alone(tmp_path, stubs):
+    first, second = stubs(), stubs()
+    source = make_source(tmp_path, [first, second])
+    assert source.fetch()["providers"] == ["stub0"]
+    assert (first.requests, second.requests) == (1, 0)
+
+
+def test_slow_provider_is_hedged(tmp_path, stubs):
+    slow, fast = stubs(latency=2.0), stubs()
+    source = make_source(tmp_path, [slow, fast])
+    started = time.monotonic()
+    data = source.fetch()
+    assert data["providers"] == ["stub1"]
+    assert time.monotonic() - started < 2.0
+    assert (slow.requests, fast.requests) == (1, 1)
+
+
+def test_consensus_rejects_outlier(tmp_path, stubs):
+    good, skewed, other = stubs(), stubs(skew={"EUR": 1.05}), stubs()
+    source = make_source(tmp_path, [good, skewed, other], CONSENSUS)
+    data = source.fetch()
+    assert data["rates"]["EUR"] == pytest.approx(stub_rates()["EUR"])
+    assert source.providers[1].health.outliers == 1
+    assert source.providers[0].health.outliers == 0
+
+
+def test_consensus_of_two_disagreeing_providers_keeps_currency(tmp_path, stubs):
+    good, skewed = stubs(), stubs(skew={"EUR": 1.05})
+    source = make_source(tmp_path, [good, skewed], CONSENSUS)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        data = source.fetch()
+    assert data["rates"]["EUR"] in (pytest.approx(stub_rates()["EUR"]),
+                                    pytest.approx(stub_rates()["EUR"] * 1.05))
+    assert len(data["rates"]) == len(stub_rates())
+
+
+def test_cancelled_fetch_returns_none(tmp_path, stubs):
+    source = make_source(tmp_path, [stubs(latency=2.0)])
+    cancel_event = threading.Event()
+    threading.Timer(0.2, cancel_event.set).start()
+    started = time.monotonic()
+    assert source.fetch(cancel_event) is None
+    assert time.monotonic() - started < 1.0
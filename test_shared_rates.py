@@ -0,0 +1,77 @@
+import os
+import threading
+import time
+
+import pytest
+import requests
+
+from benchmarks.stub_upstream import StubUpstream
+from converter_core import CurrencyConverter, HistoryStore, RateProvider
+from shared_rates import SharedRateProvider
+
+# Refresh election of SharedRateProvider between "processes" (one provider per process on the same rates file)
+
+
+@pytest.fixture
+def stubs():
+    started = []
+
+    def start(**options):
+        stub = StubUpstream(**options).start()
+        started.append(stub)
+        return stub
+    yield start
+    for stub in started:
+        stub.stop()
+
+
+def shared_provider(tmp_path, upstream):
+    return SharedRateProvider(RateProvider(upstream.url, rates_file=os.path.join(tmp_path, "exchange_rates.bin")))
+
+
+def test_waiter_fetches_when_elected_process_fails(tmp_path, stubs):
+    down, up = stubs(status=503, latency=0.5), stubs()
+    elected, waiter = shared_provider(tmp_path, down), shared_provider(tmp_path, up)
+    errors = []
+
+    def refresh():
+        try:
+            elected.fetch()
+        except requests.RequestException as error:
+            errors.append(error)
+    thread = threading.Thread(target=refresh)
+    thread.start()
+    while down.requests == 0:
+        time.sleep(0.01)
+    started = time.monotonic()
+    data = waiter.fetch()
+    thread.join()
+    assert errors
+    assert time.monotonic() - started < 5
+    assert data["rates"]["USD"] == 1.0
+    assert up.requests == 1
+    assert elected.read_shared()["rates"] == data["rates"]
+
+
+def test_waiter_uses_published_snapshot(tmp_path, stubs):
+    slow, other = stubs(latency=0.5), stubs()
+    elected, waiter = shared_provider(tmp_path, slow), shared_provider(tmp_path, other)
+    thread = threading.Thread(target=elected.fetch)
+    thread.start()
+    while slow.requests == 0:
+        time.sleep(0.01)
+    data = waiter.fetch()
+    thread.join()
+    assert data["shared"]
+    assert other.requests == 0
+
+
+def test_adopted_snapshot_is_not_counted_as_refresh(tmp_path, stubs):
+    upstream = stubs()
+    publisher, reader = shared_provider(tmp_path, upstream), shared_provider(tmp_path, upstream)
+    publisher.fetch()
+    converter = CurrencyConverter(reader, HistoryStore(os.path.join(tmp_path, "history.jsonl")))
+    converter.store_snapshot(reader.fetch())
+    stats = converter.rate_cache.stats()
+    assert (stats["source"], stats["refreshes"]) == ("shared", 0)
+    assert upstream.requests == 1